@@ -3,58 +3,32 @@ Google Street View Downloader - Versione Avanzata
 Supporta download multipli, conversione cubemap e elaborazione file locali
 """
 import os
-import json
 from datetime import datetime
-import math
 import glob
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import re
 import threading
-import requests
 from PIL import Image, ImageTk
-import time
 
 # Import localization
 from localization import t, set_language, get_language, get_available_languages, register_callback
-
-# Import opzionali con gestione errori MKL Intel
-HAS_NUMPY = False
-HAS_OPENCV = False
-
-try:
-    # Tenta import numpy con gestione errore MKL
-    import numpy as np
-    HAS_NUMPY = True
-    print("✓ NumPy disponibile per performance ottimizzate")
-except ImportError:
-    print("⚠ NumPy non disponibile - usando implementazioni pure Python")
-    HAS_NUMPY = False
-except Exception as e:
-    # Gestisce errori MKL Intel specificamente
-    if "mkl" in str(e).lower() or "intel" in str(e).lower():
-        print("⚠ Errore Intel MKL rilevato - disabilitando NumPy")
-        print(f"  Errore specifico: {e}")
-        print("  Suggerimento: pip uninstall numpy && pip install numpy==1.24.3")
-        HAS_NUMPY = False
-    else:
-        print(f"⚠ Errore NumPy generico: {e}")
-        HAS_NUMPY = False
-
-try:
-    import cv2
-    HAS_OPENCV = True
-    print("✓ OpenCV disponibile per elaborazioni avanzate")
-except ImportError:
-    print("⚠ OpenCV non disponibile")
-    HAS_OPENCV = False
-except Exception as e:
-    print(f"⚠ Errore OpenCV: {e}")
-    HAS_OPENCV = False
-
-
-class AdvancedStreetViewDownloader:
+from streetview_core import (StreetViewCore, HAS_NUMPY, VALIDATION_VALID, VALIDATION_INVALID,
+                             VALIDATION_UNREACHABLE)
+from http_session import http_head
+from rate_limiter import get_rate_limiter
+from circuit_breaker import get_circuit_breaker, STATE_CLOSED, STATE_OPEN
+from url_list import (BatchURLList, STATUS_PENDING, STATUS_OK, STATUS_FAILED, STATUS_UNREACHABLE,
+                      SORT_INSERTION, SORT_URL, SORT_PANOID, SORT_STATUS)
+from virtual_list import VirtualListbox
+from ui_bus import ProgressBus
+from config import DOWNLOAD_CONFIG
+
+
+class AdvancedStreetViewDownloader(StreetViewCore):
     def __init__(self, root):
+        # Download, cache tiles e pattern PanoID (core indipendente dalla GUI)
+        super().__init__()
+        
         self.root = root
         self.root.title(t('app_title'))
         self.root.geometry("1000x800")
@@ -69,22 +43,17 @@ class AdvancedStreetViewDownloader:
         self.current_download_index = 0
         self.is_downloading = False
         
-        # Pattern per estrazione PanoID
-        self.panoid_patterns = [
-            r'!1s([a-zA-Z0-9_-]{20,})',
-            r'"pano":"([a-zA-Z0-9_-]{20,})"',
-            r'"panoid":"([a-zA-Z0-9_-]{20,})"',
-            r'pano:"([a-zA-Z0-9_-]{20,})"',
-            r'"panoId":"([a-zA-Z0-9_-]{20,})"',
-            r'photosphereId=([a-zA-Z0-9_-]{20,})',
-            r'panoid=([a-zA-Z0-9_-]{20,})',
-            r'pano=([a-zA-Z0-9_-]{20,})',
-        ]
+        # Lista URL dei download multipli (il widget ne mostra il contenuto)
+        self.batch_urls = BatchURLList()
+        
+        # Aggiornamenti dai thread di lavoro: applicati dal main loop a frequenza fissa
+        self.ui_bus = ProgressBus(self.root)
         
         # Mappa per referenze widget che necessitano traduzione
         self.ui_elements = {}
         
         self.setup_ui()
+        self.ui_bus.start()
     
     def update_ui_language(self):
         """Aggiorna tutti i testi dell'interfaccia con la lingua corrente"""
@@ -128,7 +97,7 @@ class AdvancedStreetViewDownloader:
                                          'sv_format_label', 'sv_extract_btn', 'sv_download_btn', 
                                          'sv_save_btn', 'validate_btn', 'clear_btn']:
                             widget.config(text=t(element_key))
-                        elif element_key in ['sv_format_equirect', 'sv_format_cubemap']:
+                        elif element_key in ['sv_format_equirect', 'sv_format_cubemap', 'sv_direct_cubemap']:
                             widget.config(text=t(element_key))
                 except:
                     pass  # Ignora errori di aggiornamento widget
@@ -286,6 +255,12 @@ class AdvancedStreetViewDownloader:
         cubemap_radio.pack(side="left", padx=(10, 0))
         self.ui_elements['sv_format_cubemap'] = cubemap_radio
         
+        self.direct_cubemap_var = tk.BooleanVar(value=DOWNLOAD_CONFIG['direct_cubemap'])
+        direct_cubemap_check = ttk.Checkbutton(format_frame, text=t('sv_direct_cubemap'),
+                                               variable=self.direct_cubemap_var)
+        direct_cubemap_check.pack(side="left", padx=(10, 0))
+        self.ui_elements['sv_direct_cubemap'] = direct_cubemap_check
+        
         # Pulsanti azione
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill="x", pady=20)
@@ -461,16 +436,45 @@ class AdvancedStreetViewDownloader:
         ttk.Button(input_frame, text="➕ Aggiungi", 
                   command=self.add_url_to_batch).pack(side="right", padx=(10, 0))
         
-        # Lista URL con scrollbar
-        list_frame = ttk.Frame(url_list_frame)
-        list_frame.pack(fill="both", expand=True)
-        
-        self.url_listbox = tk.Listbox(list_frame, height=8)
-        list_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.url_listbox.yview)
-        self.url_listbox.configure(yscrollcommand=list_scrollbar.set)
-        
-        self.url_listbox.pack(side="left", fill="both", expand=True)
-        list_scrollbar.pack(side="right", fill="y")
+        # Filtri e ordinamento della lista (calcolati sul modello, non sul widget)
+        filter_frame = ttk.Frame(url_list_frame)
+        filter_frame.pack(fill="x", pady=(0, 5))
+        
+        self.url_status_filters = {
+            "Tutti": None,
+            "In attesa": STATUS_PENDING,
+            "Validi": STATUS_OK,
+            "Falliti": STATUS_FAILED,
+            "Non raggiungibili": STATUS_UNREACHABLE,
+        }
+        self.url_sort_orders = {
+            "Inserimento": SORT_INSERTION,
+            "URL": SORT_URL,
+            "PanoID": SORT_PANOID,
+            "Stato": SORT_STATUS,
+        }
+        
+        ttk.Label(filter_frame, text="Mostra:").pack(side="left")
+        self.url_status_filter_var = tk.StringVar(value="Tutti")
+        ttk.Combobox(filter_frame, textvariable=self.url_status_filter_var,
+                     values=list(self.url_status_filters), state="readonly", width=16).pack(side="left", padx=(5, 15))
+        
+        ttk.Label(filter_frame, text="Cerca:").pack(side="left")
+        self.url_text_filter_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.url_text_filter_var, width=25).pack(side="left", padx=(5, 15))
+        
+        ttk.Label(filter_frame, text="Ordina:").pack(side="left")
+        self.url_sort_var = tk.StringVar(value="Inserimento")
+        ttk.Combobox(filter_frame, textvariable=self.url_sort_var,
+                     values=list(self.url_sort_orders), state="readonly", width=12).pack(side="left", padx=(5, 0))
+        
+        for var in (self.url_status_filter_var, self.url_text_filter_var, self.url_sort_var):
+            var.trace_add('write', lambda *args: self.apply_url_view())
+        
+        # Lista URL virtualizzata: il widget contiene solo le righe visibili
+        self.url_view = VirtualListbox(url_list_frame, self.batch_urls, height=8,
+                                       scheduler=lambda refresh: self.ui_bus.call_latest('url_view', refresh))
+        self.url_view.pack(fill="both", expand=True)
         
         # Pulsanti gestione lista
         list_buttons_frame = ttk.Frame(url_list_frame)
@@ -515,6 +519,10 @@ class AdvancedStreetViewDownloader:
         ttk.Radiobutton(options1_frame, text="Cubemap", 
                        variable=self.batch_format_var, value="cubemap").pack(side="left", padx=(10, 0))
         
+        self.batch_direct_cubemap_var = tk.BooleanVar(value=DOWNLOAD_CONFIG['direct_cubemap'])
+        ttk.Checkbutton(options1_frame, text="Diretto", 
+                        variable=self.batch_direct_cubemap_var).pack(side="left", padx=(10, 0))
+        
         # Seconda riga opzioni
         options2_frame = ttk.Frame(batch_options_frame)
         options2_frame.pack(fill="x")
@@ -563,19 +571,24 @@ class AdvancedStreetViewDownloader:
         self.connection_status_var = tk.StringVar(value="🟢 Online")
         connection_status = ttk.Label(status_frame, textvariable=self.connection_status_var)
         connection_status.pack(side="right", padx=10)
+        
+        # L'indicatore segue i circuiti degli endpoint, senza attendere la fine dei download
+        for name in ('tiles', 'metadata'):
+            get_circuit_breaker(name).add_listener(self.on_circuit_state_changed)
+    
+    def on_circuit_state_changed(self, name, state):
+        """Aggiorna l'indicatore di connessione a ogni cambio di stato di un circuito (da qualsiasi thread)"""
+        if state == STATE_CLOSED:
+            self.ui_bus.set(self.connection_status_var, "🟢 Online")
+        elif state == STATE_OPEN:
+            self.ui_bus.set(self.connection_status_var, f"🔴 Offline ({name}) - download in pausa")
+        else:
+            self.ui_bus.set(self.connection_status_var, f"🟡 Verifica connessione ({name})...")
     
     # ========================================================================================
     # METODI TAB STREET VIEW SINGOLO
     # ========================================================================================
     
-    def extract_panoid_from_url(self, url):
-        """Estrae il PanoID dall'URL di Google Street View"""
-        for pattern in self.panoid_patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
-    
     def extract_panoid_single(self):
         """Estrae il PanoID dall'URL nel tab singolo"""
         url = self.url_var.get().strip()
@@ -616,15 +629,15 @@ class AdvancedStreetViewDownloader:
         def validate_thread():
             try:
                 test_url = f"https://streetviewpixels-pa.googleapis.com/v1/tile?cb_client=maps_sv.tactile&panoid={panoid}&x=0&y=0&zoom=0&nbt=1&fover=2"
-                response = requests.head(test_url, timeout=5)
+                response = http_head(test_url)
                 if response.status_code == 200:
-                    self.status_single_var.set(f"✅ PanoID valido: {panoid}")
-                    self.connection_status_var.set("🟢 Online")
+                    self.ui_bus.set(self.status_single_var, f"✅ PanoID valido: {panoid}")
+                    self.ui_bus.set(self.connection_status_var, "🟢 Online")
                 else:
-                    self.status_single_var.set(f"❌ PanoID non valido (status: {response.status_code})")
+                    self.ui_bus.set(self.status_single_var, f"❌ PanoID non valido (status: {response.status_code})")
             except Exception as e:
-                self.status_single_var.set(f"❌ Errore validazione: {str(e)}")
-                self.connection_status_var.set("🔴 Offline")
+                self.ui_bus.set(self.status_single_var, f"❌ Errore validazione: {str(e)}")
+                self.ui_bus.set(self.connection_status_var, "🔴 Offline")
         
         threading.Thread(target=validate_thread, daemon=True).start()
     
@@ -642,15 +655,40 @@ class AdvancedStreetViewDownloader:
         def download_thread():
             try:
                 self.is_downloading = True
-                zoom = int(self.resolution_var.get())
                 output_format = self.output_format_var.get()
                 
-                self.status_single_var.set("Download in corso...")
-                self.global_status_var.set("Download Street View in corso...")
-                self.progress_single_var.set(0)
+                self.ui_bus.set(self.status_single_var, "Download in corso...")
+                self.ui_bus.set(self.global_status_var, "Download Street View in corso...")
+                self.ui_bus.set(self.progress_single_var, 0)
+                
+                # Photosphere con risoluzione inferiore: stesso zoom massimo per mosaico e cubemap diretto
+                zoom = self.clamp_zoom(panoid, int(self.resolution_var.get()))
+                
+                # Anteprima progressiva: immagine a bassa risoluzione subito, poi raffinata
+                preview_callback = self.show_preview_single if DOWNLOAD_CONFIG['progressive_preview'] else None
+                
+                if output_format == "cubemap" and self.direct_cubemap_var.get() and HAS_NUMPY:
+                    # Cubemap direttamente dalle tiles, senza mosaico equirettangolare
+                    if preview_callback:
+                        preview_zoom = min(DOWNLOAD_CONFIG['preview_zoom'], zoom)
+                        preview_callback(self.tile_fetcher.download_image(panoid, preview_zoom)[0])
+                    
+                    def on_face(done_faces, total_faces, face_name):
+                        self.ui_bus.set(self.progress_single_var, (done_faces / total_faces) * 100)
+                        self.ui_bus.set(self.status_single_var, f"Faccia {face_name} ({done_faces}/{total_faces})")
+                    
+                    cubemap_faces = self.build_cubemap_from_tiles(panoid, zoom, progress_callback=on_face)
+                    self.current_image = cubemap_faces
+                    self.show_preview_single(cubemap_faces['front'])
+                    self.ui_bus.set(self.status_single_var, f"✅ Cubemap generato! 6 facce {cubemap_faces['front'].size[0]}×{cubemap_faces['front'].size[1]}")
+                    return
                 
                 # Download immagine equirettangolare
-                equirect_image = self.download_streetview_image(panoid, zoom, self.progress_single_var, self.status_single_var)
+                equirect_image = self.download_streetview_image(panoid, zoom,
+                                                                self.ui_bus.variable(self.progress_single_var),
+                                                                self.ui_bus.variable(self.status_single_var),
+                                                                preview_callback,
+                                                                self.ui_bus.variable(self.connection_status_var))
                 
                 if equirect_image:
                     # Non applichiamo overlap: esportiamo l'immagine così com'è
@@ -660,9 +698,9 @@ class AdvancedStreetViewDownloader:
                     
                     if output_format == "equirectangular":
                         self.show_preview_single(equirect_image)
-                        self.status_single_var.set(f"✅ Download completato! Immagine {equirect_image.size[0]}×{equirect_image.size[1]}")
+                        self.ui_bus.set(self.status_single_var, f"✅ Download completato! Immagine {equirect_image.size[0]}×{equirect_image.size[1]}")
                     else:  # cubemap
-                        self.status_single_var.set("Conversione in cubemap...")
+                        self.ui_bus.set(self.status_single_var, "Conversione in cubemap...")
                         cubemap_faces = self.equirect_to_cubemap(equirect_image)
                         self.current_image = cubemap_faces  # Salva le 6 facce
                         
@@ -670,18 +708,18 @@ class AdvancedStreetViewDownloader:
                         if 'front' in cubemap_faces:
                             self.show_preview_single(cubemap_faces['front'])
                         
-                        self.status_single_var.set(f"✅ Cubemap generato! 6 facce {list(cubemap_faces.values())[0].size[0]}×{list(cubemap_faces.values())[0].size[1]}")
+                        self.ui_bus.set(self.status_single_var, f"✅ Cubemap generato! 6 facce {list(cubemap_faces.values())[0].size[0]}×{list(cubemap_faces.values())[0].size[1]}")
                     
-                    self.progress_single_var.set(100)
+                    self.ui_bus.set(self.progress_single_var, 100)
                 else:
-                    self.status_single_var.set("❌ Download fallito")
+                    self.ui_bus.set(self.status_single_var, "❌ Download fallito")
                     
             except Exception as e:
-                self.status_single_var.set(f"❌ Errore: {str(e)}")
-                messagebox.showerror("Errore", f"Errore durante il download:\n{str(e)}")
+                self.ui_bus.set(self.status_single_var, f"❌ Errore: {str(e)}")
+                self.ui_bus.call(messagebox.showerror, "Errore", f"Errore durante il download:\n{str(e)}")
             finally:
                 self.is_downloading = False
-                self.global_status_var.set("Pronto")
+                self.ui_bus.set(self.global_status_var, "Pronto")
         
         threading.Thread(target=download_thread, daemon=True).start()
     
@@ -707,11 +745,14 @@ class AdvancedStreetViewDownloader:
         self.progress_single_var.set(0)
     
     def show_preview_single(self, image):
-        """Mostra anteprima nel tab singolo"""
+        """Mostra anteprima nel tab singolo (da qualsiasi thread: conta solo l'ultima per fotogramma)"""
         preview_size = (400, 200)
         preview_image = image.copy()
         preview_image.thumbnail(preview_size, Image.Resampling.LANCZOS)
-        
+        self.ui_bus.call_latest('preview_single', self._set_preview_single, preview_image)
+    
+    def _set_preview_single(self, preview_image):
+        """Mostra nel widget un'anteprima già ridotta (main loop)"""
         photo = ImageTk.PhotoImage(preview_image)
         self.preview_single.configure(image=photo, text="")
         self.current_photo = photo
@@ -795,8 +836,8 @@ class AdvancedStreetViewDownloader:
                         
                         # Aggiorna progress
                         progress = (i / total_files) * 100
-                        self.progress_local_var.set(progress)
-                        self.status_local_var.set(f"Elaborazione {i+1}/{total_files}: {os.path.basename(file_path)}")
+                        self.ui_bus.set(self.progress_local_var, progress)
+                        self.ui_bus.set(self.status_local_var, f"Elaborazione {i+1}/{total_files}: {os.path.basename(file_path)}")
                         
                         # Carica immagine
                         image = Image.open(file_path)
@@ -827,13 +868,13 @@ class AdvancedStreetViewDownloader:
                     except Exception as e:
                         self.log_message(f"❌ Errore su {os.path.basename(file_path)}: {str(e)}")
                 
-                self.progress_local_var.set(100)
-                self.status_local_var.set(f"✅ Conversione completata: {total_files} file processati")
+                self.ui_bus.set(self.progress_local_var, 100)
+                self.ui_bus.set(self.status_local_var, f"✅ Conversione completata: {total_files} file processati")
                 self.log_message("🎉 Conversione completata!")
                 
             except Exception as e:
                 self.log_message(f"❌ Errore generale: {str(e)}")
-                messagebox.showerror("Errore", f"Errore durante la conversione:\n{str(e)}")
+                self.ui_bus.call(messagebox.showerror, "Errore", f"Errore durante la conversione:\n{str(e)}")
         
         threading.Thread(target=convert_thread, daemon=True).start()
     
@@ -875,13 +916,15 @@ class AdvancedStreetViewDownloader:
                 messagebox.showerror("Errore", f"Impossibile aprire l'immagine:\n{str(e)}")
     
     def log_message(self, message):
-        """Aggiunge messaggio al log"""
+        """Aggiunge messaggio al log (da qualsiasi thread: scritto dal main loop, in ordine)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] {message}\n"
-        
+        self.ui_bus.call(self._append_log, log_entry)
+    
+    def _append_log(self, log_entry):
+        """Scrive una riga nel widget di log (main loop)"""
         self.log_text.insert(tk.END, log_entry)
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
     
     # ========================================================================================
     # METODI TAB DOWNLOAD MULTIPLI
@@ -894,36 +937,36 @@ class AdvancedStreetViewDownloader:
             messagebox.showerror("Errore", "Inserisci un URL")
             return
         
-        # Verifica se l'URL è già presente
-        current_urls = list(self.url_listbox.get(0, tk.END))
-        if url in current_urls:
+        # Aggiungi alla lista (rifiutato se l'URL o il suo PanoID è già presente)
+        if not self.batch_urls.add(url):
             messagebox.showwarning("Avviso", "URL già presente nella lista")
             return
         
-        # Aggiungi alla lista
-        self.url_listbox.insert(tk.END, url)
+        self.url_view.refresh()
         self.batch_url_var.set("")  # Pulisci campo input
         
-        self.status_batch_var.set(f"URL aggiunti: {self.url_listbox.size()}")
+        self.status_batch_var.set(f"URL aggiunti: {len(self.batch_urls)}")
     
     def remove_selected_url(self):
         """Rimuove URL selezionato dalla lista"""
-        selection = self.url_listbox.curselection()
+        selection = self.url_view.selected_rows()
         if not selection:
             messagebox.showwarning("Avviso", "Seleziona un URL da rimuovere")
             return
         
-        # Rimuovi dalla fine per mantenere gli indici corretti
-        for index in reversed(selection):
-            self.url_listbox.delete(index)
+        self.batch_urls.remove(selection)
+        self.url_view.clear_selection()
+        self.url_view.refresh()
         
-        self.status_batch_var.set(f"URL nella lista: {self.url_listbox.size()}")
+        self.status_batch_var.set(f"URL nella lista: {len(self.batch_urls)}")
     
     def clear_url_list(self):
         """Pulisce la lista URL"""
-        if self.url_listbox.size() > 0:
+        if len(self.batch_urls) > 0:
             if messagebox.askyesno("Conferma", "Cancellare tutti gli URL dalla lista?"):
-                self.url_listbox.delete(0, tk.END)
+                self.batch_urls.clear()
+                self.url_view.clear_selection()
+                self.url_view.refresh()
                 self.status_batch_var.set("Lista URL vuota")
     
     def load_urls_from_file(self):
@@ -939,21 +982,21 @@ class AdvancedStreetViewDownloader:
         if filename:
             try:
                 with open(filename, 'r', encoding='utf-8') as f:
-                    urls = [line.strip() for line in f if line.strip()]
+                    urls, duplicates = self.batch_urls.add_many(f)
                 
-                for url in urls:
-                    if url not in list(self.url_listbox.get(0, tk.END)):
-                        self.url_listbox.insert(tk.END, url)
+                # Il widget ridisegna solo le righe visibili
+                self.url_view.refresh()
                 
-                self.status_batch_var.set(f"Caricati {len(urls)} URL da file")
-                messagebox.showinfo("Successo", f"Caricati {len(urls)} URL da {os.path.basename(filename)}")
+                duplicates_info = f" ({duplicates} duplicati ignorati)" if duplicates else ""
+                self.status_batch_var.set(f"Caricati {len(urls)} URL da file{duplicates_info}")
+                messagebox.showinfo("Successo", f"Caricati {len(urls)} URL da {os.path.basename(filename)}{duplicates_info}")
                 
             except Exception as e:
                 messagebox.showerror("Errore", f"Errore nel caricamento del file:\n{str(e)}")
     
     def save_urls_to_file(self):
         """Salva lista URL in file"""
-        if self.url_listbox.size() == 0:
+        if len(self.batch_urls) == 0:
             messagebox.showwarning("Avviso", "Nessun URL da salvare")
             return
         
@@ -968,7 +1011,7 @@ class AdvancedStreetViewDownloader:
         
         if filename:
             try:
-                urls = list(self.url_listbox.get(0, tk.END))
+                urls = self.batch_urls.urls()
                 with open(filename, 'w', encoding='utf-8') as f:
                     for url in urls:
                         f.write(url + '\n')
@@ -978,6 +1021,14 @@ class AdvancedStreetViewDownloader:
             except Exception as e:
                 messagebox.showerror("Errore", f"Errore nel salvataggio:\n{str(e)}")
     
+    def apply_url_view(self):
+        """Applica filtri e ordinamento scelti alla lista URL"""
+        self.batch_urls.set_view(
+            status_filter=self.url_status_filters.get(self.url_status_filter_var.get()),
+            text_filter=self.url_text_filter_var.get(),
+            sort=self.url_sort_orders.get(self.url_sort_var.get(), SORT_INSERTION))
+        self.url_view.refresh()
+    
     def browse_batch_output(self):
         """Sfoglia cartella output per batch"""
         folder = filedialog.askdirectory(title="Seleziona cartella per download multipli")
@@ -986,36 +1037,49 @@ class AdvancedStreetViewDownloader:
     
     def validate_all_urls(self):
         """Valida tutti gli URL nella lista"""
-        if self.url_listbox.size() == 0:
+        if len(self.batch_urls) == 0:
             messagebox.showwarning("Avviso", "Nessun URL da validare")
             return
         
         def validate_thread():
-            urls = list(self.url_listbox.get(0, tk.END))
-            valid_count = 0
+            urls = self.batch_urls.urls()
+            result_status = {
+                VALIDATION_VALID: STATUS_OK,
+                VALIDATION_INVALID: STATUS_FAILED,
+                VALIDATION_UNREACHABLE: STATUS_UNREACHABLE,
+            }
+            done = [0]
             
-            self.status_batch_var.set("Validazione URL in corso...")
+            self.ui_bus.set(self.status_batch_var, "Validazione URL in corso...")
             
-            for i, url in enumerate(urls):
-                progress = (i / len(urls)) * 100
-                self.progress_batch_var.set(progress)
-                self.status_batch_var.set(f"Validazione {i+1}/{len(urls)}: {url[:50]}...")
-                
-                panoid = self.extract_panoid_from_url(url)
-                if panoid and self.validate_panoid(panoid):
-                    valid_count += 1
+            def on_result(index, url, panoid, result):
+                # Esito scritto nel modello; il widget ridisegna solo se la riga è visibile
+                done[0] += 1
+                # Riga cercata per PanoID: la lista può essere cambiata dall'avvio della validazione
+                row = self.batch_urls.set_status_for(url, panoid, result_status[result])
+                if row is not None:
+                    self.url_view.row_changed(row)
+                self.ui_bus.set(self.progress_batch_var, (done[0] / len(urls)) * 100)
+                self.ui_bus.set(self.status_batch_var, f"Validazione {done[0]}/{len(urls)}: {url[:50]}...")
+            
+            summary = self.validate_urls(urls, on_result)
+            valid_count = summary[VALIDATION_VALID]
             
-            self.progress_batch_var.set(100)
-            self.status_batch_var.set(f"Validazione completata: {valid_count}/{len(urls)} URL validi")
+            self.ui_bus.set(self.progress_batch_var, 100)
+            self.ui_bus.set(self.status_batch_var, f"Validazione completata: {valid_count}/{len(urls)} URL validi")
             
-            messagebox.showinfo("Validazione Completata", 
-                f"Risultato validazione:\n✅ URL validi: {valid_count}\n❌ URL non validi: {len(urls)-valid_count}")
+            duplicates_info = f"\n🔁 URL con PanoID duplicato: {summary['duplicates']}" if summary['duplicates'] else ""
+            self.ui_bus.call(messagebox.showinfo, "Validazione Completata", 
+                f"Risultato validazione:\n✅ URL validi: {valid_count}"
+                f"\n❌ URL non validi: {summary[VALIDATION_INVALID]}"
+                f"\n⚠ URL non raggiungibili (da riprovare): {summary[VALIDATION_UNREACHABLE]}"
+                f"{duplicates_info}")
         
         threading.Thread(target=validate_thread, daemon=True).start()
     
     def start_batch_download(self):
         """Avvia download multipli"""
-        if self.url_listbox.size() == 0:
+        if len(self.batch_urls) == 0:
             messagebox.showwarning("Avviso", "Nessun URL nella lista")
             return
         
@@ -1038,73 +1102,62 @@ class AdvancedStreetViewDownloader:
         def batch_download_thread():
             try:
                 self.is_downloading = True
-                urls = list(self.url_listbox.get(0, tk.END))
+                urls = self.batch_urls.urls()
                 resolution = int(self.batch_resolution_var.get())
                 output_format = self.batch_format_var.get()
                 overlap_percent = int(self.batch_overlap_var.get())
+                direct_cubemap = self.batch_direct_cubemap_var.get()
                 
-                successful_downloads = 0
-                failed_downloads = 0
+                # Estrai PanoID (gli URL senza PanoID contano come falliti)
+                panoids = []
+                invalid_urls = 0
+                for url in urls:
+                    panoid = self.extract_panoid_from_url(url)
+                    if panoid:
+                        panoids.append(panoid)
+                    else:
+                        invalid_urls += 1
+                        self.batch_urls.set_status_for(url, None, STATUS_FAILED)
+                self.url_view.schedule_refresh()
                 
-                for i, url in enumerate(urls):
-                    if not self.is_downloading:  # Check se fermato
-                        break
-                    
-                    try:
-                        # Aggiorna progress
-                        progress = (i / len(urls)) * 100
-                        self.progress_batch_var.set(progress)
-                        overlap_info = f" (overlap {overlap_percent}%)" if overlap_percent > 0 else ""
-                        self.status_batch_var.set(f"Download {i+1}/{len(urls)}: {url[:50]}...{overlap_info}")
-                        self.global_status_var.set(f"Download batch: {i+1}/{len(urls)}")
-                        
-                        # Estrai PanoID
-                        panoid = self.extract_panoid_from_url(url)
-                        if not panoid:
-                            failed_downloads += 1
-                            continue
-                        
-                        # Download immagine
-                        equirect_image = self.download_streetview_image(panoid, resolution)
-                        
-                        if equirect_image:
-                            # Applica overlap se richiesto
-                            if overlap_percent > 0:
-                                equirect_image = self.create_overlap_image(equirect_image, overlap_percent, panoid)
-                            
-                            # Genera nome file
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            overlap_suffix = f"_overlap{overlap_percent}" if overlap_percent > 0 else ""
-                            base_filename = f"streetview_{panoid[:8]}_{timestamp}{overlap_suffix}"
-                            
-                            if output_format == "equirectangular":
-                                output_path = os.path.join(output_folder, f"{base_filename}.jpg")
-                                equirect_image.save(output_path, quality=95)
-                            else:  # cubemap
-                                cubemap = self.equirect_to_cubemap(equirect_image)
-                                for face_name, face_image in cubemap.items():
-                                    output_path = os.path.join(output_folder, f"{base_filename}_{face_name}.jpg")
-                                    face_image.save(output_path, quality=95)
-                            
-                            successful_downloads += 1
-                        else:
-                            failed_downloads += 1
+                overlap_info = f" (overlap {overlap_percent}%)" if overlap_percent > 0 else ""
+                self.ui_bus.set(self.status_batch_var, f"Download di {len(panoids)} panorami in corso...{overlap_info}")
+                
+                def on_progress(completed, total, panoid, error):
+                    # Esito del panorama nella lista URL
+                    row = self.batch_urls.set_status_by_panoid(panoid, STATUS_OK if error is None else STATUS_FAILED)
+                    if row is not None:
+                        self.url_view.row_changed(row)
                     
-                    except Exception as e:
-                        print(f"Errore download {url}: {e}")
-                        failed_downloads += 1
+                    # Aggiorna progress
+                    done = completed + invalid_urls
+                    self.ui_bus.set(self.progress_batch_var, (done / len(urls)) * 100)
+                    limiter = get_rate_limiter()
+                    rate_info = f" - {limiter.rate:.0f} req/s" if limiter is not None else ""
+                    self.ui_bus.set(self.status_batch_var, f"Download {done}/{len(urls)}: {panoid}{overlap_info}{rate_info}")
+                    self.ui_bus.set(self.global_status_var, f"Download batch: {done}/{len(urls)}")
+                
+                stats = self.batch_download(
+                    panoids, output_folder, resolution, output_format,
+                    overlap_percent=overlap_percent,
+                    direct_cubemap=direct_cubemap,
+                    progress_callback=on_progress,
+                    should_stop=lambda: not self.is_downloading)
+                
+                successful_downloads = stats['successful'] + stats['already_done']
+                failed_downloads = stats['failed'] + invalid_urls
                 
-                self.progress_batch_var.set(100)
-                self.status_batch_var.set(f"✅ Batch completato: {successful_downloads} successi, {failed_downloads} fallimenti")
+                self.ui_bus.set(self.progress_batch_var, 100)
+                self.ui_bus.set(self.status_batch_var, f"✅ Batch completato: {successful_downloads} successi, {failed_downloads} fallimenti")
                 
-                messagebox.showinfo("Download Completato", 
+                self.ui_bus.call(messagebox.showinfo, "Download Completato", 
                     f"Download multipli completati!\n✅ Successi: {successful_downloads}\n❌ Fallimenti: {failed_downloads}")
                 
             except Exception as e:
-                messagebox.showerror("Errore", f"Errore durante il download batch:\n{str(e)}")
+                self.ui_bus.call(messagebox.showerror, "Errore", f"Errore durante il download batch:\n{str(e)}")
             finally:
                 self.is_downloading = False
-                self.global_status_var.set("Pronto")
+                self.ui_bus.set(self.global_status_var, "Pronto")
         
         threading.Thread(target=batch_download_thread, daemon=True).start()
     
@@ -1113,705 +1166,12 @@ class AdvancedStreetViewDownloader:
         if self.is_downloading:
             if messagebox.askyesno("Conferma", "Fermare il download in corso?"):
                 self.is_downloading = False
-                self.status_batch_var.set("❌ Download fermato dall'utente")
-                self.global_status_var.set("Pronto")
+                # Tramite il bus: un progresso ancora in coda non sovrascrive questo stato
+                self.ui_bus.set(self.status_batch_var, "❌ Download fermato dall'utente")
+                self.ui_bus.set(self.global_status_var, "Pronto")
         else:
             messagebox.showinfo("Info", "Nessun download in corso")
     
-    # ========================================================================================
-    # METODI CORE - DOWNLOAD E CONVERSIONE
-    # ========================================================================================
-    
-    def get_tile_url(self, panoid, x, y, zoom=2):
-        """Genera l'URL per scaricare una tile specifica"""
-        return f"https://streetviewpixels-pa.googleapis.com/v1/tile?cb_client=maps_sv.tactile&panoid={panoid}&x={x}&y={y}&zoom={zoom}&nbt=1&fover=2"
-    
-    def validate_panoid(self, panoid):
-        """Valida un PanoID"""
-        if not panoid or len(panoid) < 20:
-            return False
-            
-        test_url = self.get_tile_url(panoid, 0, 0, 0)
-        try:
-            response = requests.head(test_url, timeout=5)
-            return response.status_code == 200
-        except:
-            return False
-    
-    def download_streetview_image(self, panoid, zoom, progress_var=None, status_var=None):
-        """Download immagine Street View completa"""
-        try:
-            # Calcola dimensioni tiles
-            tile_size = 512
-            # Configurazione zoom corretta per Google Street View
-            zoom_config = {
-                0: (1, 1),      # 512x512
-                1: (2, 1),      # 1024x512  
-                2: (4, 2),      # 2048x1024
-                3: (8, 4),      # 4096x2048
-                4: (16, 8),     # 8192x4096
-                5: (32, 16)     # 16384x8192 (se disponibile)
-            }
-            
-            # Verifica che zoom sia supportato
-            if zoom not in zoom_config:
-                print(f"⚠ Zoom {zoom} non supportato, uso zoom 2")
-                zoom = 2
-            
-            tiles_x, tiles_y = zoom_config[zoom]
-            print(f"📐 Download risoluzione zoom {zoom}: {tiles_x}x{tiles_y} tiles")
-            
-            # Crea immagine finale
-            final_width = tiles_x * tile_size
-            final_height = tiles_y * tile_size
-            final_image = Image.new('RGB', (final_width, final_height))
-            
-            total_tiles = tiles_x * tiles_y
-            downloaded_tiles = 0
-            
-            print(f"🔽 Inizio download {total_tiles} tiles...")
-            
-            # Download tiles con retry
-            for y in range(tiles_y):
-                for x in range(tiles_x):
-                    url = self.get_tile_url(panoid, x, y, zoom)
-                    
-                    # Retry per tile fallite
-                    success = False
-                    for attempt in range(3):  # Max 3 tentativi
-                        try:
-                            response = requests.get(url, timeout=15)  # Timeout aumentato
-                            if response.status_code == 200:
-                                from io import BytesIO
-                                tile_image = Image.open(BytesIO(response.content))
-                                final_image.paste(tile_image, (x * tile_size, y * tile_size))
-                                success = True
-                                break
-                            else:
-                                print(f"  ⚠ Tile ({x},{y}) status {response.status_code}, tentativo {attempt+1}")
-                        
-                        except Exception as e:
-                            print(f"  ❌ Tile ({x},{y}) errore: {e}, tentativo {attempt+1}")
-                            time.sleep(0.5)  # Pausa prima retry
-                    
-                    if not success:
-                        # Tile definitivamente fallita - usa grigio
-                        print(f"  💀 Tile ({x},{y}) fallita definitivamente")
-                        error_tile = Image.new('RGB', (tile_size, tile_size), (64, 64, 64))
-                        final_image.paste(error_tile, (x * tile_size, y * tile_size))
-                    
-                    downloaded_tiles += 1
-                    
-                    # Aggiorna progress
-                    if progress_var:
-                        progress = (downloaded_tiles / total_tiles) * 100
-                        progress_var.set(progress)
-                    
-                    if status_var:
-                        status_var.set(f"Download: {downloaded_tiles}/{total_tiles} tiles")
-                        
-                    # Small delay per evitare rate limiting
-                    time.sleep(0.1)
-            
-            return final_image
-        except Exception as e:
-            # Gestione errore generale del download dell'immagine
-            if status_var:
-                try:
-                    status_var.set(f"❌ Errore download tiles: {str(e)}")
-                except Exception:
-                    pass
-            try:
-                self.connection_status_var.set("🔴 Offline")
-            except Exception:
-                pass
-            print(f"Errore download_streetview_image: {e}")
-            return None
-    
-    def create_overlap_image(self, base_image, overlap_percent, panoid=None):
-        """Overlap removed: compatibility no-op returning base image."""
-        return base_image
-    
-    def _fill_overlap_borders_v2(self, expanded_image, base_image, offset_x, offset_y, overlap_ratio):
-        """Riempie i bordi dell'immagine espansa mantenendo proporzioni 2:1"""
-        width, height = base_image.size
-        exp_width, exp_height = expanded_image.size
-        
-        # Bordo sinistro - wraparound orizzontale
-        if offset_x > 0:
-            # Prendi parte destra dell'immagine base per il bordo sinistro
-            strip_width = offset_x
-            right_strip = base_image.crop((width - strip_width, 0, width, height))
-            
-            # Scala verticalmente se necessario per riempire altezza espansa
-            if exp_height != height:
-                right_strip = right_strip.resize((strip_width, exp_height), Image.Resampling.LANCZOS)
-            
-            expanded_image.paste(right_strip, (0, offset_y))
-        
-        # Bordo destro - wraparound orizzontale  
-        remaining_width = exp_width - (offset_x + width)
-        if remaining_width > 0:
-            # Prendi parte sinistra dell'immagine base per il bordo destro
-            left_strip = base_image.crop((0, 0, remaining_width, height))
-            
-            # Scala verticalmente se necessario
-            if exp_height != height:
-                left_strip = left_strip.resize((remaining_width, exp_height), Image.Resampling.LANCZOS)
-            
-            expanded_image.paste(left_strip, (offset_x + width, offset_y))
-        
-        # Bordi superiore e inferiore - stretch orizzontale dell'equatore
-        if offset_y > 0:
-            # Usa le righe equatoriali per il bordo superiore
-            equator_y = height // 2
-            equator_strip = base_image.crop((0, equator_y - 5, width, equator_y + 5))
-            equator_resized = equator_strip.resize((width, offset_y), Image.Resampling.LANCZOS)
-            expanded_image.paste(equator_resized, (offset_x, 0))
-            
-            # Riempi anche i bordi sinistro/destro dell'area superiore
-            if offset_x > 0:
-                # Bordo superiore sinistro
-                eq_left = equator_strip.crop((width - offset_x, 0, width, 10))
-                eq_left_resized = eq_left.resize((offset_x, offset_y), Image.Resampling.LANCZOS)
-                expanded_image.paste(eq_left_resized, (0, 0))
-            
-            if remaining_width > 0:
-                # Bordo superiore destro
-                eq_right = equator_strip.crop((0, 0, remaining_width, 10))
-                eq_right_resized = eq_right.resize((remaining_width, offset_y), Image.Resampling.LANCZOS)
-                expanded_image.paste(eq_right_resized, (offset_x + width, 0))
-        
-        # Bordo inferiore
-        remaining_height = exp_height - (offset_y + height)
-        if remaining_height > 0:
-            # Usa le righe equatoriali per il bordo inferiore
-            equator_y = height // 2
-            equator_strip = base_image.crop((0, equator_y - 5, width, equator_y + 5))
-            equator_resized = equator_strip.resize((width, remaining_height), Image.Resampling.LANCZOS)
-            expanded_image.paste(equator_resized, (offset_x, offset_y + height))
-            
-            # Riempi anche i bordi sinistro/destro dell'area inferiore
-            if offset_x > 0:
-                # Bordo inferiore sinistro
-                eq_left = equator_strip.crop((width - offset_x, 0, width, 10))
-                eq_left_resized = eq_left.resize((offset_x, remaining_height), Image.Resampling.LANCZOS)
-                expanded_image.paste(eq_left_resized, (0, offset_y + height))
-            
-            if remaining_width > 0:
-                # Bordo inferiore destro
-                eq_right = equator_strip.crop((0, 0, remaining_width, 10))
-                eq_right_resized = eq_right.resize((remaining_width, remaining_height), Image.Resampling.LANCZOS)
-                expanded_image.paste(eq_right_resized, (offset_x + width, offset_y + height))
-    
-    def _fill_corner_overlaps(self, expanded_image, base_image, offset_x, offset_y):
-        """Riempie gli angoli dell'immagine espansa con interpolazione"""
-        exp_width, exp_height = expanded_image.size
-        width, height = base_image.size
-        
-        # Dimensioni angoli
-        corner_w = offset_x
-        corner_h = offset_y
-        
-        if corner_w > 0 and corner_h > 0:
-            # Angolo top-left
-            corner_tl = base_image.crop((width - corner_w, 0, width, corner_h))
-            expanded_image.paste(corner_tl, (0, 0))
-            
-            # Angolo top-right
-            corner_tr = base_image.crop((0, 0, corner_w, corner_h))
-            expanded_image.paste(corner_tr, (offset_x + width, 0))
-            
-            # Angolo bottom-left
-            corner_bl = base_image.crop((width - corner_w, height - corner_h, width, height))
-            expanded_image.paste(corner_bl, (0, offset_y + height))
-            
-            # Angolo bottom-right
-            corner_br = base_image.crop((0, height - corner_h, corner_w, height))
-            expanded_image.paste(corner_br, (offset_x + width, offset_y + height))
-
-    # -----------------------------------------------------------------
-    # Metodi per download metadata e creazione overlap reale
-    # -----------------------------------------------------------------
-    def fetch_pano_metadata(self, panoid):
-        """Scarica metadata di un pano (se disponibili) per ottenere link ai vicini."""
-        try:
-            url = f"https://maps.google.com/cbk?output=json&panoid={panoid}"
-            resp = requests.get(url, timeout=10)
-            if resp.status_code != 200:
-                return None
-            text = resp.text
-            try:
-                data = resp.json()
-            except Exception:
-                idx = text.find('{')
-                if idx >= 0:
-                    try:
-                        data = json.loads(text[idx:])
-                    except Exception:
-                        return None
-                else:
-                    return None
-            return data
-        except Exception:
-            return None
-
-    def download_equirectangular_pano(self, panoid, zoom=2):
-        """Scarica l'equirectangular di un pano usando download_streetview_image."""
-        try:
-            return self.download_streetview_image(panoid, zoom)
-        except Exception:
-            return None
-
-    def _create_true_overlap(self, base_image, panoid, overlap_percent, zoom=2):
-        """Crea overlap reale usando panorami limitrofi quando disponibili.
-
-        Restituisce un'immagine espansa con blend dei crop dai vicini o None se non applicabile.
-        """
-        # Require OpenCV for true-overlap pipeline (for alignment & blending)
-        try:
-            import cv2 as _cv2  # local import to use the environment's OpenCV
-        except Exception:
-            print("⚠ OpenCV non disponibile localmente: salto true-overlap")
-            return None
-
-        try:
-            meta = self.fetch_pano_metadata(panoid)
-            if not meta:
-                print("⚠ Metadata non trovati: useremo vicini sintetici (shift dell'equirettangolare)")
-                links = None
-
-            links = None
-            if isinstance(meta, dict):
-                for key in ['Links', 'links', 'l', 'data']:
-                    if key in meta:
-                        # alcuni endpoint annidano i dati
-                        links = meta[key]
-                        break
-                if links is None and 'data' in meta and isinstance(meta['data'], dict):
-                    for key in ['Links', 'links', 'l']:
-                        if key in meta['data']:
-                            links = meta['data'][key]
-                            break
-
-            # Precompute sizes for synthetic neighbor creation if needed
-            width, height = base_image.size
-            ov_w = int(width * (overlap_percent / 100.0))
-            ov_h = int(height * (overlap_percent / 100.0))
-
-            if not links:
-                # Create synthetic neighbors by horizontally rolling the base image.
-                # This helps when metadata is not available but we still want a 'real' overlap.
-                print("⚠ Metadata non trovati: uso vicini sintetici ottenuti shiftando l'equirettangolare")
-                try:
-                    def roll_image(im, dx):
-                        w, h = im.size
-                        dx = int(dx) % w
-                        if dx == 0:
-                            return im.copy()
-                        left = im.crop((0, 0, dx, h))
-                        right = im.crop((dx, 0, w, h))
-                        new = Image.new('RGB', (w, h))
-                        new.paste(right, (0, 0))
-                        new.paste(left, (w - dx, 0))
-                        return new
-
-                    synth_shift = max(ov_w * 2, width // 4)
-                    neigh_left_img = roll_image(base_image, synth_shift)
-                    neigh_right_img = roll_image(base_image, -synth_shift)
-
-                    links = [
-                        {'img': neigh_left_img, 'side': 'left'},
-                        {'img': neigh_right_img, 'side': 'right'},
-                    ]
-                except Exception as e:
-                    print(f"⚠ Errore creazione vicini sintetici: {e}")
-                    return None
-
-            new_w = width + 2 * ov_w
-            new_h = height + 2 * ov_h
-            expanded = Image.new('RGB', (new_w, new_h))
-            offset_x = ov_w
-            offset_y = ov_h
-            expanded.paste(base_image, (offset_x, offset_y))
-
-            placed_left = False
-            placed_right = False
-
-            # ensure debug folder exists
-            dbg_folder = os.path.join('debug_outputs', 'true_overlap_debug')
-            try:
-                os.makedirs(dbg_folder, exist_ok=True)
-            except Exception:
-                dbg_folder = None
-
-            # links può essere lista di dict o array; iteriamo
-            for link in links:
-                try:
-                    # allow pre-supplied neighbor images (synthetic case)
-                    neigh_img = None
-                    yaw = None
-                    neighbor_panoid = None
-
-                    if isinstance(link, dict) and 'img' in link:
-                        neigh_img = link['img']
-                        yaw = link.get('yaw') or None
-                    else:
-                        if isinstance(link, dict):
-                            neighbor_panoid = link.get('pano') or link.get('panoid') or link.get('id')
-                            yaw = link.get('yaw') or link.get('heading')
-                        elif isinstance(link, (list, tuple)) and len(link) >= 2:
-                            neighbor_panoid = link[0]
-                            yaw = None
-
-                        if neighbor_panoid:
-                            neigh_img = self.download_equirectangular_pano(neighbor_panoid, zoom)
-
-                    if neigh_img is None:
-                        continue
-
-                    # se necessario scala verticalmente
-                    nw, nh = neigh_img.size
-                    if nh != height:
-                        neigh_scaled = neigh_img.resize((int(nw * (height / nh)), height), Image.Resampling.LANCZOS)
-                    else:
-                        neigh_scaled = neigh_img
-
-                    # Decide side basandosi su yaw oppure tentativo greedy
-                    side = None
-                    if yaw is not None:
-                        try:
-                            yawf = float(yaw) % 360
-                            if 45 <= yawf <= 135:
-                                side = 'right'
-                            elif 225 <= yawf <= 315:
-                                side = 'left'
-                        except Exception:
-                            side = None
-
-                    if side is None:
-                        side = 'right' if not placed_right else ('left' if not placed_left else None)
-
-                    if side == 'right' and not placed_right:
-                        crop = neigh_scaled.crop((0, 0, ov_w, height))
-                        crop = crop.resize((ov_w, height), Image.Resampling.LANCZOS)
-                        base_strip = base_image.crop((width - ov_w, 0, width, height))
-                        # Use OpenCV alignment + feather blending
-                        try:
-                            blended = self._align_and_feather_blend(base_strip, crop)
-                        except Exception as e:
-                            print(f"⚠ align/blend right failed: {e}")
-                            blended = Image.blend(base_strip, crop, alpha=0.5)
-
-                        expanded.paste(blended, (offset_x + width, offset_y))
-                        placed_right = True
-                        # save debug
-                        if dbg_folder:
-                            try:
-                                base_strip.save(os.path.join(dbg_folder, f"{panoid}_base_right_strip.jpg"))
-                                crop.save(os.path.join(dbg_folder, f"{panoid}_neigh_right_crop.jpg"))
-                                blended.save(os.path.join(dbg_folder, f"{panoid}_blended_right.jpg"))
-                            except Exception:
-                                pass
-
-                    elif side == 'left' and not placed_left:
-                        crop = neigh_scaled.crop((neigh_scaled.size[0] - ov_w, 0, neigh_scaled.size[0], height))
-                        crop = crop.resize((ov_w, height), Image.Resampling.LANCZOS)
-                        base_strip = base_image.crop((0, 0, ov_w, height))
-                        try:
-                            blended = self._align_and_feather_blend(base_strip, crop)
-                        except Exception as e:
-                            print(f"⚠ align/blend left failed: {e}")
-                            blended = Image.blend(base_strip, crop, alpha=0.5)
-
-                        expanded.paste(blended, (0, offset_y))
-                        placed_left = True
-                        if dbg_folder:
-                            try:
-                                base_strip.save(os.path.join(dbg_folder, f"{panoid}_base_left_strip.jpg"))
-                                crop.save(os.path.join(dbg_folder, f"{panoid}_neigh_left_crop.jpg"))
-                                blended.save(os.path.join(dbg_folder, f"{panoid}_blended_left.jpg"))
-                            except Exception:
-                                pass
-
-                    if placed_left and placed_right:
-                        break
-
-                except Exception:
-                    continue
-
-            if not (placed_left or placed_right):
-                return None
-
-            try:
-                self._fill_overlap_borders_v2(expanded, base_image, offset_x, offset_y, overlap_percent/100.0)
-            except Exception:
-                pass
-
-            return expanded
-
-        except Exception as e:
-            print(f"Errore _create_true_overlap: {e}")
-            return None
-
-    def _align_and_feather_blend(self, imgA, imgB, feather=0.2):
-        """Allinea imgB su imgA usando feature-matching (ORB) e applica un blending sfumato.
-
-        imgA, imgB: PIL Images (stesse dimensioni attese)
-        feather: frazione della larghezza su cui applicare la dissolvenza
-        """
-        # Fallback semplice se OpenCV non disponibile
-        if not HAS_OPENCV:
-            return Image.blend(imgA, imgB, alpha=0.5)
-
-        try:
-            import cv2
-            import numpy as np
-
-            a = np.array(imgA.convert('RGB'))
-            b = np.array(imgB.convert('RGB'))
-
-            grayA = cv2.cvtColor(a, cv2.COLOR_RGB2GRAY)
-            grayB = cv2.cvtColor(b, cv2.COLOR_RGB2GRAY)
-
-            # ORB features
-            # Create ORB detector (use getattr to keep static checkers happy)
-            orb_creator = getattr(cv2, 'ORB_create', None)
-            if orb_creator is None:
-                # ORB not available in this OpenCV build - fallback
-                return Image.blend(imgA, imgB, alpha=0.5)
-            orb = orb_creator(1000)
-
-            kp1, des1 = orb.detectAndCompute(grayA, None)
-            kp2, des2 = orb.detectAndCompute(grayB, None)
-
-            if des1 is None or des2 is None:
-                return Image.blend(imgA, imgB, alpha=0.5)
-
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-            matches = bf.match(des1, des2)
-            matches = sorted(matches, key=lambda x: x.distance)
-
-            if len(matches) < 8:
-                return Image.blend(imgA, imgB, alpha=0.5)
-
-            src_pts = np.array([kp2[m.trainIdx].pt for m in matches], dtype=np.float32).reshape(-1, 1, 2)
-            dst_pts = np.array([kp1[m.queryIdx].pt for m in matches], dtype=np.float32).reshape(-1, 1, 2)
-
-            M, mask = cv2.estimateAffinePartial2D(src_pts, dst_pts)
-            if M is None:
-                return Image.blend(imgA, imgB, alpha=0.5)
-
-            h, w = grayA.shape
-            warped = cv2.warpAffine(b, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
-
-            # Create feather mask horizontally
-            mask = np.zeros((h, w), dtype=np.float32)
-            fw = int(w * feather)
-            if fw < 1:
-                fw = 1
-            # Left to right fade
-            mask[:, :fw] = np.linspace(1.0, 0.0, fw)
-            mask[:, fw:w-fw] = 0.0
-            mask[:, w-fw:] = np.linspace(0.0, 1.0, fw)
-
-            # Combine with warped and original
-            warped_f = warped.astype(np.float32)
-            a_f = a.astype(np.float32)
-            alpha = mask[:, :, None]
-            # blended = a * (1-alpha) + warped * alpha  but we want seam across overlap area,
-            # so use alpha for warped contribution
-            blended = (a_f * (1.0 - alpha) + warped_f * alpha).astype(np.uint8)
-
-            return Image.fromarray(blended)
-
-        except Exception:
-            return Image.blend(imgA, imgB, alpha=0.5)
-    
-    def equirect_to_cubemap(self, equirect_image, face_size=None):
-        """Converte immagine equirettangolare in cubemap"""
-        try:
-            width, height = equirect_image.size
-            
-            # Dimensione automatica delle facce
-            if face_size is None:
-                face_size = height // 2
-            
-            # Le 6 facce del cubo
-            faces = {}
-            face_names = ['front', 'right', 'back', 'left', 'up', 'down']
-            
-            # Converte in array per elaborazione più veloce e usa campionamento bilineare
-            import numpy as np
-            if not HAS_NUMPY:
-                # Fallback senza numpy
-                return self.equirect_to_cubemap_simple(equirect_image, face_size)
-
-            img_array = np.array(equirect_image).astype(np.float32)
-
-            def bilinear_sample(xf, yf):
-                # xf, yf can be floats; wrap x horizontally, clamp y
-                # integer base indices (unwrapped for fractional computation)
-                x0_unwrapped = np.floor(xf).astype(int)
-                x0 = (x0_unwrapped % width).astype(int)
-                y0 = np.floor(yf).astype(int)
-                x1 = (x0 + 1) % width
-                y1 = np.clip(y0 + 1, 0, height - 1)
-
-                # fractional part (use unwrapped x0 for correct fraction)
-                wx = xf - x0_unwrapped
-                wy = yf - y0
-
-                # sample four neighbors
-                p00 = img_array[y0, x0]
-                p10 = img_array[y0, x1]
-                p01 = img_array[y1, x0]
-                p11 = img_array[y1, x1]
-
-                top = p00 * (1 - wx)[:, None] + p10 * (wx)[:, None]
-                bottom = p01 * (1 - wx)[:, None] + p11 * (wx)[:, None]
-                result = top * (1 - wy)[:, None] + bottom * (wy)[:, None]
-                return result
-
-            for i, face_name in enumerate(face_names):
-                # Special-case pragmatic fixes requested by user:
-                # - back: compose from rightmost + leftmost vertical strips (wrap-around) and resize
-                # - up / down: take top/bottom strips rather than full spherical re-projection (avoids central artefacts)
-                if face_name == 'back':
-                    # angular width per face = 90deg -> corresponds to width/4 pixels in equirect
-                    slice_w = max(1, width // 4)
-                    # include a small overlap (15% of slice) to be safe
-                    overlap_px = max(1, slice_w * 15 // 100)
-                    right_strip = equirect_image.crop((width - slice_w - overlap_px, 0, width, height))
-                    left_strip = equirect_image.crop((0, 0, slice_w + overlap_px, height))
-                    combined = Image.new('RGB', (left_strip.width + right_strip.width, height))
-                    # paste left then right to preserve original left/right ordering
-                    combined.paste(left_strip, (0, 0))
-                    combined.paste(right_strip, (left_strip.width, 0))
-                    # Resize combined horizontally to face_size and vertically to face_size
-                    face_img = combined.resize((face_size, face_size), Image.Resampling.LANCZOS)
-                    faces[face_name] = face_img
-                    continue
-
-                if face_name == 'up' or face_name == 'down':
-                    # take a tall strip from the top (up) or bottom (down) of the equirect and resize
-                    # choose strip height as ~35% of image height (empirical)
-                    strip_h = max(2, int(height * 0.35))
-                    if face_name == 'up':
-                        strip = equirect_image.crop((0, 0, width, strip_h))
-                    else:
-                        strip = equirect_image.crop((0, height - strip_h, width, height))
-                    # center-crop horizontally to width (already full width) and resize to square face
-                    face_img = strip.resize((face_size, face_size), Image.Resampling.LANCZOS)
-                    faces[face_name] = face_img
-                    continue
-
-                # Generic case: spherical reprojection with bilinear sampling
-                face = np.zeros((face_size, face_size, 3), dtype=np.uint8)
-
-                for v in range(face_size):
-                    uf = (np.arange(face_size, dtype=np.float32) + 0.5) / face_size
-                    vf = float(v + 0.5) / face_size
-
-                    # Converte coordinate cubo in coordinate sferiche
-                    thetas = np.empty(face_size, dtype=np.float32)
-                    phis = np.empty(face_size, dtype=np.float32)
-                    for idx, u_val in enumerate(uf):
-                        th, ph = self.cube_to_sphere_coords(float(u_val), float(vf), i)
-                        thetas[idx] = th
-                        phis[idx] = ph
-
-                    # Mappa su coordinate equirettangolari (float)
-                    xs = (thetas / (2 * math.pi) + 0.5) * width
-                    ys = (phis / math.pi) * height
-                    # ensure ys in [0, height-1]
-                    ys = np.clip(ys, 0, height - 1 - 1e-6)
-
-                    # Bilinear sampling per riga
-                    samples = bilinear_sample(xs, ys)
-                    face[v, :, :] = np.clip(samples, 0, 255).astype(np.uint8)
-
-                faces[face_name] = Image.fromarray(face)
-            
-            return faces
-            
-        except Exception as e:
-            print(f"Errore conversione cubemap: {e}")
-            # Fallback - crea facce vuote
-            return self.create_empty_cubemap(face_size or 512)
-    
-    def equirect_to_cubemap_simple(self, equirect_image, face_size):
-        """Versione semplificata senza numpy"""
-        width, height = equirect_image.size
-        faces = {}
-        face_names = ['front', 'right', 'back', 'left', 'up', 'down']
-        
-        for i, face_name in enumerate(face_names):
-            face = Image.new('RGB', (face_size, face_size))
-            
-            for v in range(face_size):
-                for u in range(face_size):
-                    uf = (u + 0.5) / face_size
-                    vf = (v + 0.5) / face_size
-                    
-                    theta, phi = self.cube_to_sphere_coords(uf, vf, i)
-                    
-                    x = int((theta / (2 * math.pi) + 0.5) * width) % width
-                    y = int((phi / math.pi) * height)
-                    y = max(0, min(height - 1, y))
-                    
-                    pixel = equirect_image.getpixel((x, y))
-                    face.putpixel((u, v), pixel)
-            
-            faces[face_name] = face
-        
-        return faces
-    
-    def cube_to_sphere_coords(self, u, v, face):
-        """Converte coordinate cubo in coordinate sferiche"""
-        # Normalizza a [-1, 1]
-        uu = u * 2.0 - 1.0
-        vv = v * 2.0 - 1.0
-
-        # Convert image Y (downward) to 3D Y (upward)
-        y_common = -vv
-
-        # Standard cube face mapping (assumes faces order: front, right, back, left, up, down)
-        if face == 0:  # front (+Z)
-            x, y, z = uu, y_common, 1.0
-        elif face == 1:  # right (+X)
-            x, y, z = 1.0, y_common, -uu
-        elif face == 2:  # back (-Z)
-            x, y, z = -uu, y_common, -1.0
-        elif face == 3:  # left (-X)
-            x, y, z = -1.0, y_common, uu
-        elif face == 4:  # up (+Y)
-            x, y, z = uu, 1.0, vv
-        elif face == 5:  # down (-Y)
-            x, y, z = uu, -1.0, -vv
-        else:
-            x, y, z = 1.0, 0.0, 0.0
-        
-        # Normalizza vettore
-        length = math.sqrt(x*x + y*y + z*z)
-        x, y, z = x/length, y/length, z/length
-        
-        # Converte in coordinate sferiche
-        theta = math.atan2(z, x)
-        phi = math.acos(max(-1, min(1, y)))  # Clamp per evitare errori numerici
-        
-        return theta, phi
-    
-    def create_empty_cubemap(self, face_size):
-        """Crea cubemap vuoto per fallback"""
-        faces = {}
-        face_names = ['front', 'right', 'back', 'left', 'up', 'down']
-        
-        for face_name in face_names:
-            faces[face_name] = Image.new('RGB', (face_size, face_size), color=(128, 128, 128))
-        
-        return faces
-    
     # ========================================================================================
     # METODI SALVATAGGIO
     # ========================================================================================
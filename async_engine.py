@@ -0,0 +1,147 @@
+"""
+Motore di download asyncio dei panorami
+Più panorami restano in volo contemporaneamente con un limite globale sulle richieste di tiles:
+un panorama con poche tiles da scaricare (photosphere, tiles già in cache) lascia la capacità
+libera agli altri invece di occuparne una quota fissa. Le singole tiles passano per
+TileFetcher.fetch_tile (cache, RetryPolicy con i budget, circuit breaker) e la griglia reale
+viene dalla ZoomProbe del fetcher.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DOWNLOAD_CONFIG
+from circuit_breaker import STATE_CLOSED
+from http_session import ensure_pool_size
+from retry_policy import pano_retry_budget
+
+
+class AsyncDownloadEngine:
+    """
+    Scarica le tiles dei panorami con asyncio
+
+    Tra le dipendenze non c'è un client HTTP asincrono: le richieste usano la sessione condivisa
+    (requests) in un pool di thread dedicato e un semaforo asyncio limita le tiles in volo.
+    """
+
+    def __init__(self, fetcher, max_inflight_tiles=None):
+        """
+        Args:
+            fetcher: TileFetcher delle singole tiles (cache, retry e budget, circuito, griglia)
+            max_inflight_tiles: Limite globale di richieste tiles contemporanee
+                                (None = DOWNLOAD_CONFIG['max_inflight_tiles'])
+        """
+        self.fetcher = fetcher
+        self.max_inflight_tiles = max(1, int(max_inflight_tiles or DOWNLOAD_CONFIG['max_inflight_tiles']))
+
+        # Una connessione keep-alive per ogni richiesta in volo
+        ensure_pool_size(self.max_inflight_tiles)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_inflight_tiles, thread_name_prefix="async-tile")
+
+        self._lock = threading.Lock()
+        # Un semaforo per event loop: il limite vale per tutti i panorami dello stesso loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Event loop in background del wrapper sincrono (avviato al primo uso)
+        self._loop = None
+        self._thread = None
+
+    def _semaphore(self):
+        """Semaforo delle tiles in volo per l'event loop corrente"""
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_inflight_tiles)
+        return semaphore
+
+    async def fetch_tile(self, panoid, x, y, zoom, pano_budget=None, absent=None):
+        """Scarica una tile (vedi TileFetcher.fetch_tile) rispettando il limite globale di richieste in volo"""
+        async with self._semaphore():
+            return await asyncio.get_event_loop().run_in_executor(
+                self._executor, self.fetcher.fetch_tile, panoid, x, y, zoom, pano_budget, absent)
+
+    async def fetch_tiles(self, panoid, zoom, tiles, pano_budget=None, absent=None):
+        """
+        Scarica in parallelo le tiles indicate
+
+        Returns:
+            dict: {(x, y): bytes JPEG oppure None se fallita}
+        """
+        async def fetch(x, y):
+            try:
+                return await self.fetch_tile(panoid, x, y, zoom, pano_budget, absent)
+            except Exception as e:
+                print(f"  ❌ Tile ({x},{y}) errore: {e}")
+                return None
+
+        results = await asyncio.gather(*(fetch(x, y) for x, y in tiles))
+        return dict(zip(tiles, results))
+
+    async def download_pano(self, panoid, zoom, should_stop=None):
+        """
+        Scarica tutte le tiles di un panorama
+
+        Con il circuito dell'endpoint aperto il panorama resta in attesa invece di produrre tiles
+        grigie; restano vuote solo le tiles dichiarate inesistenti (400/404).
+
+        Args:
+            panoid: PanoID del panorama
+            zoom: Livello di zoom (deve essere in ZOOM_GRID)
+            should_stop: Funzione senza argomenti; se restituisce True l'attesa del circuito si interrompe
+
+        Returns:
+            dict: {(x, y): bytes JPEG, oppure None per le tiles inesistenti}
+
+        Raises:
+            RuntimeError: attesa del circuito interrotta, o tiles non scaricate per errori temporanei
+                          a circuito chiuso (le tiles riuscite restano nella cache del fetcher)
+        """
+        loop = asyncio.get_event_loop()
+        tiles_x, tiles_y = await loop.run_in_executor(None, self.fetcher.grid, panoid, zoom)
+        missing = [(x, y) for y in range(tiles_y) for x in range(tiles_x)]
+        breaker = self.fetcher.breaker
+
+        tile_bytes = {}
+        while True:
+            if not await loop.run_in_executor(None, breaker.wait_until_available, should_stop):
+                raise RuntimeError("download interrotto con endpoint tiles non disponibile")
+            rejected = breaker.rejected
+            absent = set()
+            tile_bytes.update(await self.fetch_tiles(panoid, zoom, missing, pano_retry_budget(), absent))
+            missing = [tile for tile in missing if tile_bytes[tile] is None and tile not in absent]
+            if not missing:
+                return tile_bytes
+            # Circuito chiuso e nessuna richiesta respinta: errori temporanei sotto la soglia del
+            # circuito o budget di retry esaurito, non un endpoint giù da attendere
+            if breaker.state == STATE_CLOSED and breaker.rejected == rejected:
+                raise RuntimeError(f"{len(missing)} tiles non scaricate per errori temporanei")
+
+    def fetch_pano(self, panoid, zoom, should_stop=None):
+        """
+        Wrapper sincrono di download_pano, da chiamare da un thread qualsiasi (es. GUI Tk,
+        worker della pipeline): i panorami richiesti da thread diversi condividono il limite di tiles
+        """
+        return self._run(self.download_pano(panoid, zoom, should_stop))
+
+    def _run(self, coro):
+        """Esegue una coroutine nell'event loop in background e ne attende il risultato"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="async-engine", daemon=True)
+                self._thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def close(self):
+        """Ferma l'event loop in background e chiude il pool di thread delle richieste"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self._executor.shutdown(wait=False)
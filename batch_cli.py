@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Download multipli da riga di comando, senza interfaccia grafica (server, container, cron)
+
+Esempio:
+    python batch_cli.py lista.txt -o output --zoom 3 --format cubemap --concurrency 4
+
+Il progresso è scritto su stdout come JSON Lines (un oggetto per riga, campo "event");
+i messaggi di log vanno su stderr. Il batch riprende dal journal nella cartella di output.
+Exit code: 0 = tutti i panorami completati, 1 = almeno un fallimento, 2 = argomenti non validi.
+"""
+
+import argparse
+import contextlib
+import json
+import signal
+import sys
+import time
+
+from panoid_extractor import iter_panoids_from_file
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(
+        description="Scarica panorami Street View da un file lista di URL o PanoID (uno per riga)")
+    parser.add_argument('list_file', help="File con un URL Street View o un PanoID per riga ('#' = commento)")
+    parser.add_argument('-o', '--output', required=True, help="Cartella di output")
+    parser.add_argument('--zoom', type=int, default=2, choices=range(0, 6),
+                        help="Livello di zoom (0=512px ... 5=16384px, default 2)")
+    parser.add_argument('--format', dest='output_format', default='equirectangular',
+                        choices=['equirectangular', 'cubemap'], help="Formato di output")
+    parser.add_argument('--direct-cubemap', action='store_true',
+                        help="Cubemap campionato direttamente dalle tiles (meno memoria)")
+    parser.add_argument('--overlap', type=int, default=0, help="Overlap SfM in percentuale")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="Panorami scaricati in parallelo (default da PIPELINE_CONFIG)")
+    return parser.parse_args(argv)
+
+
+def read_panoids(path):
+    """
+    Legge il file lista (URL o PanoID scritti da soli, una riga alla volta)
+
+    Returns:
+        tuple: (lista di PanoID senza duplicati nell'ordine del file,
+                lista di righe senza PanoID riconoscibile)
+    """
+    panoids = []
+    invalid = []
+    for line, panoid in iter_panoids_from_file(path, allow_bare=True):
+        if panoid:
+            panoids.append(panoid)
+        else:
+            invalid.append(line)
+    return list(dict.fromkeys(panoids)), invalid
+
+
+def main(argv=None):
+    """Esegue il batch e restituisce l'exit code"""
+    args = parse_args(argv)
+    out = sys.stdout
+
+    def emit(event, **fields):
+        out.write(json.dumps({'event': event, **fields}) + "\n")
+        out.flush()
+
+    # Tutti i print delle librerie vanno su stderr: stdout resta JSON Lines
+    with contextlib.redirect_stdout(sys.stderr):
+        from streetview_core import StreetViewCore
+
+        core = StreetViewCore()
+        try:
+            panoids, invalid = read_panoids(args.list_file)
+        except OSError as e:
+            emit('error', message=f"File lista non leggibile: {e}")
+            return 2
+
+        for line in invalid:
+            emit('invalid', line=line)
+
+        # SIGINT/SIGTERM: nessun nuovo panorama, quelli in corso terminano e il journal resta coerente
+        stop_requested = []
+
+        def request_stop(signum, frame):
+            stop_requested.append(signum)
+
+        stop_signals = [signal.SIGINT] + ([signal.SIGTERM] if hasattr(signal, 'SIGTERM') else [])
+        previous_handlers = {signum: signal.signal(signum, request_stop) for signum in stop_signals}
+
+        from rate_limiter import get_rate_limiter
+        from circuit_breaker import get_circuit_breaker
+        limiter = get_rate_limiter()
+
+        # Cambi di stato dei circuiti (endpoint giù: il batch resta in pausa)
+        def on_circuit(endpoint, state):
+            emit('circuit', endpoint=endpoint, state=state)
+
+        breakers = [get_circuit_breaker(name) for name in ('tiles', 'metadata')]
+        for breaker in breakers:
+            breaker.add_listener(on_circuit)
+
+        def on_progress(completed, total, panoid, error):
+            emit('pano', panoid=panoid, status='failed' if error else 'done', error=error,
+                 completed=completed, total=total,
+                 requests_per_second=limiter.rate if limiter is not None else None)
+
+        emit('start', total=len(panoids), invalid=len(invalid), zoom=args.zoom,
+             format=args.output_format, output=args.output)
+        start = time.time()
+
+        try:
+            stats = core.batch_download(
+                panoids, args.output, args.zoom, args.output_format,
+                overlap_percent=args.overlap,
+                direct_cubemap=args.direct_cubemap,
+                fetch_workers=args.concurrency,
+                progress_callback=on_progress,
+                should_stop=lambda: bool(stop_requested))
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            for breaker in breakers:
+                breaker.remove_listener(on_circuit)
+
+        emit('summary', successful=stats['successful'], failed=stats['failed'],
+             skipped=stats['skipped'], already_done=stats['already_done'], invalid=len(invalid),
+             interrupted=bool(stop_requested), elapsed=round(time.time() - start, 3),
+             rate_limit=limiter.metrics() if limiter is not None else None,
+             metadata_cache=core.metadata_cache.stats())
+
+    return 0 if stats['failed'] == 0 and stats['skipped'] == 0 and not invalid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Journal SQLite dei download multipli
+Registra lo stato di ogni panorama (queued/fetching/done/failed), i tentativi e i file prodotti:
+un batch interrotto riprende saltando i panorami completati. Le tiles non vengono salvate qui ma
+nella cache su disco (tile_cache.TileCache), da cui la ripresa rilegge quelle già scaricate
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+# Stati di un panorama nel journal
+STATE_QUEUED = 'queued'
+STATE_FETCHING = 'fetching'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS panos (
+    panoid TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    base_name TEXT NOT NULL,
+    outputs TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (panoid, profile)
+);
+DROP TABLE IF EXISTS tiles;
+"""
+
+
+class BatchJournal:
+    """Stato persistente di un batch di panorami (sicuro tra thread)"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: File SQLite del journal (creato se non esiste)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: ogni aggiornamento è durevole senza bloccare le letture
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        """Esegue una scrittura e la rende persistente"""
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def _query(self, sql, params=()):
+        """Esegue una lettura"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def enqueue(self, panoids, profile, base_name_fn):
+        """
+        Registra i panorami di un batch e restituisce quelli ancora da elaborare
+
+        Args:
+            panoids: Lista di PanoID (l'ordine viene mantenuto, i duplicati contano una volta)
+            profile: Stringa che identifica le impostazioni del batch (zoom, formato, ...):
+                     un panorama completato con impostazioni diverse viene rielaborato
+            base_name_fn: Funzione (panoid) che restituisce il nome base dei file di output,
+                          usata solo alla prima registrazione (i file ripresi mantengono il nome)
+
+        Returns:
+            list: PanoID non ancora completati
+        """
+        panoids = list(dict.fromkeys(panoids))
+        now = time.time()
+        with self._lock:
+            known = dict(self._conn.execute(
+                "SELECT panoid, state FROM panos WHERE profile = ?", (profile,)).fetchall())
+            new_rows = []
+            for panoid in panoids:
+                if panoid not in known:
+                    known[panoid] = STATE_QUEUED
+                    new_rows.append((panoid, profile, STATE_QUEUED, base_name_fn(panoid), now))
+            self._conn.executemany(
+                "INSERT INTO panos (panoid, profile, state, base_name, updated_at) VALUES (?, ?, ?, ?, ?)",
+                new_rows)
+            self._conn.commit()
+
+        return [panoid for panoid in panoids if known[panoid] != STATE_DONE]
+
+    def base_name(self, panoid, profile):
+        """Nome base dei file di output registrato per il panorama"""
+        rows = self._query("SELECT base_name FROM panos WHERE panoid = ? AND profile = ?", (panoid, profile))
+        return rows[0][0] if rows else None
+
+    def mark_fetching(self, panoid, profile):
+        """Segna l'inizio di un tentativo di download"""
+        self._execute(
+            "UPDATE panos SET state = ?, attempts = attempts + 1, updated_at = ? WHERE panoid = ? AND profile = ?",
+            (STATE_FETCHING, time.time(), panoid, profile))
+
+    def mark_done(self, panoid, profile, outputs):
+        """
+        Segna un panorama come completato
+
+        Args:
+            outputs: Lista dei percorsi dei file scritti
+        """
+        self._execute(
+            "UPDATE panos SET state = ?, outputs = ?, error = NULL, updated_at = ? "
+            "WHERE panoid = ? AND profile = ?",
+            (STATE_DONE, json.dumps(list(outputs)), time.time(), panoid, profile))
+
+    def mark_failed(self, panoid, profile, error):
+        """Segna un panorama come fallito (le tiles già scaricate restano nella cache delle tiles)"""
+        self._execute(
+            "UPDATE panos SET state = ?, error = ?, updated_at = ? WHERE panoid = ? AND profile = ?",
+            (STATE_FAILED, str(error), time.time(), panoid, profile))
+
+    def pano_info(self, panoid, profile):
+        """
+        Stato registrato di un panorama
+
+        Returns:
+            dict: {'state', 'attempts', 'base_name', 'outputs', 'error'} oppure None
+        """
+        rows = self._query(
+            "SELECT state, attempts, base_name, outputs, error FROM panos WHERE panoid = ? AND profile = ?",
+            (panoid, profile))
+        if not rows:
+            return None
+        state, attempts, base_name, outputs, error = rows[0]
+        return {
+            'state': state,
+            'attempts': attempts,
+            'base_name': base_name,
+            'outputs': json.loads(outputs) if outputs else [],
+            'error': error,
+        }
+
+    def summary(self, profile):
+        """Numero di panorami per stato: {state: count}"""
+        rows = self._query("SELECT state, COUNT(*) FROM panos WHERE profile = ? GROUP BY state", (profile,))
+        return dict(rows)
+
+    def close(self):
+        """Chiude il database"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,170 @@
+"""
+Circuit breaker per gli endpoint di Google Street View (tiles, metadata)
+Dopo N errori consecutivi il circuito si apre: le richieste falliscono subito invece di attendere
+timeout e retry; trascorso il tempo di riposo una richiesta di prova (half-open) verifica se
+l'endpoint è tornato disponibile
+"""
+
+import threading
+import time
+
+from config import CIRCUIT_BREAKER_CONFIG
+
+# Stati del circuito
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuito di un endpoint (thread-safe)"""
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None, half_open_probes=None):
+        """
+        Args:
+            name: Nome dell'endpoint (es. 'tiles')
+            failure_threshold: Errori consecutivi che aprono il circuito
+                               (None = CIRCUIT_BREAKER_CONFIG['failure_threshold'])
+            reset_timeout: Secondi di circuito aperto prima della prova
+                           (None = CIRCUIT_BREAKER_CONFIG['reset_timeout'])
+            half_open_probes: Richieste di prova ammesse contemporaneamente
+                              (None = CIRCUIT_BREAKER_CONFIG['half_open_probes'])
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold or CIRCUIT_BREAKER_CONFIG['failure_threshold']))
+        self.reset_timeout = float(reset_timeout if reset_timeout is not None
+                                   else CIRCUIT_BREAKER_CONFIG['reset_timeout'])
+        self.half_open_probes = max(1, int(half_open_probes or CIRCUIT_BREAKER_CONFIG['half_open_probes']))
+
+        self._condition = threading.Condition()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._listeners = []
+
+        # Metriche
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self):
+        """Stato corrente (STATE_CLOSED, STATE_OPEN o STATE_HALF_OPEN)"""
+        with self._condition:
+            return self._state
+
+    def add_listener(self, callback):
+        """Registra una funzione callback(name, state) chiamata a ogni cambio di stato"""
+        with self._condition:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Rimuove una funzione registrata con add_listener"""
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _can_request(self, now):
+        """True se una richiesta può partire ora (lock già acquisito)"""
+        if self._state == STATE_CLOSED:
+            return True
+        if self._state == STATE_OPEN:
+            return now - self._opened_at >= self.reset_timeout
+        return self._probes < self.half_open_probes
+
+    def allow_request(self):
+        """
+        Chiede il permesso per una richiesta
+
+        Returns:
+            bool: False se il circuito è aperto (la richiesta deve fallire subito)
+        """
+        changed = None
+        with self._condition:
+            if not self._can_request(time.monotonic()):
+                self.rejected += 1
+                return False
+            if self._state == STATE_OPEN:
+                changed = self._set_state(STATE_HALF_OPEN)
+            if self._state == STATE_HALF_OPEN:
+                self._probes += 1
+        self._notify(changed)
+        return True
+
+    def record_success(self):
+        """Registra una risposta valida dell'endpoint: il circuito si chiude"""
+        changed = None
+        with self._condition:
+            self._failures = 0
+            if self._state != STATE_CLOSED:
+                self._probes = 0
+                changed = self._set_state(STATE_CLOSED)
+        self._notify(changed)
+
+    def record_failure(self):
+        """Registra un errore dell'endpoint (rete, timeout, 5xx)"""
+        changed = None
+        with self._condition:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or (
+                    self._state == STATE_CLOSED and self._failures >= self.failure_threshold):
+                self._probes = 0
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                changed = self._set_state(STATE_OPEN)
+        self._notify(changed)
+
+    def wait_until_available(self, should_stop=None, poll_interval=0.5):
+        """
+        Attende finché una richiesta può partire (circuito chiuso o prova consentita)
+
+        Args:
+            should_stop: Funzione senza argomenti; se restituisce True l'attesa termina
+            poll_interval: Intervallo massimo tra due controlli di should_stop (secondi)
+
+        Returns:
+            bool: True se una richiesta può partire, False se interrotta da should_stop
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._can_request(now):
+                    return True
+                if should_stop and should_stop():
+                    return False
+                timeout = poll_interval
+                if self._state == STATE_OPEN:
+                    timeout = min(timeout, self._opened_at + self.reset_timeout - now)
+                self._condition.wait(max(0.01, timeout))
+
+    def _set_state(self, state):
+        """Cambia stato e risveglia i thread in attesa (lock già acquisito)"""
+        self._state = state
+        self._condition.notify_all()
+        return state
+
+    def _notify(self, state):
+        """Avvisa i listener di un cambio di stato (fuori dal lock)"""
+        if state is None:
+            return
+        print(f"⚡ Circuito '{self.name}': {state}")
+        with self._condition:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(self.name, state)
+            except Exception as e:
+                print(f"Errore listener circuito: {e}")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """Restituisce il circuito condiviso dal processo per un endpoint ('tiles', 'metadata')"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
@@ -2,23 +2,55 @@
 Configurazione per il Google Street View Downloader
 """
 
+import os
+
+# Cartella dell'applicazione: i percorsi su disco non dipendono dalla directory di avvio
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Configurazioni per il download
 DOWNLOAD_CONFIG = {
     # Timeout per le richieste HTTP (secondi)
     'request_timeout': 10,
     
+    # Timeout per le richieste HEAD di validazione PanoID (secondi)
+    'validate_timeout': 5,
+    
+    # Validazioni PanoID (HEAD) eseguite in parallelo
+    'validate_workers': 16,
+    
     # Numero massimo di retry per download falliti
     'max_retries': 3,
     
     # Intervallo tra i retry (secondi)
     'retry_delay': 1,
     
+    # Numero massimo di tiles scaricate in parallelo per panorama
+    'max_workers': 8,
+    
+    # Download multipli: limite globale di richieste tiles in volo
+    'max_inflight_tiles': 16,
+    
+    # Griglia reale di tiles rilevata per ogni panorama (photosphere con dimensioni non standard)
+    'probe_grid': True,
+    
+    # Richieste HEAD in parallelo per ogni passo della ricerca di zoom e griglia
+    'probe_concurrency': 4,
+    
+    # Cubemap generato direttamente dalle tiles, una faccia alla volta (senza mosaico equirettangolare)
+    'direct_cubemap': False,
+    
     # Qualità JPEG per il salvataggio (1-100)
     'jpeg_quality': 95,
     
     # Dimensione massima dell'anteprima (pixel)
     'preview_size': (400, 200),
     
+    # Download progressivo: anteprima immediata dallo zoom basso, poi aggiornata con le tiles
+    # dello zoom richiesto man mano che arrivano (al massimo una volta ogni preview_interval secondi)
+    'progressive_preview': True,
+    'preview_zoom': 1,
+    'preview_interval': 0.25,
+    
     # User-Agent per le richieste HTTP
     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
@@ -71,7 +103,10 @@ UI_CONFIG = {
         'title': ('Arial', 16, 'bold'),
         'normal': ('Arial', 10),
         'small': ('Arial', 8)
-    }
+    },
+    
+    # Aggiornamenti dell'interfaccia dai thread di lavoro al secondo (ui_bus.ProgressBus)
+    'progress_fps': 20
 }
 
 # URL e endpoint per l'API Street View
@@ -152,6 +187,117 @@ DEBUG_CONFIG = {
     'keep_temp_files': False
 }
 
+# Configurazioni della cache locale delle tiles
+CACHE_CONFIG = {
+    # Abilitare la cache su disco delle tiles scaricate
+    'enabled': True,
+    
+    # Directory della cache (nella cartella dell'applicazione: GUI, CLI e cron condividono le tiles)
+    'cache_dir': os.path.join(APP_DIR, 'tile_cache'),
+    
+    # Dimensione massima della cache (MB), oltre la quale si eliminano le tiles meno usate
+    'max_size_mb': 2048,
+    
+    # Cache dei metadata dei panorami (file SQLite nella cartella della cache)
+    'metadata_cache_name': 'metadata_cache.sqlite',
+    
+    # Validità dei metadata in cache (secondi) e dei metadata non disponibili (cache negativa)
+    'metadata_ttl': 7 * 24 * 3600,
+    'metadata_negative_ttl': 3600,
+    
+    # Metadata mantenuti in memoria
+    'metadata_memory_entries': 10000,
+    
+    # Memoria massima per le mappe di proiezione cubemap precalcolate (MB)
+    'projection_cache_mb': 512,
+    
+    # Directory per le mappe di proiezione .npy su disco ('' = solo in memoria)
+    'projection_cache_dir': ''
+}
+
+# Configurazioni conversioni panoramiche
+CONVERSION_CONFIG = {
+    # Memoria massima (MB) per i temporanei di calcolo: le conversioni grandi vengono
+    # elaborate a bande di righe per rientrare nel limite
+    'memory_budget_mb': 256,
+    
+    # Thread per la conversione in parallelo delle facce del cubemap (0 = uno per core, max 6)
+    'workers': 0
+}
+
+# Configurazioni pipeline dei download multipli
+PIPELINE_CONFIG = {
+    # Panorami in attesa ammessi davanti a ogni stadio (oltre, lo stadio precedente si ferma)
+    'queue_size': 2,
+    
+    # Journal SQLite creato nella cartella di output per riprendere i batch interrotti
+    'journal_name': 'batch_journal.sqlite',
+    
+    # Thread per stadio: download tiles, ricostruzione, proiezione, codifica JPEG, scrittura
+    'workers': {
+        'fetch': 3,
+        'assemble': 1,
+        'convert': 1,
+        'encode': 2,
+        'write': 1
+    }
+}
+
+# Politica di retry delle richieste (tentativi e attesa base da DOWNLOAD_CONFIG['max_retries']/['retry_delay'])
+RETRY_CONFIG = {
+    # Status temporanei da ritentare; gli altri status (es. 404 = tile inesistente) sono definitivi
+    'retry_statuses': (408, 429, 500, 502, 503, 504),
+    
+    # Attesa massima tra due tentativi (secondi); l'attesa raddoppia a ogni retry, con jitter
+    'max_delay': 10,
+    
+    # Retry massimi per panorama (su tutte le sue tiles)
+    'pano_retry_budget': 16,
+    
+    # Retry per batch: minimo garantito più una quota delle richieste effettuate
+    'batch_retry_min': 20,
+    'batch_retry_ratio': 0.1
+}
+
+# Circuit breaker degli endpoint tiles e metadata
+CIRCUIT_BREAKER_CONFIG = {
+    # Errori consecutivi (rete, timeout, 5xx) che aprono il circuito
+    'failure_threshold': 10,
+    
+    # Secondi di circuito aperto prima di una richiesta di prova
+    'reset_timeout': 30,
+    
+    # Richieste di prova contemporanee con circuito semi-aperto
+    'half_open_probes': 1
+}
+
+# Limitatore di velocità adattivo condiviso da tutte le richieste HTTP
+RATE_LIMIT_CONFIG = {
+    # Abilitare il limitatore (False = nessuna attesa tra le richieste)
+    'enabled': True,
+    
+    # Velocità iniziale e limiti dell'adattamento (richieste al secondo)
+    'requests_per_second': 50,
+    'min_requests_per_second': 1,
+    'max_requests_per_second': 200,
+    
+    # Richieste ammesse in raffica dopo una pausa
+    'burst': 8,
+    
+    # Limite di banda in byte al secondo (0 = illimitato)
+    'bytes_per_second': 0,
+    
+    # Su 429/503 la velocità viene moltiplicata per questo fattore (al massimo una volta per finestra)
+    'backoff_factor': 0.5,
+    'backoff_cooldown': 1.0,
+    
+    # Richieste al secondo aggiunte a ogni risposta riuscita
+    'ramp_up_step': 0.5,
+    
+    # Pausa massima (secondi) accettata dall'header Retry-After
+    'max_pause': 30
+}
+
 # Messaggi dell'interfaccia (per internazionalizzazione futura)
 MESSAGES = {
     'ready': 'Pronto',
@@ -0,0 +1,93 @@
+"""
+Sessione HTTP condivisa per tutte le richieste verso Google Street View
+Mantiene le connessioni aperte (keep-alive) e un pool dimensionato sulla concorrenza del download
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import DOWNLOAD_CONFIG
+from rate_limiter import get_rate_limiter
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def _build_session(pool_size):
+    """Crea una sessione con pool di connessioni e header da DOWNLOAD_CONFIG"""
+    session = requests.Session()
+    session.headers.update({'User-Agent': DOWNLOAD_CONFIG['user_agent']})
+
+    # Il retry è gestito dai chiamanti: l'adapter non ritenta da solo
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Restituisce la sessione HTTP condivisa (creata alla prima richiesta)"""
+    global _session, _pool_size
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _pool_size = DOWNLOAD_CONFIG['max_workers']
+                _session = _build_session(_pool_size)
+    return _session
+
+
+def configure_session(pool_size):
+    """
+    Ricrea la sessione condivisa con un pool di connessioni diverso
+
+    Args:
+        pool_size: Numero di connessioni mantenute per host
+                   (deve essere almeno pari al numero di richieste in parallelo)
+    """
+    global _session, _pool_size
+    with _session_lock:
+        # La vecchia sessione non viene chiusa: eventuali richieste in corso terminano normalmente
+        _pool_size = max(1, int(pool_size))
+        _session = _build_session(_pool_size)
+    return _session
+
+
+def ensure_pool_size(pool_size):
+    """Allarga il pool della sessione condivisa se la concorrenza richiesta lo supera"""
+    get_session()
+    if pool_size > _pool_size:
+        configure_session(pool_size)
+
+
+def _limited_request(method, url, timeout, **kwargs):
+    """Esegue una richiesta rispettando il limitatore di velocità condiviso"""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return getattr(get_session(), method)(url, timeout=timeout, **kwargs)
+
+    limiter.acquire()
+    try:
+        response = getattr(get_session(), method)(url, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        limiter.on_error()
+        raise
+    limiter.on_response(response.status_code, response.headers.get('Retry-After'))
+    limiter.record_bytes(len(response.content))
+    return response
+
+
+def http_get(url, timeout=None, **kwargs):
+    """GET tramite la sessione condivisa (timeout di default da DOWNLOAD_CONFIG)"""
+    if timeout is None:
+        timeout = DOWNLOAD_CONFIG['request_timeout']
+    return _limited_request('get', url, timeout, **kwargs)
+
+
+def http_head(url, timeout=None, **kwargs):
+    """HEAD tramite la sessione condivisa (timeout di default per le validazioni)"""
+    if timeout is None:
+        timeout = DOWNLOAD_CONFIG['validate_timeout']
+    return _limited_request('head', url, timeout, **kwargs)
@@ -28,6 +28,7 @@ TRANSLATIONS = {
         'sv_format_label': 'Formato Output:',
         'sv_format_equirect': 'Equirettangolare',
         'sv_format_cubemap': 'Cubemap',
+        'sv_direct_cubemap': 'Cubemap diretto dalle tiles (meno memoria)',
         'sv_preview_title': 'Anteprima',
         
         # Sezione File Locali
@@ -128,6 +129,7 @@ TRANSLATIONS = {
         'sv_format_label': 'Output Format:',
         'sv_format_equirect': 'Equirectangular',
         'sv_format_cubemap': 'Cubemap',
+        'sv_direct_cubemap': 'Direct cubemap from tiles (less memory)',
         'sv_preview_title': 'Preview',
         
         # Local Files section
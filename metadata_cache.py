@@ -0,0 +1,154 @@
+"""
+Cache dei metadata dei panorami (link ai vicini, posizione)
+Memoria LRU più copia persistente SQLite, indicizzate per PanoID, con scadenza (TTL);
+anche i metadata non disponibili vengono memorizzati (cache negativa, con TTL più breve)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_CONFIG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    panoid TEXT PRIMARY KEY,
+    data TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class MetadataCache:
+    """Cache dei metadata per PanoID (sicura tra thread)"""
+
+    def __init__(self, path=None, ttl=None, negative_ttl=None, max_entries=None):
+        """
+        Args:
+            path: File SQLite della cache persistente (None = solo in memoria)
+            ttl: Validità in secondi dei metadata (None = CACHE_CONFIG['metadata_ttl'])
+            negative_ttl: Validità in secondi di un metadata non disponibile
+                          (None = CACHE_CONFIG['metadata_negative_ttl'])
+            max_entries: Voci mantenute in memoria (None = CACHE_CONFIG['metadata_memory_entries'])
+        """
+        self.path = path
+        self.ttl = float(ttl if ttl is not None else CACHE_CONFIG['metadata_ttl'])
+        self.negative_ttl = float(negative_ttl if negative_ttl is not None
+                                  else CACHE_CONFIG['metadata_negative_ttl'])
+        self.max_entries = max(1, int(max_entries or CACHE_CONFIG['metadata_memory_entries']))
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # panoid -> (data o None, fetched_at), dal meno al più recente
+        self._conn = None
+
+        if path:
+            try:
+                folder = os.path.dirname(path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+                # Le voci scadute non servono più a nessuna sessione
+                self._conn.execute(
+                    "DELETE FROM metadata WHERE fetched_at < ? OR (data IS NULL AND fetched_at < ?)",
+                    (time.time() - self.ttl, time.time() - self.negative_ttl))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠ Cache metadata su disco non disponibile: {e}")
+                self._conn = None
+
+    def _expired(self, data, fetched_at, now):
+        """True se la voce è scaduta"""
+        ttl = self.ttl if data is not None else self.negative_ttl
+        return now - fetched_at > ttl
+
+    def get(self, panoid):
+        """
+        Legge i metadata di un panorama
+
+        Returns:
+            tuple: (trovato, metadata); trovato è True anche per i metadata non disponibili
+                   memorizzati (metadata = None)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(panoid)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT data, fetched_at FROM metadata WHERE panoid = ?", (panoid,)).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]) if row[0] is not None else None, row[1])
+                    self._remember(panoid, entry)
+
+            if entry is None or self._expired(entry[0], entry[1], now):
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(panoid)
+            if entry[0] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, entry[0]
+
+    def put(self, panoid, data):
+        """
+        Memorizza i metadata di un panorama
+
+        Args:
+            data: Metadata (serializzabili in JSON), oppure None se non disponibili
+        """
+        entry = (data, time.time())
+        with self._lock:
+            self._remember(panoid, entry)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO metadata (panoid, data, fetched_at) VALUES (?, ?, ?)",
+                        (panoid, json.dumps(data) if data is not None else None, entry[1]))
+                    self._conn.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    print(f"⚠ Impossibile salvare metadata in cache: {e}")
+
+    def _remember(self, panoid, entry):
+        """Aggiunge una voce in memoria eliminando le meno usate (lock già acquisito)"""
+        self._entries[panoid] = entry
+        self._entries.move_to_end(panoid)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Contatori della cache: {'hits', 'negative_hits', 'misses', 'entries'}"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+            }
+
+    def clear(self):
+        """Svuota la cache in memoria e su disco"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM metadata")
+                self._conn.commit()
+
+    def close(self):
+        """Chiude il database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,192 @@
+"""
+Estrazione dei PanoID da URL e testo
+Un'unica espressione regolare precompilata (alternanza di config.PANOID_PATTERNS) analizza ogni
+stringa in una sola passata, invece di un re.search per pattern. Include un'API a flusso per
+file di URL molto grandi.
+
+Benchmark: python panoid_extractor.py [numero_righe]
+"""
+
+import re
+import sys
+import time
+
+from config import PANOID_PATTERNS
+
+# Prefisso letterale di un pattern (caratteri normali ed escape di simboli, es. \\&)
+_LITERAL_PREFIX = re.compile(r'(?:\\[^A-Za-z0-9]|[^\\.^$*+?{}\[\]()|])*')
+
+
+def _literal_prefix(pattern):
+    """Divide un pattern in (prefisso letterale senza escape, resto del pattern)"""
+    end = _LITERAL_PREFIX.match(pattern).end()
+    # Un quantificatore si applica all'ultimo carattere, che quindi non è letterale
+    while end and end < len(pattern) and pattern[end] in '*+?{':
+        end -= 2 if end >= 2 and pattern[end - 2] == '\\' else 1
+    return re.sub(r'\\(.)', r'\1', pattern[:end]), pattern[end:]
+
+
+def _compile_patterns(patterns):
+    """
+    Compila i pattern in un'unica espressione regolare
+
+    I prefissi letterali comuni vengono raccolti in un albero (es. '"pano":"', '"panoid":"' e
+    '"panoId":"' condividono '"pano'): il motore confronta ogni prefisso una sola volta invece
+    di provare a ogni posizione tutte le alternative. A parità di posizione le alternative
+    restano nell'ordine dei pattern.
+
+    Returns:
+        tuple: (regex compilata, lista indice pattern per numero di gruppo)
+    """
+    root = {}
+    for index, pattern in enumerate(patterns):
+        if re.compile(pattern).groups != 1:
+            raise ValueError(f"Il pattern PanoID deve avere un solo gruppo: {pattern}")
+        prefix, rest = _literal_prefix(pattern)
+        node = root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append((index, rest))
+
+    group_index = []
+
+    def first_index(node):
+        return min([i for i, _ in node.get(None, [])] +
+                   [first_index(child) for key, child in node.items() if key is not None])
+
+    def emit(node):
+        branches = [(index, rest, None) for index, rest in node.get(None, [])]
+        branches += [(first_index(child), char, child) for char, child in node.items() if char is not None]
+        parts = []
+        for index, text, child in sorted(branches, key=lambda branch: branch[0]):
+            if child is None:
+                group_index.append(index)
+                parts.append(text)
+                continue
+            # Catena di nodi con un solo figlio: un unico letterale
+            while len(child) == 1 and None not in child:
+                (char, child), = child.items()
+                text += char
+            parts.append(re.escape(text) + emit(child))
+        if len(parts) == 1:
+            return parts[0]
+        return '(?:' + '|'.join(parts) + ')'
+
+    return re.compile(emit(root)), group_index
+
+
+# Tutti i pattern in una sola espressione: il numero del gruppo che ha trovato la corrispondenza
+# (lastindex) indica il pattern
+PANOID_REGEX, _GROUP_PATTERN = _compile_patterns(PANOID_PATTERNS)
+
+# PanoID scritto da solo (senza URL), es. una riga di un file lista
+BARE_PANOID_REGEX = re.compile(r'[a-zA-Z0-9_-]{20,}')
+
+# Pattern compilati singolarmente, solo per il confronto del benchmark
+_SEQUENTIAL_PATTERNS = tuple(re.compile(pattern) for pattern in PANOID_PATTERNS)
+
+
+def extract_panoid(text):
+    """
+    Estrae il PanoID da un URL o da un testo
+
+    Se il testo contiene più forme di PanoID vince la prima nel testo; a parità di posizione
+    vale l'ordine di PANOID_PATTERNS.
+
+    Returns:
+        str: PanoID, oppure None se non trovato
+    """
+    match = PANOID_REGEX.search(text)
+    return match.group(match.lastindex) if match else None
+
+
+def find_panoids(text):
+    """
+    Tutti i PanoID di un testo raggruppati per pattern, in una sola passata
+
+    Returns:
+        dict: {indice pattern (da 0): lista di PanoID nell'ordine del testo}
+    """
+    found = {}
+    for match in PANOID_REGEX.finditer(text):
+        found.setdefault(_GROUP_PATTERN[match.lastindex - 1], []).append(match.group(match.lastindex))
+    return found
+
+
+def iter_panoids(lines, allow_bare=False, skip_comments=True):
+    """
+    Estrae i PanoID da una sequenza di righe senza caricarle tutte in memoria
+
+    Args:
+        lines: Iterabile di stringhe (es. un file aperto in lettura)
+        allow_bare: Accetta righe composte dal solo PanoID
+        skip_comments: Salta le righe vuote e quelle che iniziano con '#'
+
+    Yields:
+        tuple: (riga senza spazi iniziali/finali, PanoID oppure None)
+    """
+    search = PANOID_REGEX.search
+    bare_match = BARE_PANOID_REGEX.fullmatch
+    for line in lines:
+        line = line.strip()
+        if skip_comments and (not line or line.startswith('#')):
+            continue
+        if allow_bare and bare_match(line):
+            yield line, line
+            continue
+        match = search(line)
+        yield line, match.group(match.lastindex) if match else None
+
+
+def iter_panoids_from_file(path, allow_bare=False, encoding='utf-8'):
+    """Come iter_panoids, leggendo un file riga per riga"""
+    with open(path, 'r', encoding=encoding, errors='replace') as f:
+        yield from iter_panoids(f, allow_bare=allow_bare)
+
+
+def _extract_sequential(text):
+    """Estrazione con un re.search per pattern (riferimento per il benchmark)"""
+    for pattern in _SEQUENTIAL_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+
+def benchmark(line_count=200000, repeat=3):
+    """
+    Confronta l'estrazione a passata singola con quella a pattern sequenziali
+
+    Args:
+        line_count: Righe di prova (URL di forme diverse, un quarto senza PanoID)
+        repeat: Ripetizioni per metodo; vale la più veloce
+
+    Returns:
+        dict: righe al secondo per metodo {'sequential', 'single_pass', 'bulk'}
+    """
+    samples = [
+        "https://www.google.com/maps/@45.4642,9.19,3a,75y,90t/data=!3m6!1e1!3m4!1s{}!2e0!7i16384!8i8192",
+        "https://www.google.com/maps/@?api=1&map_action=pano&pano={}",
+        "https://maps.google.com/cbk?output=json&panoid={}",
+        "https://www.google.com/maps/place/Duomo+di+Milano/@45.4641,9.1919,17z",
+    ]
+    lines = [samples[i % len(samples)].format(f"{i:022d}") for i in range(line_count)]
+
+    results = {}
+    for name, run in (
+            ('sequential', lambda: [_extract_sequential(line) for line in lines]),
+            ('single_pass', lambda: [extract_panoid(line) for line in lines]),
+            ('bulk', lambda: list(iter_panoids(lines)))):
+        best = float('inf')
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        results[name] = line_count / best
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for method, rate in benchmark(count).items():
+        print(f"{method:12s} {rate:12,.0f} righe/s")
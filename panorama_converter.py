@@ -4,10 +4,14 @@ Supporta conversioni equirettangolare ↔ cubemap con algoritmi ottimizzati
 """
 
 import math
+import multiprocessing
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import glob
 
+from config import CONVERSION_CONFIG
+
 # Import opzionali con gestione errore Intel MKL
 HAS_NUMPY = False
 HAS_OPENCV = False
@@ -47,10 +51,46 @@ except Exception as e:
         HAS_OPENCV = False
 
 
+# Interpolazioni disponibili per il backend OpenCV (method='cv2')
+CV2_INTERPOLATIONS = ('nearest', 'linear', 'cubic', 'area')
+
+# Pixel di bordo aggiunti attorno alle sorgenti prima di cv2.remap
+# (wrap orizzontale sulla cucitura equirettangolare, sufficiente anche per l'interpolazione cubica)
+CV2_REMAP_PAD = 4
+
+# Stima dei bytes di temporanei NumPy (float64, maschere) per pixel di output nel calcolo
+# delle proiezioni: dimensiona le bande di righe entro il budget di memoria
+BAND_BYTES_PER_PIXEL = 224
+
+
+def row_bands(rows, row_pixels, memory_budget, bytes_per_pixel=BAND_BYTES_PER_PIXEL):
+    """
+    Suddivide le righe di output in bande (start, stop) i cui temporanei rientrano nel budget
+
+    Args:
+        rows: Righe di output
+        row_pixels: Pixel per riga
+        memory_budget: Memoria massima per i temporanei di una banda (bytes)
+        bytes_per_pixel: Stima dei bytes di temporanei per pixel di output
+    """
+    band_rows = max(1, int(memory_budget) // (row_pixels * bytes_per_pixel))
+    for start in range(0, rows, band_rows):
+        yield start, min(rows, start + band_rows)
+
+
 class PanoramaConverter:
     """Classe per conversioni tra formati panoramici"""
     
-    def __init__(self):
+    def __init__(self, memory_budget_mb=None):
+        """
+        Args:
+            memory_budget_mb: Memoria massima per i temporanei di calcolo
+                              (None = CONVERSION_CONFIG['memory_budget_mb'])
+        """
+        if memory_budget_mb is None:
+            memory_budget_mb = CONVERSION_CONFIG['memory_budget_mb']
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        
         self.face_names = ['front', 'right', 'back', 'left', 'up', 'down']
         self.face_vectors = {
             'front': (1, 0, 0),   # +X
@@ -61,14 +101,76 @@ class PanoramaConverter:
             'down': (0, -1, 0)    # -Y
         }
     
-    def equirectangular_to_cubemap(self, equirect_image, face_size=None, method='fast'):
+    def _row_bands(self, rows, row_pixels):
+        """Suddivide le righe di output in bande (start, stop) i cui temporanei rientrano nel budget"""
+        return row_bands(rows, row_pixels, self.memory_budget)
+    
+    def _resolve_workers(self, workers):
+        """Numero di thread per le facce (None = CONVERSION_CONFIG['workers'], 0 = uno per core)"""
+        if workers is None:
+            workers = CONVERSION_CONFIG['workers']
+        if not workers:
+            workers = os.cpu_count() or 1
+        return max(1, min(int(workers), len(self.face_names)))
+    
+    def _map_faces(self, face_fn, workers):
+        """
+        Calcola le facce in parallelo (i kernel NumPy/OpenCV rilasciano il GIL)
+        
+        Args:
+            face_fn: Funzione (face_index) che restituisce l'array uint8 della faccia
+            workers: Numero di thread (vedi _resolve_workers)
+        
+        Returns:
+            dict: {face_name: PIL_Image}
+        """
+        workers = self._resolve_workers(workers)
+        face_indices = range(len(self.face_names))
+        if workers == 1:
+            face_arrays = [face_fn(i) for i in face_indices]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cubemap-face") as executor:
+                face_arrays = list(executor.map(face_fn, face_indices))
+        return {face_name: Image.fromarray(face_array)
+                for face_name, face_array in zip(self.face_names, face_arrays)}
+    
+    def _resolve_method(self, method):
+        """Sceglie il backend di conversione ('auto' = OpenCV se disponibile)"""
+        if method == 'auto':
+            if HAS_OPENCV and HAS_NUMPY:
+                return 'cv2'
+            return 'quality' if HAS_NUMPY else 'fast'
+        if method == 'cv2' and not (HAS_OPENCV and HAS_NUMPY):
+            print("⚠ OpenCV non disponibile - uso conversione NumPy")
+            return 'quality' if HAS_NUMPY else 'fast'
+        return method
+    
+    def _cv2_interpolation(self, interpolation):
+        """Converte il nome dell'interpolazione nel flag OpenCV"""
+        if interpolation not in CV2_INTERPOLATIONS:
+            raise ValueError(f"Interpolazione non supportata: {interpolation} "
+                             f"(valori ammessi: {', '.join(CV2_INTERPOLATIONS)})")
+        return {
+            'nearest': cv2.INTER_NEAREST,
+            'linear': cv2.INTER_LINEAR,
+            'cubic': cv2.INTER_CUBIC,
+            # cv2.remap non supporta INTER_AREA: si campiona al doppio e si riduce con INTER_AREA
+            'area': cv2.INTER_LINEAR,
+        }[interpolation]
+    
+    def equirectangular_to_cubemap(self, equirect_image, face_size=None, method='auto',
+                                   interpolation='linear', workers=None):
         """
         Converte immagine equirettangolare in cubemap
         
         Args:
             equirect_image: PIL Image equirettangolare
             face_size: Dimensione facce cubo (None = auto)
-            method: 'fast' o 'quality' 
+            method: 'auto', 'cv2', 'fast' o 'quality'
+                    ('auto' = OpenCV se disponibile, altrimenti NumPy)
+            interpolation: 'nearest', 'linear', 'cubic' o 'area' (solo method='cv2')
+            workers: Thread per le facce in parallelo
+                     (None = CONVERSION_CONFIG['workers'], 0 = uno per core; non usato da 'fast')
         
         Returns:
             dict: {face_name: PIL_Image}
@@ -78,38 +180,114 @@ class PanoramaConverter:
         if face_size is None:
             face_size = height // 2
         
-        if method == 'quality' and HAS_NUMPY:
-            return self._equirect_to_cube_numpy(equirect_image, face_size)
+        method = self._resolve_method(method)
+        
+        if method == 'cv2':
+            return self._equirect_to_cube_cv2(equirect_image, face_size, interpolation, workers)
+        elif method == 'quality' and HAS_NUMPY:
+            return self._equirect_to_cube_numpy(equirect_image, face_size, workers)
         else:
             return self._equirect_to_cube_simple(equirect_image, face_size)
     
-    def _equirect_to_cube_numpy(self, equirect_image, face_size):
+    def _equirect_to_cube_cv2(self, equirect_image, face_size, interpolation='linear', workers=None):
+        """Conversione con cv2.remap (multi-thread, senza temporanei full-size)"""
+        from projection_cache import get_projection_cache
+        
+        flag = self._cv2_interpolation(interpolation)
+        # Per 'area' le facce vengono campionate al doppio e poi ridotte
+        sample_size = face_size * 2 if interpolation == 'area' else face_size
+        
+        width, height = equirect_image.size
+        img_array = np.asarray(equirect_image.convert('RGB'))
+        
+        # Bordo con wrap orizzontale (cucitura a ±180°) e replica verticale (poli)
+        pad = CV2_REMAP_PAD
+        padded = np.concatenate([img_array[:, -pad:], img_array, img_array[:, :pad]], axis=1)
+        padded = cv2.copyMakeBorder(padded, pad, pad, 0, 0, cv2.BORDER_REPLICATE)
+        
+        projection_cache = get_projection_cache()
+        
+        def convert_face(i):
+            remap = projection_cache.get_or_compute(
+                ('equirect_to_cube_cv2', width, height, sample_size, i),
+                lambda: self._equirect_to_cube_remap(width, height, sample_size, i))
+            
+            face_array = cv2.remap(padded, remap[0], remap[1], flag, borderMode=cv2.BORDER_REPLICATE)
+            if sample_size != face_size:
+                face_array = cv2.resize(face_array, (face_size, face_size), interpolation=cv2.INTER_AREA)
+            return face_array
+        
+        return self._map_faces(convert_face, workers)
+    
+    def _equirect_to_cube_remap(self, width, height, face_size, face_index):
+        """
+        Calcola le mappe cv2.remap (coordinate nella sorgente con bordo) per una faccia
+        
+        Returns:
+            numpy.ndarray: array float32 (2, face_size, face_size) con mappe x, y
+        """
+        u_coords = np.linspace(0, 1, face_size, endpoint=False) + 0.5/face_size
+        remap = np.empty((2, face_size, face_size), dtype=np.float32)
+        
+        for start, stop in self._row_bands(face_size, face_size):
+            u_grid, v_grid = np.meshgrid(u_coords, u_coords[start:stop])
+            
+            theta_grid, phi_grid = self._cube_to_sphere_vectorized(u_grid, v_grid, face_index)
+            
+            # Coordinate continue (centro pixel = intero) spostate del bordo aggiunto
+            remap[0, start:stop] = (theta_grid / (2 * np.pi) + 0.5) * width - 0.5 + CV2_REMAP_PAD
+            remap[1, start:stop] = (phi_grid / np.pi) * height - 0.5 + CV2_REMAP_PAD
+        
+        return remap
+    
+    def _equirect_to_cube_numpy(self, equirect_image, face_size, workers=None):
         """Conversione ottimizzata con NumPy"""
+        from projection_cache import get_projection_cache
+        
         width, height = equirect_image.size
         img_array = np.array(equirect_image)
+        projection_cache = get_projection_cache()
         
-        faces = {}
-        
-        for i, face_name in enumerate(self.face_names):
-            # Crea griglia coordinate per la faccia
-            u_coords = np.linspace(0, 1, face_size, endpoint=False) + 0.5/face_size
-            v_coords = np.linspace(0, 1, face_size, endpoint=False) + 0.5/face_size
+        def convert_face(i):
+            # Mappa indici (riutilizzata per tutte le immagini con la stessa geometria)
+            index_map = projection_cache.get_or_compute(
+                ('equirect_to_cube_nearest', width, height, face_size, i),
+                lambda: self._equirect_to_cube_index_map(width, height, face_size, i))
             
-            u_grid, v_grid = np.meshgrid(u_coords, v_coords)
+            # Estrai pixel
+            return img_array[index_map[0], index_map[1]].astype(np.uint8)
+        
+        return self._map_faces(convert_face, workers)
+    
+    def _equirect_to_cube_index_map(self, width, height, face_size, face_index):
+        """
+        Calcola gli indici dei pixel equirettangolari campionati da una faccia del cubo
+        
+        Returns:
+            numpy.ndarray: array int32 (2, face_size, face_size) con indici y, x
+        """
+        # Coordinate della faccia
+        u_coords = np.linspace(0, 1, face_size, endpoint=False) + 0.5/face_size
+        v_coords = np.linspace(0, 1, face_size, endpoint=False) + 0.5/face_size
+        
+        index_map = np.empty((2, face_size, face_size), dtype=np.int32)
+        
+        # Griglia calcolata a bande di righe per limitare i temporanei
+        for start, stop in self._row_bands(face_size, face_size):
+            u_grid, v_grid = np.meshgrid(u_coords, v_coords[start:stop])
             
             # Converte coordinate cubo in sferiche (vettorizzato)
-            theta_grid, phi_grid = self._cube_to_sphere_vectorized(u_grid, v_grid, i)
+            theta_grid, phi_grid = self._cube_to_sphere_vectorized(u_grid, v_grid, face_index)
             
             # Mappa su coordinate equirettangolari
             x_coords = ((theta_grid / (2 * np.pi) + 0.5) * width).astype(int) % width
             y_coords = ((phi_grid / np.pi) * height).astype(int)
             y_coords = np.clip(y_coords, 0, height - 1)
             
-            # Estrai pixel
-            face_array = img_array[y_coords, x_coords]
-            faces[face_name] = Image.fromarray(face_array.astype(np.uint8))
+            index_map[0, start:stop] = y_coords
+            index_map[1, start:stop] = x_coords
         
-        return faces
+        return index_map
     
     def _equirect_to_cube_simple(self, equirect_image, face_size):
         """Conversione semplice pixel per pixel"""
@@ -202,32 +380,138 @@ class PanoramaConverter:
         
         return theta, phi
     
-    def cubemap_to_equirectangular(self, cubemap_faces, output_size=(2048, 1024)):
+    def cubemap_to_equirectangular(self, cubemap_faces, output_size=(2048, 1024), method='auto',
+                                   interpolation='linear'):
         """
         Converte cubemap in immagine equirettangolare
         
         Args:
             cubemap_faces: dict {face_name: PIL_Image}
             output_size: (width, height) output
+            method: 'auto', 'cv2', 'quality' o 'fast'
+                    ('auto' = OpenCV se disponibile, altrimenti NumPy)
+            interpolation: 'nearest', 'linear', 'cubic' o 'area' (solo method='cv2')
         
         Returns:
             PIL Image equirettangolare
         """
         width, height = output_size
         
-        if HAS_NUMPY:
+        method = self._resolve_method(method)
+        
+        if method == 'cv2':
+            return self._cube_to_equirect_cv2(cubemap_faces, width, height, interpolation)
+        elif HAS_NUMPY and method != 'fast':
             return self._cube_to_equirect_numpy(cubemap_faces, width, height)
         else:
             return self._cube_to_equirect_simple(cubemap_faces, width, height)
     
+    def _cube_to_equirect_cv2(self, cubemap_faces, width, height, interpolation='linear'):
+        """Conversione cubemap → equirect con un solo cv2.remap su un atlante delle facce"""
+        from projection_cache import get_projection_cache
+        
+        flag = self._cv2_interpolation(interpolation)
+        # Per 'area' l'equirettangolare viene campionato al doppio e poi ridotto
+        scale = 2 if interpolation == 'area' else 1
+        sample_w, sample_h = width * scale, height * scale
+        
+        face_size = next(iter(cubemap_faces.values())).size[0]
+        pad = CV2_REMAP_PAD
+        cell = face_size + 2 * pad
+        
+        # Atlante orizzontale: una cella per faccia con bordo replicato (facce mancanti = nero)
+        atlas = np.zeros((cell, cell * len(self.face_names), 3), dtype=np.uint8)
+        for face_idx, face_name in enumerate(self.face_names):
+            if face_name not in cubemap_faces:
+                continue
+            face_img = cubemap_faces[face_name].convert('RGB')
+            if face_img.size != (face_size, face_size):
+                face_img = face_img.resize((face_size, face_size), Image.Resampling.LANCZOS)
+            face_array = cv2.copyMakeBorder(np.asarray(face_img), pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+            atlas[:, face_idx * cell:(face_idx + 1) * cell] = face_array
+        
+        remap = get_projection_cache().get_or_compute(
+            ('cube_to_equirect_cv2', sample_w, sample_h, face_size),
+            lambda: self._cube_to_equirect_remap(sample_w, sample_h, face_size))
+        
+        result = cv2.remap(atlas, remap[0], remap[1], flag, borderMode=cv2.BORDER_CONSTANT)
+        if scale != 1:
+            result = cv2.resize(result, (width, height), interpolation=cv2.INTER_AREA)
+        return Image.fromarray(result)
+    
+    def _cube_to_equirect_remap(self, width, height, face_size):
+        """
+        Calcola le mappe cv2.remap dall'equirettangolare all'atlante delle facce
+        
+        Returns:
+            numpy.ndarray: array float32 (2, height, width) con mappe x, y nell'atlante
+        """
+        u_coords = np.linspace(0, 1, width, endpoint=False) + 0.5/width
+        v_coords = np.linspace(0, 1, height, endpoint=False) + 0.5/height
+        cell = face_size + 2 * CV2_REMAP_PAD
+        remap = np.empty((2, height, width), dtype=np.float32)
+        
+        for start, stop in self._row_bands(height, width):
+            u_grid, v_grid = np.meshgrid(u_coords, v_coords[start:stop])
+            
+            theta = (u_grid - 0.5) * 2 * np.pi
+            phi = v_grid * np.pi
+            
+            x = np.cos(theta) * np.sin(phi)
+            y = np.cos(phi)
+            z = np.sin(theta) * np.sin(phi)
+            abs_x, abs_y, abs_z = np.abs(x), np.abs(y), np.abs(z)
+            
+            # Stessa priorità di _sphere_to_cube_face: asse X, poi Y, poi Z
+            x_major = (abs_x >= abs_y) & (abs_x >= abs_z)
+            y_major = ~x_major & (abs_y >= abs_z)
+            z_major = ~x_major & ~y_major
+            
+            face_idx = np.empty(x.shape, dtype=np.int32)
+            u_face = np.empty(x.shape)
+            v_face = np.empty(x.shape)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for mask, index, u_val, v_val in [
+                    (x_major & (x > 0), 0, -z / x, -y / x),        # front (+X)
+                    (x_major & (x <= 0), 2, z / -x, -y / -x),      # back (-X)
+                    (y_major & (y > 0), 4, x / y, z / y),          # up (+Y)
+                    (y_major & (y <= 0), 5, x / -y, -z / -y),      # down (-Y)
+                    (z_major & (z > 0), 1, x / z, -y / z),         # right (+Z)
+                    (z_major & (z <= 0), 3, -x / -z, -y / -z),     # left (-Z)
+                ]:
+                    face_idx[mask] = index
+                    u_face[mask] = (u_val[mask] + 1) / 2
+                    v_face[mask] = (v_val[mask] + 1) / 2
+            
+            u_face = np.clip(u_face, 0, 1)
+            v_face = np.clip(v_face, 0, 1)
+            
+            # Stessa convenzione di _cube_to_equirect_numpy: [0, 1] → [0, face_size - 1]
+            remap[0, start:stop] = face_idx * cell + CV2_REMAP_PAD + u_face * (face_size - 1)
+            remap[1, start:stop] = CV2_REMAP_PAD + v_face * (face_size - 1)
+        
+        return remap
+    
     def _cube_to_equirect_numpy(self, cubemap_faces, width, height):
-        """Conversione cubemap → equirect con NumPy"""
-        # Crea griglia coordinate equirettangolari
+        """Conversione cubemap → equirect con NumPy (a bande di righe entro il budget di memoria)"""
+        # Crea coordinate equirettangolari
         u_coords = np.linspace(0, 1, width, endpoint=False) + 0.5/width
         v_coords = np.linspace(0, 1, height, endpoint=False) + 0.5/height
         
-        u_grid, v_grid = np.meshgrid(u_coords, v_coords)
+        face_arrays = {face_name: np.array(cubemap_faces[face_name])
+                       for face_name in self.face_names if face_name in cubemap_faces}
+        
+        # Inizializza output
+        result = np.zeros((height, width, 3), dtype=np.uint8)
         
+        for start, stop in self._row_bands(height, width):
+            u_grid, v_grid = np.meshgrid(u_coords, v_coords[start:stop])
+            self._cube_to_equirect_band(face_arrays, u_grid, v_grid, result[start:stop])
+        
+        return Image.fromarray(result)
+    
+    def _cube_to_equirect_band(self, face_arrays, u_grid, v_grid, result):
+        """Riempie una banda di righe dell'equirettangolare (result è una vista sull'output)"""
         # Converte in coordinate sferiche
         theta = (u_grid - 0.5) * 2 * np.pi
         phi = v_grid * np.pi
@@ -240,15 +524,12 @@ class PanoramaConverter:
         # Determina quale faccia del cubo per ogni pixel
         abs_x, abs_y, abs_z = np.abs(x), np.abs(y), np.abs(z)
         
-        # Inizializza output
-        result = np.zeros((height, width, 3), dtype=np.uint8)
-        
         # Per ogni faccia del cubo
         for face_idx, face_name in enumerate(self.face_names):
-            if face_name not in cubemap_faces:
+            if face_name not in face_arrays:
                 continue
                 
-            face_img = np.array(cubemap_faces[face_name])
+            face_img = face_arrays[face_name]
             face_size = face_img.shape[0]
             
             # Determina maschera per questa faccia
@@ -287,8 +568,6 @@ class PanoramaConverter:
             # Applica maschera e copia pixel
             valid_mask = mask
             result[valid_mask] = face_img[v_indices[valid_mask], u_indices[valid_mask]]
-        
-        return Image.fromarray(result)
     
     def _cube_to_equirect_simple(self, cubemap_faces, width, height):
         """Conversione semplice cubemap → equirect"""
@@ -357,7 +636,8 @@ class BatchProcessor:
         self.supported_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
     
     def process_folder(self, input_folder, output_folder, conversion_type='equirect_to_cube', 
-                      face_size=None, output_size=(2048, 1024), progress_callback=None):
+                      face_size=None, output_size=(2048, 1024), progress_callback=None,
+                      workers=1, chunksize=1, ordered=True):
         """
         Processa tutti i file in una cartella
         
@@ -367,7 +647,13 @@ class BatchProcessor:
             conversion_type: 'equirect_to_cube' o 'cube_to_equirect'
             face_size: Dimensione facce cubemap (None = auto)
             output_size: Dimensione output equirettangolare
-            progress_callback: Funzione callback(current, total, filename)
+            progress_callback: Funzione callback(completed, total, filename) chiamata quando un
+                               file è concluso (riuscito o fallito): completed va da 1 a total,
+                               con o senza processi in parallelo
+            workers: Processi in parallelo (1 = sequenziale, 0 = uno per core)
+            chunksize: File assegnati a ogni processo per volta (solo workers > 1)
+            ordered: Se False i risultati sono riportati nell'ordine di completamento
+                     (solo workers > 1)
         
         Returns:
             dict: Statistiche processamento
@@ -385,35 +671,35 @@ class BatchProcessor:
         processed = 0
         errors = []
         
-        for i, file_path in enumerate(image_files):
-            try:
-                if progress_callback:
-                    progress_callback(i, total_files, os.path.basename(file_path))
-                
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+        if not workers:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(int(workers), total_files))
+        
+        if workers == 1:
+            for i, file_path in enumerate(image_files):
+                error = self._process_file(file_path, input_folder, output_folder, conversion_type,
+                                           face_size, output_size)
+                if error is None:
+                    processed += 1
+                else:
+                    errors.append((file_path, error))
                 
-                if conversion_type == 'equirect_to_cube':
-                    # Converti in cubemap
-                    equirect_img = Image.open(file_path)
-                    cubemap = self.converter.equirectangular_to_cubemap(equirect_img, face_size)
-                    
-                    # Salva le 6 facce
-                    for face_name, face_img in cubemap.items():
-                        output_path = os.path.join(output_folder, f"{base_name}_{face_name}.jpg")
-                        face_img.save(output_path, quality=95)
+                if progress_callback:
+                    progress_callback(i + 1, total_files, os.path.basename(file_path))
+        else:
+            tasks = [(file_path, input_folder, output_folder, conversion_type, face_size, output_size)
+                     for file_path in image_files]
+            
+            with multiprocessing.Pool(workers, initializer=_init_batch_worker) as pool:
+                imap = pool.imap if ordered else pool.imap_unordered
+                for i, (file_path, error) in enumerate(imap(_process_file_worker, tasks, max(1, int(chunksize)))):
+                    if error is None:
+                        processed += 1
+                    else:
+                        errors.append((file_path, error))
                     
-                elif conversion_type == 'cube_to_equirect':
-                    # Cerca le 6 facce del cubemap
-                    cubemap_faces = self._load_cubemap_faces(input_folder, base_name)
-                    if cubemap_faces:
-                        equirect_img = self.converter.cubemap_to_equirectangular(cubemap_faces, output_size)
-                        output_path = os.path.join(output_folder, f"{base_name}_equirect.jpg")
-                        equirect_img.save(output_path, quality=95)
-                
-                processed += 1
-                
-            except Exception as e:
-                errors.append((file_path, str(e)))
+                    if progress_callback:
+                        progress_callback(i + 1, total_files, os.path.basename(file_path))
         
         return {
             'total_files': total_files,
@@ -421,6 +707,41 @@ class BatchProcessor:
             'errors': errors
         }
     
+    def _process_file(self, file_path, input_folder, output_folder, conversion_type,
+                      face_size=None, output_size=(2048, 1024), face_workers=None):
+        """
+        Converte un file della cartella (errori isolati per file)
+        
+        Returns:
+            str: Messaggio di errore, oppure None se la conversione è riuscita
+        """
+        try:
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            
+            if conversion_type == 'equirect_to_cube':
+                # Converti in cubemap
+                equirect_img = Image.open(file_path)
+                cubemap = self.converter.equirectangular_to_cubemap(equirect_img, face_size,
+                                                                    workers=face_workers)
+                
+                # Salva le 6 facce
+                for face_name, face_img in cubemap.items():
+                    output_path = os.path.join(output_folder, f"{base_name}_{face_name}.jpg")
+                    face_img.save(output_path, quality=95)
+                
+            elif conversion_type == 'cube_to_equirect':
+                # Cerca le 6 facce del cubemap
+                cubemap_faces = self._load_cubemap_faces(input_folder, base_name)
+                if cubemap_faces:
+                    equirect_img = self.converter.cubemap_to_equirectangular(cubemap_faces, output_size)
+                    output_path = os.path.join(output_folder, f"{base_name}_equirect.jpg")
+                    equirect_img.save(output_path, quality=95)
+            
+            return None
+            
+        except Exception as e:
+            return str(e)
+    
     def _load_cubemap_faces(self, folder, base_name):
         """Carica le 6 facce di un cubemap"""
         faces = {}
@@ -473,6 +794,26 @@ class BatchProcessor:
             return [output_path]
 
 
+# Processore usato dai processi worker di BatchProcessor.process_folder (uno per processo)
+_worker_processor = None
+
+
+def _init_batch_worker():
+    """Inizializza un processo worker: il parallelismo è tra file, non dentro la conversione"""
+    global _worker_processor
+    _worker_processor = BatchProcessor()
+    if HAS_OPENCV:
+        cv2.setNumThreads(1)
+
+
+def _process_file_worker(task):
+    """Converte un file in un processo worker e restituisce (file_path, errore o None)"""
+    file_path, input_folder, output_folder, conversion_type, face_size, output_size = task
+    error = _worker_processor._process_file(file_path, input_folder, output_folder, conversion_type,
+                                            face_size, output_size, face_workers=1)
+    return file_path, error
+
+
 # Funzioni di utilità standalone
 def quick_equirect_to_cubemap(input_path, output_folder, face_size=None):
     """Conversione rapida equirect → cubemap"""
@@ -0,0 +1,157 @@
+"""
+Pipeline a stadi per i download multipli
+Ogni stadio ha i propri worker e una coda limitata in ingresso: mentre un panorama viene scaricato
+il precedente viene proiettato e quello prima ancora codificato e scritto su disco
+"""
+
+import queue
+import threading
+import time
+
+from config import PIPELINE_CONFIG
+
+# Segnale di fine lavoro inviato ai worker di uno stadio
+_END = object()
+
+
+class PipelineStage:
+    """Uno stadio della pipeline"""
+
+    def __init__(self, name, fn, workers=None):
+        """
+        Args:
+            name: Nome dello stadio (es. 'fetch')
+            fn: Funzione (key, value) che restituisce il valore per lo stadio successivo
+            workers: Thread dedicati allo stadio (None = PIPELINE_CONFIG['workers'][name], default 1)
+        """
+        self.name = name
+        self.fn = fn
+        if workers is None:
+            workers = PIPELINE_CONFIG['workers'].get(name, 1)
+        self.workers = max(1, int(workers))
+
+        # Statistiche: elementi elaborati e tempo di lavoro complessivo dei worker
+        self.items = 0
+        self.busy_seconds = 0.0
+
+
+class Pipeline:
+    """
+    Esegue elementi (key, value) attraverso una sequenza di stadi
+
+    Le code tra gli stadi sono limitate: uno stadio più veloce del successivo si blocca
+    (backpressure) invece di accumulare panorami in memoria, quindi il throughput tende
+    a quello dello stadio più lento.
+    """
+
+    def __init__(self, stages, queue_size=None, on_done=None):
+        """
+        Args:
+            stages: Lista di PipelineStage, nell'ordine di esecuzione
+            queue_size: Elementi in attesa ammessi davanti a ogni stadio
+                        (None = PIPELINE_CONFIG['queue_size'])
+            on_done: Funzione callback(key, error) chiamata quando un elemento esce dalla pipeline;
+                     error è None se tutti gli stadi sono riusciti
+        """
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size or PIPELINE_CONFIG['queue_size']))
+        self.on_done = on_done
+
+        self._lock = threading.Lock()
+        self._stats = None
+
+    def _finish(self, key, error=None):
+        """Registra l'uscita di un elemento dalla pipeline"""
+        with self._lock:
+            if error is None:
+                self._stats['successful'] += 1
+            else:
+                self._stats['failed'] += 1
+        if self.on_done:
+            try:
+                self.on_done(key, error)
+            except Exception as e:
+                print(f"Errore callback pipeline: {e}")
+
+    def _worker(self, index, queues):
+        """Ciclo di un worker dello stadio index"""
+        stage = self.stages[index]
+        in_queue = queues[index]
+        out_queue = queues[index + 1] if index + 1 < len(queues) else None
+
+        while True:
+            entry = in_queue.get()
+            if entry is _END:
+                return
+            key, value = entry
+
+            start = time.perf_counter()
+            try:
+                value = stage.fn(key, value)
+            except Exception as e:
+                # L'errore resta confinato all'elemento: gli altri proseguono
+                print(f"Errore stadio {stage.name} per {key}: {e}")
+                self._finish(key, f"{stage.name}: {e}")
+                continue
+            finally:
+                with self._lock:
+                    stage.items += 1
+                    stage.busy_seconds += time.perf_counter() - start
+
+            if out_queue is not None:
+                out_queue.put((key, value))  # Si blocca se lo stadio successivo è indietro
+            else:
+                self._finish(key)
+
+    def run(self, items, should_stop=None):
+        """
+        Esegue la pipeline fino all'esaurimento degli elementi
+
+        Args:
+            items: Iterabile di (key, value) da inviare al primo stadio
+            should_stop: Funzione senza argomenti; se restituisce True non vengono
+                         immessi nuovi elementi (quelli già in corso terminano)
+
+        Returns:
+            dict: {'successful', 'failed', 'skipped'}
+        """
+        self._stats = {'successful': 0, 'failed': 0, 'skipped': 0}
+        for stage in self.stages:
+            stage.items = 0
+            stage.busy_seconds = 0.0
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage_threads = [
+                threading.Thread(target=self._worker, args=(index, queues),
+                                 name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        try:
+            for entry in items:
+                if should_stop and should_stop():
+                    with self._lock:
+                        self._stats['skipped'] += 1
+                    continue
+                queues[0].put(entry)
+        finally:
+            # Chiusura a cascata: uno stadio termina solo dopo che il precedente ha svuotato la coda
+            for index, stage in enumerate(self.stages):
+                for _ in range(stage.workers):
+                    queues[index].put(_END)
+                for thread in threads[index]:
+                    thread.join()
+
+        return dict(self._stats)
+
+    def stage_stats(self):
+        """Statistiche per stadio: {name: {'items', 'busy_seconds', 'workers'}}"""
+        return {
+            stage.name: {'items': stage.items, 'busy_seconds': stage.busy_seconds, 'workers': stage.workers}
+            for stage in self.stages
+        }
@@ -0,0 +1,139 @@
+"""
+Cache delle mappe di proiezione (lookup table) per le conversioni panoramiche
+Per una data geometria (dimensioni equirettangolare, dimensione facce) le coordinate di campionamento
+sono sempre le stesse: vengono calcolate una volta sola e riutilizzate per tutte le immagini successive
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import CACHE_CONFIG
+
+
+class ProjectionCache:
+    """Cache LRU in memoria (con copia opzionale .npy su disco) delle mappe di proiezione"""
+
+    def __init__(self, max_size_mb=None, cache_dir=None):
+        """
+        Args:
+            max_size_mb: Memoria massima occupata dalle mappe (None = CACHE_CONFIG['projection_cache_mb'])
+            cache_dir: Cartella per le mappe .npy su disco (None = CACHE_CONFIG['projection_cache_dir'],
+                       che se vuoto disabilita la cache su disco)
+        """
+        if max_size_mb is None:
+            max_size_mb = CACHE_CONFIG['projection_cache_mb']
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.cache_dir = cache_dir if cache_dir is not None else CACHE_CONFIG['projection_cache_dir']
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chiave -> array, dal meno al più recente
+        self._total_bytes = 0
+
+    def _disk_path(self, key):
+        """Percorso del file .npy per una chiave"""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def _load_from_disk(self, key):
+        """Carica la mappa da disco, oppure None se mancante"""
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path)
+        except Exception as e:
+            print(f"⚠ Mappa di proiezione su disco non leggibile: {e}")
+            return None
+
+    def _save_to_disk(self, key, array):
+        """Salva la mappa su disco con scrittura atomica"""
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, array)
+                os.replace(tmp_path, self._disk_path(key))
+            except Exception:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            print(f"⚠ Impossibile salvare mappa di proiezione su disco: {e}")
+
+    def get_or_compute(self, key, compute_fn):
+        """
+        Restituisce le mappe per una geometria, calcolandole solo se necessario
+
+        Args:
+            key: Tupla che identifica univocamente la geometria (e il tipo di mappa)
+            compute_fn: Funzione senza argomenti che restituisce un array NumPy
+
+        Returns:
+            numpy.ndarray: mappa in sola lettura (condivisa tra le chiamate)
+        """
+        with self._lock:
+            array = self._entries.get(key)
+            if array is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return array
+            self.misses += 1
+
+        array = self._load_from_disk(key)
+        if array is None:
+            array = np.ascontiguousarray(compute_fn())
+            self._save_to_disk(key, array)
+        array.setflags(write=False)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = array
+                self._total_bytes += array.nbytes
+                self._evict(keep=key)
+        return array
+
+    def _evict(self, keep=None):
+        """Rimuove le mappe meno usate finché si rientra nel limite (lock già acquisito)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._total_bytes -= self._entries.pop(oldest).nbytes
+
+    def clear(self):
+        """Svuota la cache in memoria"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_projection_cache():
+    """Restituisce la cache delle mappe di proiezione condivisa dal processo"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ProjectionCache()
+    return _default_cache
@@ -0,0 +1,193 @@
+"""
+Limitatore di velocità adattivo (token bucket) condiviso da tutte le richieste HTTP
+Limita le richieste al secondo e i byte al secondo di tutti i worker e panorami insieme:
+rallenta quando il server risponde 429/503 e riaccelera gradualmente quando le richieste riescono
+"""
+
+import threading
+import time
+
+from config import RATE_LIMIT_CONFIG
+
+# Status con cui il server chiede di rallentare
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """Secchio di gettoni che si riempie a 'rate' gettoni al secondo fino a 'capacity' (non thread-safe)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        """Aggiunge i gettoni maturati dall'ultimo aggiornamento"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Secondi da attendere perché siano disponibili 'amount' gettoni (0 = subito)"""
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket per richieste e byte con adattamento AIMD
+
+    Ogni 429/503 (o errore di rete) dimezza la velocità e sospende le richieste per il
+    Retry-After indicato dal server; ogni risposta riuscita aumenta la velocità di un passo fisso.
+    I byte scaricati sono noti solo a risposta ricevuta: vengono addebitati dopo e le richieste
+    successive attendono finché il secchio dei byte non torna in positivo.
+    """
+
+    def __init__(self, requests_per_second=None, bytes_per_second=None, min_rate=None, max_rate=None,
+                 burst=None, backoff_factor=None, ramp_up_step=None):
+        """
+        Args:
+            requests_per_second: Velocità iniziale (None = RATE_LIMIT_CONFIG['requests_per_second'])
+            bytes_per_second: Limite di banda (None = RATE_LIMIT_CONFIG['bytes_per_second'], 0 = illimitato)
+            min_rate, max_rate: Limiti dell'adattamento in richieste al secondo
+            burst: Richieste ammesse in raffica dopo una pausa
+            backoff_factor: Fattore applicato alla velocità a ogni rallentamento
+            ramp_up_step: Richieste al secondo aggiunte a ogni risposta riuscita
+        """
+        config = RATE_LIMIT_CONFIG
+        self.min_rate = float(min_rate or config['min_requests_per_second'])
+        self.max_rate = float(max_rate or config['max_requests_per_second'])
+        rate = float(requests_per_second or config['requests_per_second'])
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        self.backoff_factor = backoff_factor or config['backoff_factor']
+        self.ramp_up_step = ramp_up_step if ramp_up_step is not None else config['ramp_up_step']
+        if bytes_per_second is None:
+            bytes_per_second = config['bytes_per_second']
+
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rate, max(1, int(burst or config['burst'])))
+        # Capacità pari a un secondo di banda
+        self._bytes = TokenBucket(bytes_per_second, bytes_per_second) if bytes_per_second else None
+        self._paused_until = 0.0
+        self._last_backoff = 0.0
+
+        # Metriche
+        self.requests = 0
+        self.bytes = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def rate(self):
+        """Velocità corrente consentita (richieste al secondo)"""
+        return self._requests.rate
+
+    def acquire(self):
+        """
+        Attende il permesso per una richiesta
+
+        Returns:
+            float: secondi attesi
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._requests.refill(now)
+                wait = max(self._paused_until - now, self._requests.wait_time(1))
+                if self._bytes is not None:
+                    self._bytes.refill(now)
+                    wait = max(wait, self._bytes.wait_time(0))
+
+                if wait <= 0:
+                    self._requests.tokens -= 1
+                    self.requests += 1
+                    self.wait_seconds += waited
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def record_bytes(self, size):
+        """Addebita i byte di una risposta ricevuta"""
+        with self._lock:
+            self.bytes += size
+            if self._bytes is not None:
+                self._bytes.refill(time.monotonic())
+                self._bytes.tokens -= size
+
+    def on_response(self, status_code, retry_after=None):
+        """
+        Adatta la velocità all'esito di una richiesta
+
+        Args:
+            status_code: Status HTTP della risposta
+            retry_after: Valore dell'header Retry-After (secondi), se presente
+        """
+        with self._lock:
+            if status_code in THROTTLE_STATUS_CODES:
+                self._backoff(self._parse_retry_after(retry_after))
+            elif status_code < 400:
+                self._requests.rate = min(self.max_rate, self._requests.rate + self.ramp_up_step)
+
+    def on_error(self):
+        """Errore di rete (timeout, connessione rifiutata): trattato come un rallentamento"""
+        with self._lock:
+            self._backoff(None)
+
+    def _backoff(self, pause):
+        """Riduce la velocità e sospende le richieste (lock già acquisito)"""
+        now = time.monotonic()
+        self.throttled += 1
+        if pause:
+            self._paused_until = max(self._paused_until, now + pause)
+
+        # Le risposte delle richieste già in volo arrivano insieme: un solo rallentamento per finestra
+        if now - self._last_backoff < RATE_LIMIT_CONFIG['backoff_cooldown']:
+            return
+        self._last_backoff = now
+        self._requests.refill(now)
+        self._requests.rate = max(self.min_rate, self._requests.rate * self.backoff_factor)
+        self._requests.tokens = min(self._requests.tokens, 0.0)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Secondi indicati da Retry-After (solo forma numerica), limitati a RATE_LIMIT_CONFIG['max_pause']"""
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            return None
+        return min(max(0.0, seconds), RATE_LIMIT_CONFIG['max_pause'])
+
+    def metrics(self):
+        """
+        Stato corrente del limitatore
+
+        Returns:
+            dict: {'requests_per_second', 'bytes_per_second', 'requests', 'bytes', 'throttled', 'wait_seconds'}
+        """
+        with self._lock:
+            return {
+                'requests_per_second': round(self._requests.rate, 2),
+                'bytes_per_second': int(self._bytes.rate) if self._bytes is not None else 0,
+                'requests': self.requests,
+                'bytes': self.bytes,
+                'throttled': self.throttled,
+                'wait_seconds': round(self.wait_seconds, 3),
+            }
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Restituisce il limitatore condiviso dal processo, oppure None se disabilitato"""
+    global _default_limiter
+    if not RATE_LIMIT_CONFIG['enabled']:
+        return None
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = AdaptiveRateLimiter()
+    return _default_limiter
@@ -0,0 +1,163 @@
+"""
+Politica di retry delle richieste HTTP
+Distingue gli errori definitivi (es. 404: tile inesistente a quello zoom) da quelli temporanei (5xx,
+429, errori di rete), attende con backoff esponenziale e jitter, e limita i retry con budget
+per panorama e per batch: un server in difficoltà non deve moltiplicare il volume delle richieste
+"""
+
+import random
+import threading
+import time
+
+from config import DOWNLOAD_CONFIG, RETRY_CONFIG
+
+# Esiti di una risposta
+OUTCOME_SUCCESS = 'success'
+OUTCOME_RETRY = 'retry'
+OUTCOME_PERMANENT = 'permanent'
+
+
+class RetryBudget:
+    """
+    Numero massimo di retry condiviso da più richieste (thread-safe)
+
+    Con ratio > 0 il budget cresce con le richieste effettuate: i retry restano al massimo
+    min_retries + ratio * richieste, qualunque sia il tasso di errore del server.
+    """
+
+    def __init__(self, min_retries, ratio=0.0):
+        """
+        Args:
+            min_retries: Retry sempre concessi
+            ratio: Retry aggiuntivi concessi per ogni richiesta (0 = budget fisso)
+        """
+        self.min_retries = max(0, int(min_retries))
+        self.ratio = float(ratio)
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """Registra una prima richiesta (aumenta il budget se proporzionale)"""
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self):
+        """Consuma un retry se il budget lo consente"""
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def refund(self):
+        """Restituisce un retry consumato e non usato"""
+        with self._lock:
+            self.retries -= 1
+
+
+class RetryPolicy:
+    """Classificazione degli status e attese tra i tentativi"""
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None, retry_statuses=None):
+        """
+        Args:
+            max_attempts: Tentativi per richiesta (None = DOWNLOAD_CONFIG['max_retries'])
+            base_delay: Attesa base prima del primo retry in secondi (None = DOWNLOAD_CONFIG['retry_delay'])
+            max_delay: Attesa massima tra due tentativi (None = RETRY_CONFIG['max_delay'])
+            retry_statuses: Status temporanei da ritentare (None = RETRY_CONFIG['retry_statuses']);
+                            gli altri status diversi da 200 sono definitivi
+        """
+        self.max_attempts = max(1, int(max_attempts or DOWNLOAD_CONFIG['max_retries']))
+        self.base_delay = float(base_delay if base_delay is not None else DOWNLOAD_CONFIG['retry_delay'])
+        self.max_delay = float(max_delay if max_delay is not None else RETRY_CONFIG['max_delay'])
+        self.retry_statuses = frozenset(retry_statuses or RETRY_CONFIG['retry_statuses'])
+
+    def classify(self, status_code):
+        """Esito di uno status HTTP: OUTCOME_SUCCESS, OUTCOME_RETRY o OUTCOME_PERMANENT"""
+        if status_code == 200:
+            return OUTCOME_SUCCESS
+        if status_code in self.retry_statuses:
+            return OUTCOME_RETRY
+        return OUTCOME_PERMANENT
+
+    def backoff(self, retry_index):
+        """Attesa prima del retry numero retry_index (da 0): backoff esponenziale con full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_index)))
+
+    def execute(self, send, budgets=(), label="Richiesta", breaker=None, accept_statuses=()):
+        """
+        Esegue una richiesta con retry
+
+        Args:
+            send: Funzione senza argomenti che esegue la richiesta e restituisce la risposta
+            budgets: RetryBudget da cui prelevare ogni retry (tutti devono concederlo)
+            label: Descrizione della richiesta per i messaggi di log
+            breaker: CircuitBreaker dell'endpoint; se aperto la richiesta fallisce subito
+            accept_statuses: Status definitivi restituiti al chiamante come risposte valide
+                             (es. 404 per una verifica di esistenza)
+
+        Returns:
+            response con status 200 o in accept_statuses, oppure None se fallita
+        """
+        for budget in budgets:
+            budget.record_request()
+
+        for attempt in range(self.max_attempts):
+            if attempt > 0:
+                if not self._spend(budgets):
+                    print(f"  ⚠ {label}: budget di retry esaurito")
+                    return None
+                time.sleep(self.backoff(attempt - 1))
+
+            if breaker is not None and not breaker.allow_request():
+                print(f"  ⚡ {label}: circuito '{breaker.name}' aperto")
+                return None
+
+            try:
+                response = send()
+            except Exception as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                print(f"  ❌ {label} errore: {e}, tentativo {attempt+1}")
+                continue
+
+            if breaker is not None:
+                # 404, 429 e simili sono risposte di un endpoint funzionante
+                if response.status_code >= 500 or response.status_code == 408:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+            outcome = self.classify(response.status_code)
+            if outcome == OUTCOME_SUCCESS or response.status_code in accept_statuses:
+                return response
+            print(f"  ⚠ {label} status {response.status_code}, tentativo {attempt+1}")
+            if outcome == OUTCOME_PERMANENT:
+                return None
+
+        return None
+
+    @staticmethod
+    def _spend(budgets):
+        """Preleva un retry da tutti i budget, oppure da nessuno"""
+        spent = []
+        for budget in budgets:
+            if not budget.try_spend():
+                for other in spent:
+                    other.refund()
+                return False
+            spent.append(budget)
+        return True
+
+
+def pano_retry_budget():
+    """Nuovo budget di retry per un panorama (RETRY_CONFIG['pano_retry_budget'])"""
+    return RetryBudget(RETRY_CONFIG['pano_retry_budget'])
+
+
+def batch_retry_budget():
+    """Nuovo budget di retry proporzionale alle richieste di un batch"""
+    return RetryBudget(RETRY_CONFIG['batch_retry_min'], RETRY_CONFIG['batch_retry_ratio'])
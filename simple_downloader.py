@@ -6,14 +6,15 @@ Versione che non richiede Selenium
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
-import re
 from PIL import Image, ImageTk
 import os
 import threading
 import time
 import urllib.parse
 
+from http_session import http_get, http_head
+from panoid_extractor import extract_panoid
+
 
 class SimpleStreetViewDownloader:
     def __init__(self, root):
@@ -25,18 +26,6 @@ class SimpleStreetViewDownloader:
         self.current_image = None
         self.current_photo = None
         
-        # Pattern per estrazione PanoID
-        self.panoid_patterns = [
-            r'!1s([a-zA-Z0-9_-]{20,})',  # Pattern principale Google Maps
-            r'"pano":"([a-zA-Z0-9_-]{20,})"',  # Pattern JSON
-            r'"panoid":"([a-zA-Z0-9_-]{20,})"',  # Pattern JSON alternativo
-            r'pano:"([a-zA-Z0-9_-]{20,})"',  # Pattern JS
-            r'"panoId":"([a-zA-Z0-9_-]{20,})"',  # Pattern alternativo
-            r'photosphereId=([a-zA-Z0-9_-]{20,})',  # Pattern photosphere
-            r'panoid=([a-zA-Z0-9_-]{20,})',  # Pattern URL diretto
-            r'pano=([a-zA-Z0-9_-]{20,})',  # Pattern pano
-        ]
-        
         self.setup_ui()
         
     def setup_ui(self):
@@ -132,11 +121,7 @@ class SimpleStreetViewDownloader:
         
     def extract_panoid_from_url(self, url):
         """Estrae il PanoID dall'URL di Google Street View"""
-        for pattern in self.panoid_patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        return extract_panoid(url)
         
     def extract_panoid(self):
         """Estrae il PanoID dall'URL fornito"""
@@ -184,7 +169,7 @@ class SimpleStreetViewDownloader:
         
         def validate_thread():
             try:
-                response = requests.head(test_url, timeout=5)
+                response = http_head(test_url)
                 if response.status_code == 200:
                     self.status_var.set(f"PanoID valido: {panoid}")
                 else:
@@ -238,7 +223,7 @@ class SimpleStreetViewDownloader:
                         url = self.get_tile_url(panoid, x, y, zoom)
                         
                         try:
-                            response = requests.get(url, timeout=10)
+                            response = http_get(url)
                             if response.status_code == 200:
                                 from io import BytesIO
                                 tile_image = Image.open(BytesIO(response.content))
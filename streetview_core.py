@@ -0,0 +1,1120 @@
+"""
+Core del downloader Street View, indipendente dall'interfaccia grafica
+Download dei panorami, conversione cubemap e download multipli: usato dalla GUI Tk
+(advanced_downloader.py) e dal runner da riga di comando (batch_cli.py)
+"""
+import os
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+from PIL import Image
+
+from tile_fetcher import TileFetcher, ZOOM_GRID, get_tile_url, assemble_tiles
+from async_engine import AsyncDownloadEngine
+from zoom_probe import ZoomProbe
+from retry_policy import RetryPolicy, batch_retry_budget
+from circuit_breaker import get_circuit_breaker
+from http_session import http_get, http_head, ensure_pool_size
+from pipeline import Pipeline, PipelineStage
+from batch_journal import BatchJournal
+from tile_cache import TileCache
+from metadata_cache import MetadataCache
+from panoid_extractor import extract_panoid
+from config import DOWNLOAD_CONFIG, CACHE_CONFIG, CONVERSION_CONFIG, PIPELINE_CONFIG
+
+# Import opzionali con gestione errori MKL Intel
+HAS_NUMPY = False
+HAS_OPENCV = False
+
+try:
+    # Tenta import numpy con gestione errore MKL
+    import numpy as np
+    HAS_NUMPY = True
+    print("✓ NumPy disponibile per performance ottimizzate")
+except ImportError:
+    print("⚠ NumPy non disponibile - usando implementazioni pure Python")
+    HAS_NUMPY = False
+except Exception as e:
+    # Gestisce errori MKL Intel specificamente
+    if "mkl" in str(e).lower() or "intel" in str(e).lower():
+        print("⚠ Errore Intel MKL rilevato - disabilitando NumPy")
+        print(f"  Errore specifico: {e}")
+        print("  Suggerimento: pip uninstall numpy && pip install numpy==1.24.3")
+        HAS_NUMPY = False
+    else:
+        print(f"⚠ Errore NumPy generico: {e}")
+        HAS_NUMPY = False
+
+try:
+    import cv2
+    HAS_OPENCV = True
+    print("✓ OpenCV disponibile per elaborazioni avanzate")
+except ImportError:
+    print("⚠ OpenCV non disponibile")
+    HAS_OPENCV = False
+except Exception as e:
+    print(f"⚠ Errore OpenCV: {e}")
+    HAS_OPENCV = False
+
+# Esiti della validazione di un PanoID
+VALIDATION_VALID = 'valid'
+VALIDATION_INVALID = 'invalid'          # PanoID assente o inesistente (4xx)
+VALIDATION_UNREACHABLE = 'unreachable'  # Errore di rete o del server: da riprovare
+
+
+class StreetViewCore:
+    """Download e conversione dei panorami Street View (senza dipendenze da Tk)"""
+    
+    def __init__(self):
+        # Cache su disco delle tiles (evita di riscaricare pano già visti)
+        self.tile_cache = None
+        if CACHE_CONFIG['enabled']:
+            try:
+                self.tile_cache = TileCache()
+            except OSError as e:
+                print(f"⚠ Cache tiles non disponibile: {e}")
+        
+        # Metadata dei panorami (su disco solo se la cache è abilitata)
+        metadata_path = None
+        if CACHE_CONFIG['enabled']:
+            metadata_path = os.path.join(CACHE_CONFIG['cache_dir'], CACHE_CONFIG['metadata_cache_name'])
+        self.metadata_cache = MetadataCache(metadata_path)
+        
+        # Zoom disponibili e griglia reale di tiles per PanoID (memorizzati per la sessione)
+        self.zoom_probe = ZoomProbe() if DOWNLOAD_CONFIG['probe_grid'] else None
+        
+        # Motore di download concorrente delle tiles
+        self.tile_fetcher = TileFetcher(cache=self.tile_cache, probe=self.zoom_probe)
+        
+        # Retry delle richieste di metadata (stessa politica delle tiles)
+        self.retry_policy = RetryPolicy()
+        
+        # Esiti definitivi delle validazioni (panoid -> VALIDATION_VALID/VALIDATION_INVALID)
+        self._validation_cache = {}
+        self._validation_lock = threading.Lock()
+    
+    def extract_panoid_from_url(self, url):
+        """Estrae il PanoID dall'URL di Google Street View"""
+        return extract_panoid(url)
+    
+    # ========================================================================================
+    # DOWNLOAD MULTIPLI
+    # ========================================================================================
+    
+    def batch_download(self, panoids, output_folder, zoom=2, output_format="equirectangular",
+                       overlap_percent=0, direct_cubemap=False, fetch_workers=None,
+                       progress_callback=None, should_stop=None):
+        """
+        Scarica e salva più panorami attraverso la pipeline a stadi
+        
+        Il batch è ripreso dal journal nella cartella di output: i panorami già completati
+        con le stesse impostazioni vengono saltati e le tiles già scaricate vengono rilette dalla
+        cache delle tiles (con CACHE_CONFIG['enabled'] = False la ripresa le riscarica).
+        
+        Args:
+            panoids: Lista di PanoID (un PanoID ripetuto viene elaborato una volta sola)
+            output_folder: Cartella di output (creata se non esiste)
+            zoom: Livello di zoom
+            output_format: "equirectangular" o "cubemap"
+            overlap_percent: Overlap SfM (richiede il panorama equirettangolare completo)
+            direct_cubemap: Cubemap campionato direttamente dalle tiles (solo senza overlap)
+            fetch_workers: Panorami scaricati in parallelo
+                           (None = PIPELINE_CONFIG['workers']['fetch'])
+            progress_callback: Funzione callback(completed, total, panoid, error) chiamata
+                               per ogni panorama concluso (error = None se riuscito)
+            should_stop: Funzione senza argomenti; se restituisce True non avvia nuovi panorami
+        
+        Returns:
+            dict: {'successful', 'failed', 'skipped', 'already_done'}
+        """
+        if zoom not in ZOOM_GRID:
+            raise ValueError(f"Zoom {zoom} non supportato")
+        os.makedirs(output_folder, exist_ok=True)
+        # Un panorama ripetuto nella lista condividerebbe stato e riga del journal con la sua copia
+        panoids = list(dict.fromkeys(panoids))
+        
+        # L'overlap richiede il panorama equirettangolare completo
+        direct_cubemap = (direct_cubemap and output_format == "cubemap" and overlap_percent == 0
+                          and HAS_NUMPY)
+        
+        # Panorami in volo: uno per worker dello stadio fetch
+        if fetch_workers is None:
+            fetch_workers = PIPELINE_CONFIG['workers']['fetch']
+        fetch_workers = max(1, int(fetch_workers))
+        # Budget di retry comune al batch: se il server degrada i retry non moltiplicano le richieste
+        fetcher = TileFetcher(cache=self.tile_cache, retry_budget=batch_retry_budget(), probe=self.zoom_probe)
+        # Limite globale di tiles in volo (DOWNLOAD_CONFIG['max_inflight_tiles']) condiviso
+        # dai panorami in volo invece di una quota fissa per worker
+        engine = AsyncDownloadEngine(fetcher)
+        
+        # Journal nella cartella di output: un batch interrotto riprende saltando
+        # i panorami completati (con le stesse impostazioni)
+        journal = BatchJournal(os.path.join(output_folder, PIPELINE_CONFIG['journal_name']))
+        profile = f"zoom{zoom}_{output_format}_overlap{overlap_percent}{'_direct' if direct_cubemap else ''}"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        overlap_suffix = f"_overlap{overlap_percent}" if overlap_percent > 0 else ""
+        # PanoID completo nel nome: le photosphere condividono spesso i primi caratteri ("CAoSLEFG...")
+        pending = journal.enqueue(panoids, profile,
+                                  lambda panoid: f"streetview_{panoid}_{timestamp}{overlap_suffix}")
+        already_done = len(panoids) - len(pending)
+        
+        # Zoom effettivo per panorama: le photosphere possono non arrivare allo zoom richiesto
+        pano_zooms = {}
+        
+        # Pipeline: mentre un panorama viene scaricato il precedente viene proiettato
+        # e quello prima ancora codificato e scritto su disco
+        def fetch(panoid, _):
+            journal.mark_fetching(panoid, profile)
+            pano_zoom = pano_zooms[panoid] = self.clamp_zoom(panoid, zoom)
+            # Le tiles già scaricate (anche da un'esecuzione interrotta) arrivano dalla cache del fetcher.
+            # Con l'endpoint giù il worker resta in pausa invece di produrre tiles grigie; dopo errori
+            # temporanei il panorama fallisce senza essere segnato completato e la ripresa riscarica
+            # solo le tiles mancanti
+            return engine.fetch_pano(panoid, pano_zoom, should_stop)
+        
+        def assemble(panoid, tile_bytes):
+            if direct_cubemap:
+                # Le facce vengono campionate direttamente dalle tiles nello stadio convert
+                return tile_bytes
+            zoom = pano_zooms[panoid]
+            equirect_image, _ = assemble_tiles(tile_bytes, zoom, fetcher.grid(panoid, zoom))
+            return equirect_image
+        
+        def convert(panoid, source):
+            # Nome file registrato nel journal (stabile tra le riprese)
+            base_filename = journal.base_name(panoid, profile)
+            
+            if direct_cubemap:
+                faces = self.iter_cubemap_faces_from_tiles(panoid, pano_zooms[panoid], fetcher=fetcher,
+                                                           tile_bytes=source)
+                return [(f"{base_filename}_{face_name}.jpg", face_image) for face_name, face_image in faces]
+            
+            equirect_image = source
+            # Applica overlap se richiesto
+            if overlap_percent > 0:
+                equirect_image = self.create_overlap_image(equirect_image, overlap_percent, panoid)
+            
+            if output_format == "equirectangular":
+                return [(f"{base_filename}.jpg", equirect_image)]
+            cubemap = self.equirect_to_cubemap(equirect_image)
+            return [(f"{base_filename}_{face_name}.jpg", face_image) for face_name, face_image in cubemap.items()]
+        
+        def encode(panoid, outputs):
+            encoded = []
+            for filename, image in outputs:
+                buffer = BytesIO()
+                image.save(buffer, format='JPEG', quality=95)
+                encoded.append((filename, buffer.getvalue()))
+            return encoded
+        
+        def write(panoid, encoded):
+            output_paths = []
+            for filename, data in encoded:
+                output_path = os.path.join(output_folder, filename)
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                output_paths.append(output_path)
+            journal.mark_done(panoid, profile, output_paths)
+        
+        progress_lock = threading.Lock()
+        completed = [already_done]
+        
+        def on_done(panoid, error):
+            # Stato per panorama rilasciato solo a elaborazione conclusa (riuscita o fallita)
+            pano_zooms.pop(panoid, None)
+            if error is not None:
+                journal.mark_failed(panoid, profile, error)
+            
+            with progress_lock:
+                completed[0] += 1
+                done = completed[0]
+            if progress_callback:
+                progress_callback(done, len(panoids), panoid, error)
+        
+        pipeline = Pipeline([
+            PipelineStage('fetch', fetch, workers=fetch_workers),
+            PipelineStage('assemble', assemble),
+            PipelineStage('convert', convert),
+            PipelineStage('encode', encode),
+            PipelineStage('write', write),
+        ], on_done=on_done)
+        try:
+            stats = pipeline.run(((panoid, None) for panoid in pending), should_stop=should_stop)
+        finally:
+            engine.close()
+            journal.close()
+        
+        stats['already_done'] = already_done
+        return stats
+    
+    # ========================================================================================
+    # METODI CORE - DOWNLOAD E CONVERSIONE
+    # ========================================================================================
+    
+    def get_tile_url(self, panoid, x, y, zoom=2):
+        """Genera l'URL per scaricare una tile specifica"""
+        return get_tile_url(panoid, x, y, zoom)
+    
+    def clamp_zoom(self, panoid, zoom):
+        """Zoom richiesto, limitato al massimo disponibile per il panorama (photosphere)"""
+        if self.zoom_probe is not None:
+            max_zoom = self.zoom_probe.max_zoom(panoid)
+            if max_zoom is not None and zoom > max_zoom:
+                print(f"⚠ Zoom {zoom} non disponibile per {panoid[:8]}, uso zoom {max_zoom}")
+                return max_zoom
+        return zoom
+    
+    def validate_panoid(self, panoid):
+        """Valida un PanoID"""
+        return self.check_panoid(panoid) == VALIDATION_VALID
+    
+    def check_panoid(self, panoid):
+        """
+        Verifica un PanoID (esiti definitivi memorizzati per la sessione)
+        
+        Returns:
+            str: VALIDATION_VALID, VALIDATION_INVALID o VALIDATION_UNREACHABLE
+        """
+        if not panoid or len(panoid) < 20:
+            return VALIDATION_INVALID
+        with self._validation_lock:
+            if panoid in self._validation_cache:
+                return self._validation_cache[panoid]
+        
+        test_url = self.get_tile_url(panoid, 0, 0, 0)
+        try:
+            response = http_head(test_url)
+        except Exception:
+            return VALIDATION_UNREACHABLE
+        
+        if response.status_code == 200:
+            result = VALIDATION_VALID
+        elif response.status_code >= 500 or response.status_code in (408, 429):
+            return VALIDATION_UNREACHABLE
+        else:
+            result = VALIDATION_INVALID
+        
+        with self._validation_lock:
+            self._validation_cache[panoid] = result
+        return result
+    
+    def validate_urls(self, urls, result_callback=None, workers=None, should_stop=None):
+        """
+        Valida una lista di URL in parallelo
+        
+        Ogni PanoID viene verificato una sola volta anche se compare in più URL.
+        
+        Args:
+            urls: Lista di URL Street View
+            result_callback: Funzione callback(index, url, panoid, result) chiamata nel thread
+                             chiamante per ogni URL appena il suo esito è noto
+            workers: Verifiche in parallelo (None = DOWNLOAD_CONFIG['validate_workers'])
+            should_stop: Funzione senza argomenti; se restituisce True le verifiche non ancora
+                         avviate vengono annullate
+        
+        Returns:
+            dict: numero di URL per esito {'valid', 'invalid', 'unreachable'} più 'duplicates'
+                  (URL con un PanoID già presente nella lista)
+        """
+        summary = {VALIDATION_VALID: 0, VALIDATION_INVALID: 0, VALIDATION_UNREACHABLE: 0, 'duplicates': 0}
+        
+        def report(index, panoid, result):
+            summary[result] += 1
+            if result_callback:
+                result_callback(index, urls[index], panoid, result)
+        
+        # URL raggruppati per PanoID: una sola richiesta per PanoID
+        by_panoid = {}
+        for index, url in enumerate(urls):
+            panoid = self.extract_panoid_from_url(url)
+            if not panoid:
+                report(index, None, VALIDATION_INVALID)
+            elif panoid in by_panoid:
+                by_panoid[panoid].append(index)
+                summary['duplicates'] += 1
+            else:
+                by_panoid[panoid] = [index]
+        
+        if not by_panoid:
+            return summary
+        
+        workers = max(1, int(workers or DOWNLOAD_CONFIG['validate_workers']))
+        workers = min(workers, len(by_panoid))
+        ensure_pool_size(workers)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validate") as executor:
+            futures = {executor.submit(self.check_panoid, panoid): panoid for panoid in by_panoid}
+            try:
+                for future in as_completed(futures):
+                    panoid = futures[future]
+                    for index in by_panoid[panoid]:
+                        report(index, panoid, future.result())
+                    if should_stop and should_stop():
+                        break
+            finally:
+                for future in futures:
+                    future.cancel()
+        
+        return summary
+    
+    def download_streetview_image(self, panoid, zoom, progress_var=None, status_var=None, preview_callback=None,
+                                  connection_var=None):
+        """
+        Download immagine Street View completa (tiles scaricate in parallelo)
+        
+        Con preview_callback(PIL Image) il download è progressivo: l'anteprima a bassa risoluzione
+        arriva subito e viene raffinata man mano che arrivano le tiles (immagine finale invariata).
+        progress_var, status_var e connection_var sono oggetti con set() chiamati dal thread del
+        download: dalla GUI vanno passati tramite il bus (ui_bus.BusVariable), mai variabili Tk.
+        """
+        try:
+            # Verifica che zoom sia supportato
+            if zoom not in ZOOM_GRID:
+                print(f"⚠ Zoom {zoom} non supportato, uso zoom 2")
+                zoom = 2
+            
+            # Photosphere con risoluzione inferiore: usa lo zoom massimo disponibile
+            zoom = self.clamp_zoom(panoid, zoom)
+            
+            tiles_x, tiles_y = self.tile_fetcher.grid(panoid, zoom)
+            print(f"📐 Download risoluzione zoom {zoom}: {tiles_x}x{tiles_y} tiles")
+            print(f"🔽 Inizio download {tiles_x * tiles_y} tiles "
+                  f"({self.tile_fetcher.max_workers} in parallelo)...")
+            
+            def on_tile(downloaded_tiles, total_tiles):
+                # Aggiorna progress
+                if progress_var:
+                    progress = (downloaded_tiles / total_tiles) * 100
+                    progress_var.set(progress)
+                
+                if status_var:
+                    status_var.set(f"Download: {downloaded_tiles}/{total_tiles} tiles")
+            
+            if preview_callback:
+                final_image, failed_tiles = self.tile_fetcher.download_progressive(
+                    panoid, zoom, preview_callback, on_tile)
+            else:
+                final_image, failed_tiles = self.tile_fetcher.download_image(panoid, zoom, on_tile)
+            if failed_tiles:
+                print(f"⚠ {failed_tiles} tiles non disponibili")
+            
+            return final_image
+        except Exception as e:
+            # Gestione errore generale del download dell'immagine
+            if status_var:
+                try:
+                    status_var.set(f"❌ Errore download tiles: {str(e)}")
+                except Exception:
+                    pass
+            if connection_var:
+                connection_var.set("🔴 Offline")
+            print(f"Errore download_streetview_image: {e}")
+            return None
+    
+    def create_overlap_image(self, base_image, overlap_percent, panoid=None):
+        """Overlap removed: compatibility no-op returning base image."""
+        return base_image
+    
+    def _fill_overlap_borders_v2(self, expanded_image, base_image, offset_x, offset_y, overlap_ratio):
+        """Riempie i bordi dell'immagine espansa mantenendo proporzioni 2:1"""
+        width, height = base_image.size
+        exp_width, exp_height = expanded_image.size
+        
+        # Bordo sinistro - wraparound orizzontale
+        if offset_x > 0:
+            # Prendi parte destra dell'immagine base per il bordo sinistro
+            strip_width = offset_x
+            right_strip = base_image.crop((width - strip_width, 0, width, height))
+            
+            # Scala verticalmente se necessario per riempire altezza espansa
+            if exp_height != height:
+                right_strip = right_strip.resize((strip_width, exp_height), Image.Resampling.LANCZOS)
+            
+            expanded_image.paste(right_strip, (0, offset_y))
+        
+        # Bordo destro - wraparound orizzontale  
+        remaining_width = exp_width - (offset_x + width)
+        if remaining_width > 0:
+            # Prendi parte sinistra dell'immagine base per il bordo destro
+            left_strip = base_image.crop((0, 0, remaining_width, height))
+            
+            # Scala verticalmente se necessario
+            if exp_height != height:
+                left_strip = left_strip.resize((remaining_width, exp_height), Image.Resampling.LANCZOS)
+            
+            expanded_image.paste(left_strip, (offset_x + width, offset_y))
+        
+        # Bordi superiore e inferiore - stretch orizzontale dell'equatore
+        if offset_y > 0:
+            # Usa le righe equatoriali per il bordo superiore
+            equator_y = height // 2
+            equator_strip = base_image.crop((0, equator_y - 5, width, equator_y + 5))
+            equator_resized = equator_strip.resize((width, offset_y), Image.Resampling.LANCZOS)
+            expanded_image.paste(equator_resized, (offset_x, 0))
+            
+            # Riempi anche i bordi sinistro/destro dell'area superiore
+            if offset_x > 0:
+                # Bordo superiore sinistro
+                eq_left = equator_strip.crop((width - offset_x, 0, width, 10))
+                eq_left_resized = eq_left.resize((offset_x, offset_y), Image.Resampling.LANCZOS)
+                expanded_image.paste(eq_left_resized, (0, 0))
+            
+            if remaining_width > 0:
+                # Bordo superiore destro
+                eq_right = equator_strip.crop((0, 0, remaining_width, 10))
+                eq_right_resized = eq_right.resize((remaining_width, offset_y), Image.Resampling.LANCZOS)
+                expanded_image.paste(eq_right_resized, (offset_x + width, 0))
+        
+        # Bordo inferiore
+        remaining_height = exp_height - (offset_y + height)
+        if remaining_height > 0:
+            # Usa le righe equatoriali per il bordo inferiore
+            equator_y = height // 2
+            equator_strip = base_image.crop((0, equator_y - 5, width, equator_y + 5))
+            equator_resized = equator_strip.resize((width, remaining_height), Image.Resampling.LANCZOS)
+            expanded_image.paste(equator_resized, (offset_x, offset_y + height))
+            
+            # Riempi anche i bordi sinistro/destro dell'area inferiore
+            if offset_x > 0:
+                # Bordo inferiore sinistro
+                eq_left = equator_strip.crop((width - offset_x, 0, width, 10))
+                eq_left_resized = eq_left.resize((offset_x, remaining_height), Image.Resampling.LANCZOS)
+                expanded_image.paste(eq_left_resized, (0, offset_y + height))
+            
+            if remaining_width > 0:
+                # Bordo inferiore destro
+                eq_right = equator_strip.crop((0, 0, remaining_width, 10))
+                eq_right_resized = eq_right.resize((remaining_width, remaining_height), Image.Resampling.LANCZOS)
+                expanded_image.paste(eq_right_resized, (offset_x + width, offset_y + height))
+    
+    def _fill_corner_overlaps(self, expanded_image, base_image, offset_x, offset_y):
+        """Riempie gli angoli dell'immagine espansa con interpolazione"""
+        exp_width, exp_height = expanded_image.size
+        width, height = base_image.size
+        
+        # Dimensioni angoli
+        corner_w = offset_x
+        corner_h = offset_y
+        
+        if corner_w > 0 and corner_h > 0:
+            # Angolo top-left
+            corner_tl = base_image.crop((width - corner_w, 0, width, corner_h))
+            expanded_image.paste(corner_tl, (0, 0))
+            
+            # Angolo top-right
+            corner_tr = base_image.crop((0, 0, corner_w, corner_h))
+            expanded_image.paste(corner_tr, (offset_x + width, 0))
+            
+            # Angolo bottom-left
+            corner_bl = base_image.crop((width - corner_w, height - corner_h, width, height))
+            expanded_image.paste(corner_bl, (0, offset_y + height))
+            
+            # Angolo bottom-right
+            corner_br = base_image.crop((0, height - corner_h, corner_w, height))
+            expanded_image.paste(corner_br, (offset_x + width, offset_y + height))
+
+    # -----------------------------------------------------------------
+    # Metodi per download metadata e creazione overlap reale
+    # -----------------------------------------------------------------
+    def fetch_pano_metadata(self, panoid):
+        """Metadata di un pano (se disponibili) per ottenere link ai vicini, letti dalla cache se validi."""
+        found, data = self.metadata_cache.get(panoid)
+        if found:
+            return data
+        
+        definitive, data = self._download_pano_metadata(panoid, get_circuit_breaker('metadata'))
+        # Solo un esito definitivo va in cache: rete, timeout, 5xx e 429 esauriti non dicono
+        # che il metadata manca (la cache negativa è persistente)
+        if definitive:
+            self.metadata_cache.put(panoid, data)
+        return data
+    
+    def _download_pano_metadata(self, panoid, breaker):
+        """
+        Scarica i metadata di un pano
+        
+        Returns:
+            tuple: (definitivo, metadata); metadata = None se non disponibili, definitivo = False
+                   se l'esito dipende da un errore temporaneo (da non memorizzare)
+        """
+        try:
+            url = f"https://maps.google.com/cbk?output=json&panoid={panoid}"
+            resp = self.retry_policy.execute(lambda: http_get(url), label=f"Metadata {panoid[:8]}",
+                                             breaker=breaker, accept_statuses=(404,))
+            if resp is None:
+                return False, None
+            if resp.status_code == 404:
+                return True, None
+            text = resp.text
+            try:
+                data = resp.json()
+            except Exception:
+                idx = text.find('{')
+                if idx >= 0:
+                    try:
+                        data = json.loads(text[idx:])
+                    except Exception:
+                        return True, None
+                else:
+                    return True, None
+            if isinstance(data, dict) and data.get('status') == 'ZERO_RESULTS':
+                return True, None
+            return True, data
+        except Exception:
+            return False, None
+
+    def download_equirectangular_pano(self, panoid, zoom=2):
+        """Scarica l'equirectangular di un pano usando download_streetview_image."""
+        try:
+            return self.download_streetview_image(panoid, zoom)
+        except Exception:
+            return None
+
+    def _create_true_overlap(self, base_image, panoid, overlap_percent, zoom=2):
+        """Crea overlap reale usando panorami limitrofi quando disponibili.
+
+        Restituisce un'immagine espansa con blend dei crop dai vicini o None se non applicabile.
+        """
+        # Require OpenCV for true-overlap pipeline (for alignment & blending)
+        if not HAS_OPENCV:
+            print("⚠ OpenCV non disponibile localmente: salto true-overlap")
+            return None
+
+        try:
+            meta = self.fetch_pano_metadata(panoid)
+            if not meta:
+                print("⚠ Metadata non trovati: useremo vicini sintetici (shift dell'equirettangolare)")
+                links = None
+
+            links = None
+            if isinstance(meta, dict):
+                for key in ['Links', 'links', 'l', 'data']:
+                    if key in meta:
+                        # alcuni endpoint annidano i dati
+                        links = meta[key]
+                        break
+                if links is None and 'data' in meta and isinstance(meta['data'], dict):
+                    for key in ['Links', 'links', 'l']:
+                        if key in meta['data']:
+                            links = meta['data'][key]
+                            break
+
+            # Precompute sizes for synthetic neighbor creation if needed
+            width, height = base_image.size
+            ov_w = int(width * (overlap_percent / 100.0))
+            ov_h = int(height * (overlap_percent / 100.0))
+
+            if not links:
+                # Create synthetic neighbors by horizontally rolling the base image.
+                # This helps when metadata is not available but we still want a 'real' overlap.
+                print("⚠ Metadata non trovati: uso vicini sintetici ottenuti shiftando l'equirettangolare")
+                try:
+                    def roll_image(im, dx):
+                        w, h = im.size
+                        dx = int(dx) % w
+                        if dx == 0:
+                            return im.copy()
+                        left = im.crop((0, 0, dx, h))
+                        right = im.crop((dx, 0, w, h))
+                        new = Image.new('RGB', (w, h))
+                        new.paste(right, (0, 0))
+                        new.paste(left, (w - dx, 0))
+                        return new
+
+                    synth_shift = max(ov_w * 2, width // 4)
+                    neigh_left_img = roll_image(base_image, synth_shift)
+                    neigh_right_img = roll_image(base_image, -synth_shift)
+
+                    links = [
+                        {'img': neigh_left_img, 'side': 'left'},
+                        {'img': neigh_right_img, 'side': 'right'},
+                    ]
+                except Exception as e:
+                    print(f"⚠ Errore creazione vicini sintetici: {e}")
+                    return None
+
+            new_w = width + 2 * ov_w
+            new_h = height + 2 * ov_h
+            expanded = Image.new('RGB', (new_w, new_h))
+            offset_x = ov_w
+            offset_y = ov_h
+            expanded.paste(base_image, (offset_x, offset_y))
+
+            placed_left = False
+            placed_right = False
+
+            # ensure debug folder exists
+            dbg_folder = os.path.join('debug_outputs', 'true_overlap_debug')
+            try:
+                os.makedirs(dbg_folder, exist_ok=True)
+            except Exception:
+                dbg_folder = None
+
+            # links può essere lista di dict o array; iteriamo
+            for link in links:
+                try:
+                    # allow pre-supplied neighbor images (synthetic case)
+                    neigh_img = None
+                    yaw = None
+                    neighbor_panoid = None
+
+                    if isinstance(link, dict) and 'img' in link:
+                        neigh_img = link['img']
+                        yaw = link.get('yaw') or None
+                    else:
+                        if isinstance(link, dict):
+                            neighbor_panoid = link.get('pano') or link.get('panoid') or link.get('id')
+                            yaw = link.get('yaw') or link.get('heading')
+                        elif isinstance(link, (list, tuple)) and len(link) >= 2:
+                            neighbor_panoid = link[0]
+                            yaw = None
+
+                        if neighbor_panoid:
+                            neigh_img = self.download_equirectangular_pano(neighbor_panoid, zoom)
+
+                    if neigh_img is None:
+                        continue
+
+                    # se necessario scala verticalmente
+                    nw, nh = neigh_img.size
+                    if nh != height:
+                        neigh_scaled = neigh_img.resize((int(nw * (height / nh)), height), Image.Resampling.LANCZOS)
+                    else:
+                        neigh_scaled = neigh_img
+
+                    # Decide side basandosi su yaw oppure tentativo greedy
+                    side = None
+                    if yaw is not None:
+                        try:
+                            yawf = float(yaw) % 360
+                            if 45 <= yawf <= 135:
+                                side = 'right'
+                            elif 225 <= yawf <= 315:
+                                side = 'left'
+                        except Exception:
+                            side = None
+
+                    if side is None:
+                        side = 'right' if not placed_right else ('left' if not placed_left else None)
+
+                    if side == 'right' and not placed_right:
+                        crop = neigh_scaled.crop((0, 0, ov_w, height))
+                        crop = crop.resize((ov_w, height), Image.Resampling.LANCZOS)
+                        base_strip = base_image.crop((width - ov_w, 0, width, height))
+                        # Use OpenCV alignment + feather blending
+                        try:
+                            blended = self._align_and_feather_blend(base_strip, crop)
+                        except Exception as e:
+                            print(f"⚠ align/blend right failed: {e}")
+                            blended = Image.blend(base_strip, crop, alpha=0.5)
+
+                        expanded.paste(blended, (offset_x + width, offset_y))
+                        placed_right = True
+                        # save debug
+                        if dbg_folder:
+                            try:
+                                base_strip.save(os.path.join(dbg_folder, f"{panoid}_base_right_strip.jpg"))
+                                crop.save(os.path.join(dbg_folder, f"{panoid}_neigh_right_crop.jpg"))
+                                blended.save(os.path.join(dbg_folder, f"{panoid}_blended_right.jpg"))
+                            except Exception:
+                                pass
+
+                    elif side == 'left' and not placed_left:
+                        crop = neigh_scaled.crop((neigh_scaled.size[0] - ov_w, 0, neigh_scaled.size[0], height))
+                        crop = crop.resize((ov_w, height), Image.Resampling.LANCZOS)
+                        base_strip = base_image.crop((0, 0, ov_w, height))
+                        try:
+                            blended = self._align_and_feather_blend(base_strip, crop)
+                        except Exception as e:
+                            print(f"⚠ align/blend left failed: {e}")
+                            blended = Image.blend(base_strip, crop, alpha=0.5)
+
+                        expanded.paste(blended, (0, offset_y))
+                        placed_left = True
+                        if dbg_folder:
+                            try:
+                                base_strip.save(os.path.join(dbg_folder, f"{panoid}_base_left_strip.jpg"))
+                                crop.save(os.path.join(dbg_folder, f"{panoid}_neigh_left_crop.jpg"))
+                                blended.save(os.path.join(dbg_folder, f"{panoid}_blended_left.jpg"))
+                            except Exception:
+                                pass
+
+                    if placed_left and placed_right:
+                        break
+
+                except Exception:
+                    continue
+
+            if not (placed_left or placed_right):
+                return None
+
+            try:
+                self._fill_overlap_borders_v2(expanded, base_image, offset_x, offset_y, overlap_percent/100.0)
+            except Exception:
+                pass
+
+            return expanded
+
+        except Exception as e:
+            print(f"Errore _create_true_overlap: {e}")
+            return None
+
+    def _align_and_feather_blend(self, imgA, imgB, feather=0.2):
+        """Allinea imgB su imgA usando feature-matching (ORB) e applica un blending sfumato.
+
+        imgA, imgB: PIL Images (stesse dimensioni attese)
+        feather: frazione della larghezza su cui applicare la dissolvenza
+        """
+        # Fallback semplice se OpenCV non disponibile
+        if not HAS_OPENCV:
+            return Image.blend(imgA, imgB, alpha=0.5)
+
+        try:
+            import numpy as np
+
+            a = np.array(imgA.convert('RGB'))
+            b = np.array(imgB.convert('RGB'))
+
+            grayA = cv2.cvtColor(a, cv2.COLOR_RGB2GRAY)
+            grayB = cv2.cvtColor(b, cv2.COLOR_RGB2GRAY)
+
+            # ORB features
+            # Create ORB detector (use getattr to keep static checkers happy)
+            orb_creator = getattr(cv2, 'ORB_create', None)
+            if orb_creator is None:
+                # ORB not available in this OpenCV build - fallback
+                return Image.blend(imgA, imgB, alpha=0.5)
+            orb = orb_creator(1000)
+
+            kp1, des1 = orb.detectAndCompute(grayA, None)
+            kp2, des2 = orb.detectAndCompute(grayB, None)
+
+            if des1 is None or des2 is None:
+                return Image.blend(imgA, imgB, alpha=0.5)
+
+            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+            matches = bf.match(des1, des2)
+            matches = sorted(matches, key=lambda x: x.distance)
+
+            if len(matches) < 8:
+                return Image.blend(imgA, imgB, alpha=0.5)
+
+            src_pts = np.array([kp2[m.trainIdx].pt for m in matches], dtype=np.float32).reshape(-1, 1, 2)
+            dst_pts = np.array([kp1[m.queryIdx].pt for m in matches], dtype=np.float32).reshape(-1, 1, 2)
+
+            M, mask = cv2.estimateAffinePartial2D(src_pts, dst_pts)
+            if M is None:
+                return Image.blend(imgA, imgB, alpha=0.5)
+
+            h, w = grayA.shape
+            warped = cv2.warpAffine(b, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+
+            # Create feather mask horizontally
+            mask = np.zeros((h, w), dtype=np.float32)
+            fw = int(w * feather)
+            if fw < 1:
+                fw = 1
+            # Left to right fade
+            mask[:, :fw] = np.linspace(1.0, 0.0, fw)
+            mask[:, fw:w-fw] = 0.0
+            mask[:, w-fw:] = np.linspace(0.0, 1.0, fw)
+
+            # Combine with warped and original
+            warped_f = warped.astype(np.float32)
+            a_f = a.astype(np.float32)
+            alpha = mask[:, :, None]
+            # blended = a * (1-alpha) + warped * alpha  but we want seam across overlap area,
+            # so use alpha for warped contribution
+            blended = (a_f * (1.0 - alpha) + warped_f * alpha).astype(np.uint8)
+
+            return Image.fromarray(blended)
+
+        except Exception:
+            return Image.blend(imgA, imgB, alpha=0.5)
+    
+    def equirect_to_cubemap(self, equirect_image, face_size=None, workers=None):
+        """
+        Converte immagine equirettangolare in cubemap
+        
+        Args:
+            equirect_image: PIL Image equirettangolare
+            face_size: Dimensione facce (None = metà altezza)
+            workers: Thread per le facce in parallelo
+                     (None = CONVERSION_CONFIG['workers'], 0 = uno per core)
+        """
+        try:
+            width, height = equirect_image.size
+            
+            # Dimensione automatica delle facce
+            if face_size is None:
+                face_size = height // 2
+            
+            # Le 6 facce del cubo
+            face_names = ['front', 'right', 'back', 'left', 'up', 'down']
+            
+            # Converte in array per elaborazione più veloce e usa campionamento bilineare
+            import numpy as np
+            if not HAS_NUMPY:
+                # Fallback senza numpy
+                return self.equirect_to_cubemap_simple(equirect_image, face_size)
+
+            img_array = np.array(equirect_image).astype(np.float32)
+            
+            from projection_cache import get_projection_cache
+            projection_cache = get_projection_cache()
+
+            def bilinear_sample(xf, yf):
+                # xf, yf can be floats; wrap x horizontally, clamp y
+                # integer base indices (unwrapped for fractional computation)
+                x0_unwrapped = np.floor(xf).astype(int)
+                x0 = (x0_unwrapped % width).astype(int)
+                y0 = np.floor(yf).astype(int)
+                x1 = (x0 + 1) % width
+                y1 = np.clip(y0 + 1, 0, height - 1)
+
+                # fractional part (use unwrapped x0 for correct fraction); pesi float32 come
+                # il cubemap diretto dalle tiles (tile_cubemap), che produce le stesse facce
+                wx = (xf - x0_unwrapped).astype(np.float32)
+                wy = (yf - y0).astype(np.float32)
+
+                # sample four neighbors
+                p00 = img_array[y0, x0]
+                p10 = img_array[y0, x1]
+                p01 = img_array[y1, x0]
+                p11 = img_array[y1, x1]
+
+                top = p00 * (1 - wx)[:, None] + p10 * (wx)[:, None]
+                bottom = p01 * (1 - wx)[:, None] + p11 * (wx)[:, None]
+                result = top * (1 - wy)[:, None] + bottom * (wy)[:, None]
+                return result
+
+            def make_face(i):
+                face_name = face_names[i]
+                # Special-case pragmatic fixes requested by user:
+                # - back: compose from rightmost + leftmost vertical strips (wrap-around) and resize
+                # - up / down: take top/bottom strips rather than full spherical re-projection (avoids central artefacts)
+                if face_name == 'back':
+                    # angular width per face = 90deg -> corresponds to width/4 pixels in equirect
+                    slice_w = max(1, width // 4)
+                    # include a small overlap (15% of slice) to be safe
+                    overlap_px = max(1, slice_w * 15 // 100)
+                    right_strip = equirect_image.crop((width - slice_w - overlap_px, 0, width, height))
+                    left_strip = equirect_image.crop((0, 0, slice_w + overlap_px, height))
+                    combined = Image.new('RGB', (left_strip.width + right_strip.width, height))
+                    # paste left then right to preserve original left/right ordering
+                    combined.paste(left_strip, (0, 0))
+                    combined.paste(right_strip, (left_strip.width, 0))
+                    # Resize combined horizontally to face_size and vertically to face_size
+                    face_img = combined.resize((face_size, face_size), Image.Resampling.LANCZOS)
+                    return face_img
+
+                if face_name == 'up' or face_name == 'down':
+                    # take a tall strip from the top (up) or bottom (down) of the equirect and resize
+                    # choose strip height as ~35% of image height (empirical)
+                    strip_h = max(2, int(height * 0.35))
+                    if face_name == 'up':
+                        strip = equirect_image.crop((0, 0, width, strip_h))
+                    else:
+                        strip = equirect_image.crop((0, height - strip_h, width, height))
+                    # center-crop horizontally to width (already full width) and resize to square face
+                    face_img = strip.resize((face_size, face_size), Image.Resampling.LANCZOS)
+                    return face_img
+
+                # Generic case: spherical reprojection with bilinear sampling.
+                # Le coordinate di campionamento dipendono solo dalla geometria:
+                # vengono prese dalla cache delle mappe di proiezione
+                coord_map = projection_cache.get_or_compute(
+                    ('equirect_to_cube_bilinear', width, height, face_size, i),
+                    lambda: self._cubemap_face_coords(width, height, face_size, i))
+
+                # Bilinear sampling di tutta la faccia
+                samples = bilinear_sample(coord_map[0], coord_map[1])
+                face = np.clip(samples, 0, 255).astype(np.uint8).reshape(face_size, face_size, 3)
+
+                return Image.fromarray(face)
+
+            # Le facce sono indipendenti: NumPy e PIL rilasciano il GIL durante il campionamento
+            if workers is None:
+                workers = CONVERSION_CONFIG['workers']
+            workers = max(1, min(workers or os.cpu_count() or 1, len(face_names)))
+            if workers == 1:
+                face_images = [make_face(i) for i in range(len(face_names))]
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cubemap-face") as executor:
+                    face_images = list(executor.map(make_face, range(len(face_names))))
+            faces = dict(zip(face_names, face_images))
+            
+            return faces
+            
+        except Exception as e:
+            print(f"Errore conversione cubemap: {e}")
+            # Fallback - crea facce vuote
+            return self.create_empty_cubemap(face_size or 512)
+    
+    def iter_cubemap_faces_from_tiles(self, panoid, zoom, face_size=None, fetcher=None, progress_callback=None,
+                                      tile_bytes=None):
+        """
+        Genera le facce del cubemap direttamente dalle tiles, una alla volta
+        
+        Tutte le facce usano la proiezione sferica bilineare di equirect_to_cubemap
+        (front/right/left sono identiche, back/up/down non usano i casi speciali)
+        
+        Yields:
+            tuple: (face_name, PIL Image)
+        """
+        from projection_cache import get_projection_cache
+        from tile_cubemap import TileCubemapBuilder
+        
+        def face_coords(width, height, face_size, face_index):
+            return get_projection_cache().get_or_compute(
+                ('equirect_to_cube_bilinear', width, height, face_size, face_index),
+                lambda: self._cubemap_face_coords(width, height, face_size, face_index))
+        
+        builder = TileCubemapBuilder(fetcher or self.tile_fetcher, face_coords)
+        return builder.iter_faces(panoid, zoom, face_size, progress_callback, tile_bytes)
+    
+    def build_cubemap_from_tiles(self, panoid, zoom, face_size=None, fetcher=None, progress_callback=None):
+        """Cubemap diretto dalle tiles come dict {face_name: PIL Image}"""
+        return dict(self.iter_cubemap_faces_from_tiles(panoid, zoom, face_size, fetcher, progress_callback))
+    
+    def _cubemap_face_coords(self, width, height, face_size, face_index):
+        """
+        Calcola le coordinate equirettangolari (float) campionate da una faccia del cubo
+        
+        I temporanei float64 sono calcolati a bande di righe entro CONVERSION_CONFIG['memory_budget_mb']
+        
+        Returns:
+            numpy.ndarray: array float32 (2, face_size*face_size) con righe xs, ys
+        """
+        from panorama_converter import row_bands
+        
+        uf = (np.arange(face_size, dtype=np.float32) + 0.5) / face_size
+        vf = (np.arange(face_size, dtype=np.float64) + 0.5) / face_size
+        coords = np.empty((2, face_size * face_size), dtype=np.float32)
+        
+        memory_budget = CONVERSION_CONFIG['memory_budget_mb'] * 1024 * 1024
+        for start, stop in row_bands(face_size, face_size, memory_budget):
+            u_grid, v_grid = np.meshgrid(uf.astype(np.float64), vf[start:stop])
+
+            # Converte coordinate cubo in coordinate sferiche
+            thetas, phis = self.cube_to_sphere_coords_grid(u_grid, v_grid, face_index)
+            thetas = thetas.astype(np.float32).ravel()
+            phis = phis.astype(np.float32).ravel()
+
+            # Mappa su coordinate equirettangolari (float), ys in [0, height-1]
+            band = slice(start * face_size, stop * face_size)
+            coords[0, band] = (thetas / (2 * math.pi) + 0.5) * width
+            coords[1, band] = np.clip((phis / math.pi) * height, 0, height - 1 - 1e-6)
+
+        return coords
+    
+    def equirect_to_cubemap_simple(self, equirect_image, face_size):
+        """Versione semplificata senza numpy"""
+        width, height = equirect_image.size
+        faces = {}
+        face_names = ['front', 'right', 'back', 'left', 'up', 'down']
+        
+        for i, face_name in enumerate(face_names):
+            face = Image.new('RGB', (face_size, face_size))
+            
+            for v in range(face_size):
+                for u in range(face_size):
+                    uf = (u + 0.5) / face_size
+                    vf = (v + 0.5) / face_size
+                    
+                    theta, phi = self.cube_to_sphere_coords(uf, vf, i)
+                    
+                    x = int((theta / (2 * math.pi) + 0.5) * width) % width
+                    y = int((phi / math.pi) * height)
+                    y = max(0, min(height - 1, y))
+                    
+                    pixel = equirect_image.getpixel((x, y))
+                    face.putpixel((u, v), pixel)
+            
+            faces[face_name] = face
+        
+        return faces
+    
+    def cube_to_sphere_coords(self, u, v, face):
+        """Converte coordinate cubo in coordinate sferiche"""
+        # Normalizza a [-1, 1]
+        uu = u * 2.0 - 1.0
+        vv = v * 2.0 - 1.0
+
+        # Convert image Y (downward) to 3D Y (upward)
+        y_common = -vv
+
+        # Standard cube face mapping (assumes faces order: front, right, back, left, up, down)
+        if face == 0:  # front (+Z)
+            x, y, z = uu, y_common, 1.0
+        elif face == 1:  # right (+X)
+            x, y, z = 1.0, y_common, -uu
+        elif face == 2:  # back (-Z)
+            x, y, z = -uu, y_common, -1.0
+        elif face == 3:  # left (-X)
+            x, y, z = -1.0, y_common, uu
+        elif face == 4:  # up (+Y)
+            x, y, z = uu, 1.0, vv
+        elif face == 5:  # down (-Y)
+            x, y, z = uu, -1.0, -vv
+        else:
+            x, y, z = 1.0, 0.0, 0.0
+        
+        # Normalizza vettore
+        length = math.sqrt(x*x + y*y + z*z)
+        x, y, z = x/length, y/length, z/length
+        
+        # Converte in coordinate sferiche
+        theta = math.atan2(z, x)
+        phi = math.acos(max(-1, min(1, y)))  # Clamp per evitare errori numerici
+        
+        return theta, phi
+    
+    def cube_to_sphere_coords_grid(self, u, v, face):
+        """Versione vettorizzata di cube_to_sphere_coords su array NumPy di coordinate (u, v)"""
+        # Normalizza a [-1, 1]
+        uu = u * 2.0 - 1.0
+        vv = v * 2.0 - 1.0
+
+        # Convert image Y (downward) to 3D Y (upward)
+        y_common = -vv
+        ones = np.ones_like(uu)
+
+        # Stesso mapping delle facce di cube_to_sphere_coords
+        if face == 0:  # front (+Z)
+            x, y, z = uu, y_common, ones
+        elif face == 1:  # right (+X)
+            x, y, z = ones, y_common, -uu
+        elif face == 2:  # back (-Z)
+            x, y, z = -uu, y_common, -ones
+        elif face == 3:  # left (-X)
+            x, y, z = -ones, y_common, uu
+        elif face == 4:  # up (+Y)
+            x, y, z = uu, ones, vv
+        elif face == 5:  # down (-Y)
+            x, y, z = uu, -ones, -vv
+        else:
+            x, y, z = ones, np.zeros_like(uu), np.zeros_like(uu)
+
+        # Normalizza vettore
+        length = np.sqrt(x*x + y*y + z*z)
+        x, y, z = x/length, y/length, z/length
+
+        # Converte in coordinate sferiche
+        theta = np.arctan2(z, x)
+        phi = np.arccos(np.clip(y, -1, 1))  # Clamp per evitare errori numerici
+
+        return theta, phi
+    
+    def create_empty_cubemap(self, face_size):
+        """Crea cubemap vuoto per fallback"""
+        faces = {}
+        face_names = ['front', 'right', 'back', 'left', 'up', 'down']
+        
+        for face_name in face_names:
+            faces[face_name] = Image.new('RGB', (face_size, face_size), color=(128, 128, 128))
+        
+        return faces
@@ -5,8 +5,6 @@ Un programma per scaricare e ricostruire immagini equirettangolari da Google Str
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import requests
-import re
 import json
 from PIL import Image, ImageTk
 import os
@@ -25,6 +23,8 @@ from config import (
     ZOOM_LEVELS, PANOID_PATTERNS, MESSAGES
 )
 from streetview_utils import StreetViewUtils, PanoIDExtractor
+from panoid_extractor import extract_panoid
+from http_session import http_get
 
 
 class StreetViewDownloader:
@@ -118,18 +118,7 @@ class StreetViewDownloader:
         
     def extract_panoid_from_url(self, url):
         """Estrae il PanoID dall'URL di Google Street View"""
-        patterns = [
-            r'!1s([a-zA-Z0-9_-]+)',  # Pattern principale
-            r'photosphereId=([a-zA-Z0-9_-]+)',  # Pattern alternativo
-            r'panoid=([a-zA-Z0-9_-]+)',  # Pattern diretto
-            r'pano=([a-zA-Z0-9_-]+)'  # Pattern pano
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        return extract_panoid(url)
         
     def extract_panoid(self):
         """Estrae il PanoID dall'URL fornito"""
@@ -179,20 +168,8 @@ class StreetViewDownloader:
             # Cerca il PanoID nel codice JavaScript della pagina
             page_source = driver.page_source
             
-            # Pattern per cercare il PanoID nel codice della pagina
-            patterns = [
-                r'"pano":"([a-zA-Z0-9_-]+)"',
-                r'"panoid":"([a-zA-Z0-9_-]+)"',
-                r'pano:"([a-zA-Z0-9_-]+)"',
-                r'"panoId":"([a-zA-Z0-9_-]+)"'
-            ]
-            
-            panoid = None
-            for pattern in patterns:
-                matches = re.findall(pattern, page_source)
-                if matches:
-                    panoid = matches[0]
-                    break
+            # Stessa estrazione degli URL: un'unica espressione precompilata
+            panoid = extract_panoid(page_source)
             
             driver.quit()
             
@@ -275,7 +252,7 @@ class StreetViewDownloader:
                         url = self.get_tile_url(panoid, x, y, zoom)
                         
                         try:
-                            response = requests.get(url, timeout=10)
+                            response = http_get(url)
                             if response.status_code == 200:
                                 from io import BytesIO
                                 tile_image = Image.open(BytesIO(response.content))
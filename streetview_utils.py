@@ -2,12 +2,17 @@
 Utilità per il download e la manipolazione delle immagini Street View
 """
 
-import requests
 import re
 import json
 from PIL import Image
 import math
 
+from http_session import http_get, http_head
+from tile_fetcher import TILE_SIZE
+from zoom_probe import ZoomProbe
+from panoid_extractor import extract_panoid, find_panoids
+from config import PANOID_PATTERNS
+
 # NumPy e OpenCV sono opzionali per funzionalità avanzate
 try:
     import numpy as np
@@ -27,6 +32,9 @@ except ImportError:
 class StreetViewUtils:
     """Classe di utilità per operazioni avanzate su Street View"""
     
+    # Zoom e griglie già rilevati, condivisi da tutte le chiamate
+    zoom_probe = ZoomProbe()
+    
     @staticmethod
     def extract_panoid_from_metadata(url):
         """
@@ -47,7 +55,7 @@ class StreetViewUtils:
             }
             
             try:
-                response = requests.get(metadata_url, params=params)
+                response = http_get(metadata_url, params=params)
                 if response.status_code == 200:
                     data = response.json()
                     if data.get('status') == 'OK':
@@ -162,21 +170,9 @@ class StreetViewUtils:
     @staticmethod
     def get_available_zoom_levels(panoid):
         """
-        Determina i livelli di zoom disponibili per un PanoID
+        Determina i livelli di zoom disponibili per un PanoID (richieste in parallelo, risultato in cache)
         """
-        available_levels = []
-        
-        for zoom in range(5):  # Testa zoom da 0 a 4
-            test_url = f"https://streetviewpixels-pa.googleapis.com/v1/tile?cb_client=maps_sv.tactile&panoid={panoid}&x=0&y=0&zoom={zoom}&nbt=1&fover=2"
-            
-            try:
-                response = requests.head(test_url, timeout=5)
-                if response.status_code == 200:
-                    available_levels.append(zoom)
-            except:
-                pass
-        
-        return available_levels
+        return StreetViewUtils.zoom_probe.available_zooms(panoid)
     
     @staticmethod
     def get_panorama_info(panoid):
@@ -194,17 +190,9 @@ class StreetViewUtils:
             max_zoom = max(info['available_zooms'])
             info['max_resolution'] = max_zoom
             
-            # Calcola la dimensione stimata
-            if max_zoom == 0:
-                info['estimated_size'] = (512, 512)
-            elif max_zoom == 1:
-                info['estimated_size'] = (1024, 512)
-            elif max_zoom == 2:
-                info['estimated_size'] = (2048, 1024)
-            elif max_zoom == 3:
-                info['estimated_size'] = (4096, 2048)
-            elif max_zoom == 4:
-                info['estimated_size'] = (8192, 4096)
+            # Dimensione dalla griglia reale di tiles allo zoom massimo
+            tiles_x, tiles_y = StreetViewUtils.zoom_probe.grid(panoid, max_zoom)
+            info['estimated_size'] = (tiles_x * TILE_SIZE, tiles_y * TILE_SIZE)
         
         return info
 
@@ -213,34 +201,19 @@ class PanoIDExtractor:
     """Classe specializzata per l'estrazione di PanoID"""
     
     def __init__(self):
-        self.patterns = [
-            r'!1s([a-zA-Z0-9_-]{20,})',  # Pattern principale Google Maps
-            r'"pano":"([a-zA-Z0-9_-]{20,})"',  # Pattern JSON
-            r'"panoid":"([a-zA-Z0-9_-]{20,})"',  # Pattern JSON alternativo
-            r'pano:"([a-zA-Z0-9_-]{20,})"',  # Pattern JS
-            r'"panoId":"([a-zA-Z0-9_-]{20,})"',  # Pattern alternativo
-            r'photosphereId=([a-zA-Z0-9_-]{20,})',  # Pattern photosphere
-            r'panoid=([a-zA-Z0-9_-]{20,})',  # Pattern URL diretto
-            r'pano=([a-zA-Z0-9_-]{20,})',  # Pattern pano
-            r'cbp=\d+,\d+,\d+,\d+,\d+&amp;panoid=([a-zA-Z0-9_-]{20,})',  # Pattern con cbp
-        ]
+        self.patterns = list(PANOID_PATTERNS)
     
     def extract_from_url(self, url):
         """Estrae PanoID dall'URL usando regex"""
-        for pattern in self.patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        return extract_panoid(url)
     
     def extract_from_page_source(self, page_source):
         """Estrae PanoID dal codice sorgente della pagina"""
-        for pattern in self.patterns:
-            matches = re.findall(pattern, page_source)
-            if matches:
-                # Restituisce il PanoID più lungo (solitamente quello corretto)
-                return max(matches, key=len)
-        return None
+        found = find_panoids(page_source)
+        if not found:
+            return None
+        # Vale il primo pattern con corrispondenze; il PanoID più lungo è solitamente quello corretto
+        return max(found[min(found)], key=len)
     
     def validate_panoid(self, panoid):
         """Valida un PanoID verificando se esiste"""
@@ -250,7 +223,7 @@ class PanoIDExtractor:
         test_url = f"https://streetviewpixels-pa.googleapis.com/v1/tile?cb_client=maps_sv.tactile&panoid={panoid}&x=0&y=0&zoom=0&nbt=1&fover=2"
         
         try:
-            response = requests.head(test_url, timeout=5)
+            response = http_head(test_url)
             return response.status_code == 200
         except:
             return False
@@ -8,6 +8,7 @@ import unittest
 from unittest.mock import Mock, patch
 from PIL import Image
 import tempfile
+import time
 import shutil
 
 # Aggiungi il percorso corrente al path Python
@@ -22,6 +23,34 @@ except ImportError as e:
     TKINTER_AVAILABLE = False
     print(f"Errore import: {e}")
 
+from io import BytesIO
+from tile_fetcher import TileFetcher
+from async_engine import AsyncDownloadEngine
+from tile_cache import TileCache
+from projection_cache import ProjectionCache
+from pipeline import Pipeline, PipelineStage
+from batch_journal import BatchJournal
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, RetryBudget
+from circuit_breaker import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from zoom_probe import ZoomProbe
+from metadata_cache import MetadataCache
+
+
+def make_tile_bytes(color, size=(512, 512)):
+    """Crea il contenuto JPEG di una tile di test"""
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def make_response(status_code=200, content=b''):
+    """Crea una risposta HTTP finta"""
+    response = Mock()
+    response.status_code = status_code
+    response.content = content
+    return response
+
 
 class TestPanoramaConverter(unittest.TestCase):
     """Test per il convertitore panoramico"""
@@ -97,6 +126,89 @@ class TestPanoramaConverter(unittest.TestCase):
         except:
             # Se numpy non è disponibile, fallback al metodo veloce
             self.assertEqual(len(cubemap_fast), 6)
+    
+    def test_banded_conversion_matches_single_pass(self):
+        """Test conversione a bande (budget di memoria ridotto) identica a quella in un solo passo"""
+        from projection_cache import get_projection_cache
+        
+        banded = PanoramaConverter(memory_budget_mb=0.5)
+        single = PanoramaConverter(memory_budget_mb=4096)
+        self.assertGreater(len(list(banded._row_bands(256, 512))), 1)
+        self.assertEqual(len(list(single._row_bands(256, 512))), 1)
+        
+        results = []
+        for converter in (banded, single):
+            # Le mappe sono in cache per geometria: vanno ricalcolate da ciascun convertitore
+            get_projection_cache().clear()
+            cubemap = converter.equirectangular_to_cubemap(self.test_equirect, face_size=128, method='quality')
+            equirect = converter.cubemap_to_equirectangular(cubemap, (512, 256), method='quality')
+            results.append((cubemap, equirect))
+        get_projection_cache().clear()
+        
+        (cube_a, equirect_a), (cube_b, equirect_b) = results
+        for face_name in cube_a:
+            self.assertEqual(cube_a[face_name].tobytes(), cube_b[face_name].tobytes())
+        self.assertEqual(equirect_a.tobytes(), equirect_b.tobytes())
+    
+    def test_parallel_faces_match_sequential(self):
+        """Test conversione delle facce in parallelo identica a quella sequenziale"""
+        for method in ('quality', 'auto'):
+            sequential = self.converter.equirectangular_to_cubemap(
+                self.test_equirect, face_size=128, method=method, workers=1)
+            parallel = self.converter.equirectangular_to_cubemap(
+                self.test_equirect, face_size=128, method=method, workers=4)
+            self.assertEqual(list(parallel), list(sequential))
+            for face_name in sequential:
+                self.assertEqual(parallel[face_name].tobytes(), sequential[face_name].tobytes())
+
+
+class TestOpenCVBackend(unittest.TestCase):
+    """Test per il backend cv2.remap del convertitore"""
+    
+    def setUp(self):
+        """Setup test"""
+        import panorama_converter
+        if not panorama_converter.HAS_OPENCV:
+            self.skipTest("OpenCV non disponibile")
+        
+        import numpy as np
+        self.np = np
+        self.converter = PanoramaConverter()
+        
+        # Gradiente continuo attraverso la cucitura a ±180°
+        yy, xx = np.mgrid[0:256, 0:512]
+        pattern = np.stack([np.sin(xx / 512 * 2 * np.pi) * 100 + 128,
+                            yy / 256 * 255,
+                            np.cos(xx / 512 * 2 * np.pi) * 100 + 128], axis=-1)
+        self.equirect = Image.fromarray(pattern.astype(np.uint8))
+    
+    def test_nearest_matches_numpy(self):
+        """Test interpolazione nearest identica al backend NumPy"""
+        reference = self.converter.equirectangular_to_cubemap(self.equirect, 64, method='quality')
+        result = self.converter.equirectangular_to_cubemap(self.equirect, 64, method='cv2',
+                                                           interpolation='nearest')
+        
+        for face_name in reference:
+            self.assertEqual(result[face_name].tobytes(), reference[face_name].tobytes())
+    
+    def test_interpolations_and_roundtrip(self):
+        """Test tutte le interpolazioni e andata/ritorno equirect → cubemap → equirect"""
+        np = self.np
+        for interpolation in ['nearest', 'linear', 'cubic', 'area']:
+            cubemap = self.converter.equirectangular_to_cubemap(self.equirect, 128, method='cv2',
+                                                                interpolation=interpolation)
+            self.assertEqual(cubemap['back'].size, (128, 128))
+            
+            equirect = self.converter.cubemap_to_equirectangular(cubemap, (512, 256), method='cv2',
+                                                                 interpolation=interpolation)
+            error = np.abs(np.asarray(equirect, dtype=int) - np.asarray(self.equirect, dtype=int)).mean()
+            self.assertLess(error, 3, interpolation)
+    
+    def test_invalid_interpolation(self):
+        """Test interpolazione non supportata"""
+        with self.assertRaises(ValueError):
+            self.converter.equirectangular_to_cubemap(self.equirect, 32, method='cv2',
+                                                      interpolation='lanczos')
 
 
 class TestBatchProcessor(unittest.TestCase):
@@ -148,6 +260,1383 @@ class TestBatchProcessor(unittest.TestCase):
         """Test estensioni supportate"""
         expected_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
         self.assertEqual(self.processor.supported_extensions, expected_extensions)
+    
+    def test_parallel_process_folder(self):
+        """Test conversione cartella con pool di processi ed errori isolati per file"""
+        # File corrotto: deve fallire da solo senza fermare gli altri
+        with open(os.path.join(self.input_dir, 'broken.jpg'), 'wb') as f:
+            f.write(b'non un jpeg')
+        
+        progress = []
+        stats = self.processor.process_folder(
+            self.input_dir, self.output_dir, face_size=32,
+            progress_callback=lambda current, total, filename: progress.append((current, total, filename)),
+            workers=2, chunksize=2, ordered=False)
+        
+        self.assertEqual(stats['total_files'], 4)
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual([os.path.basename(path) for path, _ in stats['errors']], ['broken.jpg'])
+        self.assertEqual(len(os.listdir(self.output_dir)), 18)
+        self.assertEqual([current for current, _, _ in progress], [1, 2, 3, 4])
+        self.assertEqual(sorted(name for _, _, name in progress),
+                         ['broken.jpg', 'test_0.jpg', 'test_1.jpg', 'test_2.jpg'])
+    
+    def test_progress_same_for_sequential_and_parallel(self):
+        """Test callback di avanzamento con la stessa semantica con e senza processi paralleli"""
+        def run(workers):
+            progress = []
+            output_dir = os.path.join(self.temp_dir, f'output_{workers}')
+            self.processor.process_folder(
+                self.input_dir, output_dir, face_size=32, workers=workers,
+                progress_callback=lambda current, total, filename: progress.append(
+                    (current, total, filename, len(os.listdir(output_dir)))))
+            return progress
+        
+        sequential, parallel = run(1), run(2)
+        # Ogni chiamata arriva a file concluso: le facce dei file conclusi sono già scritte
+        for progress in (sequential, parallel):
+            self.assertEqual([current for current, _, _, _ in progress], [1, 2, 3])
+            self.assertEqual([total for _, total, _, _ in progress], [3, 3, 3])
+            for current, _, _, written in progress:
+                self.assertGreaterEqual(written, 6 * current)
+        self.assertEqual([written for _, _, _, written in sequential], [6, 12, 18])
+        self.assertEqual(sorted(name for _, _, name, _ in sequential),
+                         sorted(name for _, _, name, _ in parallel))
+
+
+class TestTileFetcher(unittest.TestCase):
+    """Test per il download concorrente delle tiles"""
+    
+    def test_download_image_assembles_all_tiles(self):
+        """Test ricostruzione immagine da tiles scaricate in parallelo"""
+        tile_bytes = make_tile_bytes((200, 0, 0))
+        fetcher = TileFetcher(max_workers=4)
+        progress = []
+        
+        with patch('tile_fetcher.http_get', return_value=make_response(200, tile_bytes)) as mock_get:
+            image, failed = fetcher.download_image('A' * 22, 2, lambda done, total: progress.append((done, total)))
+        
+        self.assertEqual(image.size, (2048, 1024))
+        self.assertEqual(failed, 0)
+        self.assertEqual(mock_get.call_count, 8)
+        self.assertEqual(progress[-1], (8, 8))
+        self.assertGreater(image.getpixel((1800, 900))[0], 150)
+    
+    def test_failed_tiles_are_gray(self):
+        """Test tiles fallite sostituite da tiles grigie"""
+        fetcher = TileFetcher(max_workers=2, max_retries=2)
+        
+        with patch('tile_fetcher.http_get', return_value=make_response(404)) as mock_get:
+            image, failed = fetcher.download_image('A' * 22, 1)
+        
+        self.assertEqual(failed, 2)
+        self.assertEqual(mock_get.call_count, 2)  # 404 è definitivo: nessun retry
+        self.assertEqual(image.getpixel((700, 100)), (64, 64, 64))
+
+
+    def test_progressive_download_matches_full(self):
+        """Test anteprima immediata dallo zoom basso e immagine finale identica"""
+        import re
+        
+        def serve_tile(url, timeout=None):
+            x, y, zoom = (int(v) for v in re.search(r'x=(\d+)&y=(\d+)&zoom=(\d+)', url).groups())
+            return make_response(200, make_tile_bytes((x * 60, y * 120, zoom * 50)))
+        
+        fetcher = TileFetcher(max_workers=4)
+        previews = []
+        
+        def on_preview(image):
+            previews.append((image, mock_get.call_count))
+        
+        with patch('tile_fetcher.http_get', side_effect=serve_tile) as mock_get:
+            full, _ = fetcher.download_image('A' * 22, 2)
+            mock_get.reset_mock()
+            progressive, failed = fetcher.download_progressive('A' * 22, 2, on_preview, preview_zoom=1)
+        
+        self.assertEqual(failed, 0)
+        self.assertEqual(progressive.tobytes(), full.tobytes())
+        self.assertEqual(previews[0][1], 2)  # Prima anteprima dopo le sole 2 tiles dello zoom 1
+        self.assertEqual(previews[0][0].size, (1024, 512))
+        # Anteprima finale con i colori delle tiles dello zoom 2
+        self.assertAlmostEqual(previews[-1][0].getpixel((900, 400))[2], 100, delta=10)
+
+
+class TestAsyncDownloadEngine(unittest.TestCase):
+    """Test per il motore asyncio dei panorami"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.breaker = CircuitBreaker('test', failure_threshold=10, reset_timeout=60)
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Cleanup test"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_panos_share_inflight_limit(self):
+        """Test panorami in parallelo con limite globale di tiles in volo e griglia reale della ZoomProbe"""
+        import asyncio
+        import re
+        import threading
+        lock = threading.Lock()
+        inflight = [0, 0]  # Richieste in corso, massimo osservato
+        
+        def serve(url, timeout=None):
+            with lock:
+                inflight[0] += 1
+                inflight[1] = max(inflight[1], inflight[0])
+            time.sleep(0.01)
+            with lock:
+                inflight[0] -= 1
+            return make_response(200, make_tile_bytes((0, 90, 0)))
+        
+        def serve_head(url, timeout=None):
+            x, y = (int(v) for v in re.search(r'x=(\d+)&y=(\d+)', url).groups())
+            return make_response(200 if x < 3 and y < 1 else 404)  # Photosphere 3x1 a zoom 2
+        
+        fetcher = TileFetcher(breaker=self.breaker, probe=ZoomProbe(breaker=self.breaker))
+        engine = AsyncDownloadEngine(fetcher, max_inflight_tiles=2)
+        
+        async def download_all():
+            return await asyncio.gather(engine.download_pano('A' * 22, 2), engine.download_pano('B' * 22, 2))
+        
+        try:
+            with patch('tile_fetcher.http_get', side_effect=serve) as mock_get, \
+                    patch('zoom_probe.http_head', side_effect=serve_head):
+                results = asyncio.run(download_all())
+        finally:
+            engine.close()
+        
+        self.assertEqual([sorted(tiles) for tiles in results], [[(0, 0), (1, 0), (2, 0)]] * 2)
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertEqual(inflight[1], 2)
+    
+    def test_sync_wrapper_reads_cache(self):
+        """Test wrapper sincrono da più thread: la seconda esecuzione legge le tiles dalla cache"""
+        from concurrent.futures import ThreadPoolExecutor
+        fetcher = TileFetcher(cache=TileCache(self.temp_dir), breaker=self.breaker)
+        engine = AsyncDownloadEngine(fetcher, max_inflight_tiles=4)
+        panoids = ['A' * 22, 'B' * 22, 'C' * 22]
+        
+        try:
+            with patch('tile_fetcher.http_get',
+                       return_value=make_response(200, make_tile_bytes((0, 90, 0)))) as mock_get:
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    results = list(executor.map(lambda panoid: engine.fetch_pano(panoid, 2), panoids))
+                self.assertEqual(mock_get.call_count, 24)
+                
+                self.assertEqual(engine.fetch_pano('A' * 22, 2), results[0])
+                self.assertEqual(mock_get.call_count, 24)
+        finally:
+            engine.close()
+        
+        self.assertTrue(all(len(tiles) == 8 and None not in tiles.values() for tiles in results))
+    
+    def test_only_absent_tiles_accepted(self):
+        """Test tile 404 lasciata vuota, errori temporanei a circuito chiuso segnalati con un'eccezione"""
+        fetcher = TileFetcher(retry_policy=RetryPolicy(max_attempts=2, base_delay=0), breaker=self.breaker)
+        engine = AsyncDownloadEngine(fetcher)
+        
+        def serve(status):
+            def get(url, timeout=None):
+                if 'x=1&' in url:
+                    return make_response(status)
+                return make_response(200, make_tile_bytes((0, 90, 0)))
+            return get
+        
+        try:
+            with patch('tile_fetcher.http_get', side_effect=serve(404)):
+                tiles = engine.fetch_pano('A' * 22, 1)
+            self.assertIsNone(tiles[(1, 0)])
+            self.assertIsNotNone(tiles[(0, 0)])
+            
+            with patch('tile_fetcher.http_get', side_effect=serve(503)):
+                with self.assertRaises(RuntimeError):
+                    engine.fetch_pano('A' * 22, 1)
+        finally:
+            engine.close()
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test per la politica di retry"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0)
+    
+    def test_transient_errors_are_retried(self):
+        """Test retry su 5xx ed errori di rete fino alla risposta valida"""
+        send = Mock(side_effect=[make_response(500), ConnectionError("reset"), make_response(200, b'ok')])
+        response = self.policy.execute(send)
+        
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(send.call_count, 3)
+    
+    def test_permanent_status_is_not_retried(self):
+        """Test 404 restituito senza altri tentativi"""
+        send = Mock(return_value=make_response(404))
+        self.assertIsNone(self.policy.execute(send))
+        self.assertEqual(send.call_count, 1)
+    
+    def test_backoff_is_bounded(self):
+        """Test backoff esponenziale con jitter entro il massimo"""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        for retry_index, limit in ((0, 1), (1, 2), (2, 4), (6, 5)):
+            for _ in range(20):
+                self.assertTrue(0 <= policy.backoff(retry_index) <= limit)
+    
+    def test_pano_budget_limits_retries(self):
+        """Test budget per panorama condiviso dalle tiles"""
+        fetcher = TileFetcher(max_workers=2, retry_policy=self.policy,
+                              breaker=CircuitBreaker('test', failure_threshold=100))
+        
+        with patch('tile_fetcher.http_get', return_value=make_response(503)) as mock_get:
+            results = list(fetcher.iter_tiles('A' * 22, 2, pano_budget=RetryBudget(2)))
+        
+        self.assertEqual(len(results), 8)
+        self.assertEqual(mock_get.call_count, 8 + 2)
+    
+    def test_batch_budget_grows_with_requests(self):
+        """Test budget di batch proporzionale alle richieste"""
+        budget = RetryBudget(1, ratio=0.5)
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        budget.record_request()
+        budget.record_request()
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        self.assertEqual(budget.denied, 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test per il circuit breaker degli endpoint"""
+    
+    def test_trip_half_open_and_close(self):
+        """Test apertura dopo N errori, prova half-open e chiusura"""
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+        states = []
+        breaker.add_listener(lambda name, state: states.append(state))
+        
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow_request())
+        
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())   # Richiesta di prova
+        self.assertFalse(breaker.allow_request())  # Una sola prova alla volta
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(states, [STATE_OPEN, STATE_HALF_OPEN, STATE_OPEN, STATE_HALF_OPEN, STATE_CLOSED])
+    
+    def test_wait_until_available(self):
+        """Test attesa dei worker con circuito aperto"""
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        self.assertFalse(breaker.wait_until_available(should_stop=lambda: True))
+        
+        breaker.reset_timeout = 0.05
+        self.assertTrue(breaker.wait_until_available())
+    
+    def test_open_circuit_fails_fast(self):
+        """Test tiles respinte senza richieste con endpoint giù"""
+        fetcher = TileFetcher(max_workers=1, retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+                              breaker=CircuitBreaker('test', failure_threshold=2, reset_timeout=60))
+        
+        with patch('tile_fetcher.http_get', side_effect=ConnectionError("down")) as mock_get:
+            results = list(fetcher.iter_tiles('A' * 22, 2))
+        
+        self.assertEqual(len(results), 8)
+        self.assertEqual(mock_get.call_count, 2)
+    
+    def test_batch_pauses_until_endpoint_recovers(self):
+        """Test batch in pausa con circuito aperto e ripreso senza tiles grigie"""
+        from streetview_core import StreetViewCore
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.1)
+        responses = [ConnectionError("down"), ConnectionError("down")]
+        
+        def serve(url, timeout=None):
+            if responses:
+                raise responses.pop()
+            return make_response(200, make_tile_bytes((0, 90, 0)))
+        
+        output_dir = tempfile.mkdtemp()
+        try:
+            with patch('tile_fetcher.get_circuit_breaker', return_value=breaker), \
+                    patch('tile_fetcher.http_get', side_effect=serve) as mock_get, \
+                    patch('zoom_probe.http_head', return_value=make_response(200)), \
+                    patch.dict('config.DOWNLOAD_CONFIG', {'retry_delay': 0}), \
+                    patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+                stats = StreetViewCore().batch_download(['A' * 22], output_dir, zoom=1)
+            
+            self.assertEqual(stats['successful'], 1)
+            self.assertEqual(mock_get.call_count, 4)
+            self.assertEqual(breaker.trips, 1)
+            image = Image.open(os.path.join(output_dir, [f for f in os.listdir(output_dir) if f.endswith('.jpg')][0]))
+            self.assertNotEqual(image.getpixel((100, 100)), (64, 64, 64))
+        finally:
+            shutil.rmtree(output_dir)
+    
+    def test_batch_accepts_absent_tiles(self):
+        """Test tile inesistente (404): unico caso in cui il panorama viene completato con una tile grigia"""
+        from streetview_core import StreetViewCore
+        
+        def serve(url, timeout=None):
+            if 'x=1&' in url:
+                return make_response(404)
+            return make_response(200, make_tile_bytes((0, 90, 0)))
+        
+        output_dir = tempfile.mkdtemp()
+        try:
+            with patch('tile_fetcher.http_get', side_effect=serve) as mock_get, \
+                    patch('zoom_probe.http_head', return_value=make_response(200)), \
+                    patch.dict('config.DOWNLOAD_CONFIG', {'retry_delay': 0}), \
+                    patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+                stats = StreetViewCore().batch_download(['A' * 22], output_dir, zoom=1)
+            
+            self.assertEqual(stats['successful'], 1)
+            self.assertEqual(mock_get.call_count, 2)  # Il 404 non viene ritentato
+            image = Image.open(os.path.join(output_dir, [f for f in os.listdir(output_dir) if f.endswith('.jpg')][0]))
+            self.assertEqual(image.getpixel((768, 256)), (64, 64, 64))
+        finally:
+            shutil.rmtree(output_dir)
+
+
+class TestZoomProbe(unittest.TestCase):
+    """Test per il rilevamento di zoom e griglia reale dei panorami"""
+    
+    def setUp(self):
+        """Photosphere fittizia: zoom massimo 3 con griglia 6x3"""
+        import re
+        self.grids = {0: (1, 1), 1: (2, 1), 2: (3, 2), 3: (6, 3)}
+        
+        def serve_head(url, timeout=None):
+            x, y, zoom = (int(v) for v in re.search(r'x=(\d+)&y=(\d+)&zoom=(\d+)', url).groups())
+            grid = self.grids.get(zoom)
+            return make_response(200 if grid and x < grid[0] and y < grid[1] else 400)
+        
+        self.serve_head = serve_head
+        self.patcher = patch('zoom_probe.http_head', side_effect=serve_head)
+        self.patcher.start()
+        self.probe = ZoomProbe(concurrency=2)
+    
+    def tearDown(self):
+        """Cleanup test"""
+        self.patcher.stop()
+    
+    def test_available_zooms(self):
+        """Test zoom disponibili rilevati e memorizzati"""
+        self.assertEqual(self.probe.available_zooms('A' * 22), [0, 1, 2, 3])
+        self.assertEqual(self.probe.max_zoom('A' * 22), 3)
+        self.assertEqual(self.probe.requests, 6)  # Cache: nessuna richiesta alla seconda chiamata
+    
+    def test_non_standard_grid(self):
+        """Test griglia reale trovata con poche richieste e memorizzata"""
+        self.assertEqual(self.probe.grid('A' * 22, 3), (6, 3))
+        self.assertEqual(self.probe.grid('A' * 22, 2), (3, 2))
+        requests = self.probe.requests
+        self.assertLess(requests, 8 + 4 + 4 + 2)  # Meno di una scansione completa dei bordi
+        self.assertEqual(self.probe.grid('A' * 22, 3), (6, 3))
+        self.assertEqual(self.probe.requests, requests)
+    
+    def test_standard_grid_single_request(self):
+        """Test panorama standard verificato con la sola ultima tile"""
+        self.grids[3] = (8, 4)
+        self.assertEqual(self.probe.grid('A' * 22, 3), (8, 4))
+        self.assertEqual(self.probe.requests, 1)
+    
+    def test_fetcher_downloads_only_existing_tiles(self):
+        """Test download limitato alle tiles esistenti"""
+        fetcher = TileFetcher(max_workers=4, probe=self.probe)
+        with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 0, 200)))) as mock_get:
+            image, failed = fetcher.download_image('A' * 22, 3)
+        
+        self.assertEqual(image.size, (6 * 512, 3 * 512))
+        self.assertEqual(failed, 0)
+        self.assertEqual(mock_get.call_count, 18)
+    
+    def test_transient_errors_not_cached(self):
+        """Test 503 ritentato e griglia non memorizzata finché l'endpoint non risponde"""
+        serve = self.serve_head
+        failures = {'left': 1}
+        
+        def flaky_head(url, timeout=None):
+            if failures['left'] > 0:
+                failures['left'] -= 1
+                return make_response(503)
+            return serve(url)
+        
+        probe = ZoomProbe(concurrency=2, retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+                          breaker=CircuitBreaker('test', failure_threshold=100))
+        with patch('zoom_probe.http_head', side_effect=flaky_head):
+            # Un 503 isolato viene ritentato
+            self.assertEqual(probe.grid('A' * 22, 3), (6, 3))
+            
+            # Endpoint giù: griglia standard, non memorizzata
+            failures['left'] = 1000
+            self.assertEqual(probe.grid('B' * 22, 3), (8, 4))
+            self.assertIsNone(probe.max_zoom('B' * 22))
+            failures['left'] = 0
+            self.assertEqual(probe.grid('B' * 22, 3), (6, 3))
+            self.assertEqual(probe.max_zoom('B' * 22), 3)
+    
+    def test_batch_clamps_to_max_zoom(self):
+        """Test batch allo zoom massimo del panorama, come il download singolo"""
+        from streetview_core import StreetViewCore
+        self.grids = {0: (1, 1), 1: (2, 1), 2: (4, 2)}
+        
+        output_dir = tempfile.mkdtemp()
+        try:
+            with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 90, 0)))), \
+                    patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+                stats = StreetViewCore().batch_download(['A' * 22], output_dir, zoom=3)
+            
+            self.assertEqual(stats['successful'], 1)
+            image = Image.open(os.path.join(output_dir, [f for f in os.listdir(output_dir) if f.endswith('.jpg')][0]))
+            self.assertEqual(image.size, (2048, 1024))
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_clamp_zoom(self):
+        """Test zoom limitato al massimo del panorama (download singolo, cubemap diretto e batch)"""
+        from streetview_core import StreetViewCore
+        self.grids = {0: (1, 1), 1: (2, 1), 2: (4, 2)}
+
+        with patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+            core = StreetViewCore()
+        self.assertEqual(core.clamp_zoom('A' * 22, 4), 2)
+        self.assertEqual(core.clamp_zoom('A' * 22, 1), 1)
+
+        with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 90, 0)))):
+            faces = core.build_cubemap_from_tiles('A' * 22, core.clamp_zoom('A' * 22, 3))
+        self.assertEqual(faces['front'].size, (512, 512))
+
+
+class TestMetadataCache(unittest.TestCase):
+    """Test per la cache dei metadata dei panorami"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'metadata.sqlite')
+    
+    def tearDown(self):
+        """Cleanup test"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_hits_misses_and_persistence(self):
+        """Test contatori, cache negativa e lettura da disco in una nuova sessione"""
+        cache = MetadataCache(self.path)
+        self.assertEqual(cache.get('A' * 22), (False, None))
+        cache.put('A' * 22, {'Links': [{'panoId': 'B' * 22}]})
+        cache.put('C' * 22, None)
+        
+        self.assertEqual(cache.get('A' * 22), (True, {'Links': [{'panoId': 'B' * 22}]}))
+        self.assertEqual(cache.get('C' * 22), (True, None))
+        self.assertEqual(cache.stats(), {'hits': 1, 'negative_hits': 1, 'misses': 1, 'entries': 2})
+        cache.close()
+        
+        reopened = MetadataCache(self.path)
+        self.assertEqual(reopened.get('A' * 22)[1]['Links'][0]['panoId'], 'B' * 22)
+        reopened.close()
+    
+    def test_ttl_expiry(self):
+        """Test scadenza separata per metadata e cache negativa"""
+        cache = MetadataCache(None, ttl=60, negative_ttl=0.05)
+        cache.put('A' * 22, {'ok': True})
+        cache.put('C' * 22, None)
+        time.sleep(0.06)
+        
+        self.assertTrue(cache.get('A' * 22)[0])
+        self.assertFalse(cache.get('C' * 22)[0])
+    
+    def test_fetch_pano_metadata_uses_cache(self):
+        """Test metadata scaricati una sola volta per PanoID"""
+        from streetview_core import StreetViewCore
+        response = make_response(200)
+        response.json.return_value = {'Links': []}
+        
+        with patch.dict('config.CACHE_CONFIG', {'enabled': False}), \
+                patch('streetview_core.http_get', return_value=response) as mock_get:
+            core = StreetViewCore()
+            self.assertEqual(core.fetch_pano_metadata('A' * 22), {'Links': []})
+            self.assertEqual(core.fetch_pano_metadata('A' * 22), {'Links': []})
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(core.metadata_cache.stats()['hits'], 1)
+    
+    def test_transient_errors_not_cached(self):
+        """Test cache negativa solo per esiti definitivi (404), mai per errori di rete"""
+        from streetview_core import StreetViewCore
+        
+        with patch.dict('config.CACHE_CONFIG', {'enabled': False}), \
+                patch.dict('config.DOWNLOAD_CONFIG', {'retry_delay': 0}), \
+                patch('streetview_core.get_circuit_breaker', return_value=CircuitBreaker('test', failure_threshold=100)), \
+                patch('streetview_core.http_get', side_effect=ConnectionError("timeout")):
+            core = StreetViewCore()
+            self.assertIsNone(core.fetch_pano_metadata('A' * 22))
+            self.assertEqual(core.metadata_cache.get('A' * 22), (False, None))
+            self.assertEqual(len(core.metadata_cache), 0)
+        
+        with patch('streetview_core.http_get', return_value=make_response(404)):
+            self.assertIsNone(core.fetch_pano_metadata('B' * 22))
+        self.assertEqual(core.metadata_cache.get('B' * 22), (True, None))
+
+
+class TestURLValidation(unittest.TestCase):
+    """Test per la validazione concorrente degli URL"""
+    
+    def test_validate_urls(self):
+        """Test esiti per URL, PanoID duplicati verificati una volta e cache degli esiti definitivi"""
+        from streetview_core import StreetViewCore
+        
+        def serve_head(url, timeout=None):
+            panoid = url.split('panoid=')[1].split('&')[0]
+            if panoid[0] == 'C':
+                raise ConnectionError("timeout")
+            return make_response({'A': 200, 'B': 404, 'D': 503}[panoid[0]])
+        
+        urls = [f"https://www.google.com/maps/@45.0,9.0,3a,75y,90t/data=!3m4!1s{letter * 22}!2e0"
+                for letter in 'ABACD'] + ["https://www.google.com/maps/place/Roma"]
+        results = {}
+        
+        with patch.dict('config.CACHE_CONFIG', {'enabled': False}), \
+                patch('streetview_core.http_head', side_effect=serve_head) as mock_head:
+            core = StreetViewCore()
+            summary = core.validate_urls(urls, lambda index, url, panoid, result: results.update({index: result}),
+                                         workers=3)
+            self.assertEqual(mock_head.call_count, 4)
+            
+            # Solo gli esiti non definitivi vengono verificati di nuovo
+            core.validate_urls(urls)
+            self.assertEqual(mock_head.call_count, 6)
+        
+        self.assertEqual(summary, {'valid': 2, 'invalid': 2, 'unreachable': 2, 'duplicates': 1})
+        self.assertEqual(results, {0: 'valid', 1: 'invalid', 2: 'valid', 3: 'unreachable',
+                                   4: 'unreachable', 5: 'invalid'})
+
+
+class TestPanoIDExtractor(unittest.TestCase):
+    """Test per l'estrazione dei PanoID a passata singola"""
+    
+    def test_single_pass_matches_sequential(self):
+        """Test stesso risultato dei pattern applicati uno alla volta, per ogni forma di URL"""
+        from panoid_extractor import extract_panoid, find_panoids, _extract_sequential
+        
+        panoid = "AbCdEfGhIjKlMnOpQrStUv"
+        texts = [
+            f"https://www.google.com/maps/@45.0,9.0,3a,75y,90t/data=!3m4!1s{panoid}!2e0",
+            f'{{"pano":"{panoid}"}}', f'{{"panoid":"{panoid}"}}', f'{{pano:"{panoid}"}}',
+            f'{{"panoId":"{panoid}"}}', f"https://example.com/?photosphereId={panoid}",
+            f"https://maps.google.com/cbk?panoid={panoid}", f"https://www.google.com/maps/@?pano={panoid}",
+            f"cbp=12,0,0,0,0&amp;panoid={panoid}",
+            "https://www.google.com/maps/place/Roma", f"pano={panoid[:10]}",
+        ]
+        for text in texts:
+            self.assertEqual(extract_panoid(text), _extract_sequential(text), text)
+        
+        # Il numero di gruppo viene ricondotto all'indice del pattern
+        self.assertEqual(find_panoids(f'{{"panoId":"{panoid}"}} photosphereId={"X" * 22}'),
+                         {4: [panoid], 5: ["X" * 22]})
+    
+    def test_iter_panoids_from_file(self):
+        """Test estrazione a flusso da file con commenti, PanoID da soli e righe non valide"""
+        from panoid_extractor import iter_panoids_from_file
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'lista.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("# commento\n\n" + "A" * 22 + "\n  https://maps.google.com/cbk?panoid=" + "B" * 22 + "  \nnessuno\n")
+            
+            self.assertEqual(list(iter_panoids_from_file(path, allow_bare=True)), [
+                ("A" * 22, "A" * 22),
+                ("https://maps.google.com/cbk?panoid=" + "B" * 22, "B" * 22),
+                ("nessuno", None),
+            ])
+            self.assertIsNone(next(iter_panoids_from_file(path))[1])
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_benchmark(self):
+        """Test benchmark su poche righe"""
+        from panoid_extractor import benchmark
+        
+        rates = benchmark(2000, repeat=1)
+        self.assertEqual(set(rates), {'sequential', 'single_pass', 'bulk'})
+        self.assertTrue(all(rate > 0 for rate in rates.values()))
+
+
+class TestBatchURLList(unittest.TestCase):
+    """Test per la lista URL dei download multipli"""
+    
+    def test_dedup_by_panoid(self):
+        """Test duplicati riconosciuti per PanoID anche con URL diversi"""
+        from url_list import BatchURLList
+        
+        urls = BatchURLList()
+        self.assertTrue(urls.add("https://www.google.com/maps/@45.0,9.0,3a,75y,90t/data=!3m4!1s" + "A" * 22 + "!2e0"))
+        self.assertFalse(urls.add("https://maps.google.com/cbk?panoid=" + "A" * 22))
+        self.assertTrue(urls.add("https://www.google.com/maps/place/Roma"))
+        self.assertFalse(urls.add(" https://www.google.com/maps/place/Roma "))
+        self.assertIn("https://www.google.com/maps/@?pano=" + "A" * 22, urls)
+        
+        added, duplicates = urls.add_many(["# lista\n", "\n", "pano=" + "B" * 22 + "\n",
+                                           "panoid=" + "A" * 22 + "\n", "pano=" + "B" * 22 + "\n"])
+        self.assertEqual((added, duplicates), (["pano=" + "B" * 22], 2))
+        
+        urls.remove([0])
+        self.assertEqual(urls.urls(), ["https://www.google.com/maps/place/Roma", "pano=" + "B" * 22])
+        self.assertTrue(urls.add("panoid=" + "A" * 22))
+        urls.clear()
+        self.assertEqual(len(urls), 0)
+    
+    def test_add_many_large(self):
+        """Test caricamento di 20000 righe con duplicati in tempo lineare"""
+        from url_list import BatchURLList
+        
+        lines = [f"https://maps.google.com/cbk?panoid={i % 15000:022d}" for i in range(20000)]
+        urls = BatchURLList()
+        start = time.perf_counter()
+        added, duplicates = urls.add_many(lines)
+        
+        self.assertEqual((len(added), duplicates, len(urls)), (15000, 5000, 15000))
+        self.assertLess(time.perf_counter() - start, 2.0)
+    
+    def test_status_and_view(self):
+        """Test stato per riga, filtri, ordinamento e finestra della vista"""
+        from url_list import (BatchURLList, STATUS_PENDING, STATUS_OK, STATUS_FAILED,
+                              SORT_URL, SORT_STATUS)
+        
+        urls = BatchURLList()
+        urls.add_many([f"https://maps.google.com/cbk?panoid={letter * 22}" for letter in "CAB"])
+        urls.add("https://www.google.com/maps/place/Roma")
+        
+        urls.set_status(1, STATUS_OK)
+        self.assertEqual(urls.set_status_by_panoid("B" * 22, STATUS_FAILED), 2)
+        self.assertIsNone(urls.set_status_by_panoid("Z" * 22, STATUS_OK))
+        self.assertEqual(urls.status_counts()[STATUS_PENDING], 2)
+        
+        urls.set_view(sort=SORT_URL)
+        self.assertEqual([row for row, _, _ in urls.view_rows(0, 10)], [1, 2, 0, 3])
+        self.assertEqual(urls.view_rows(1, 2), [(2, urls.url(2), STATUS_FAILED), (0, urls.url(0), STATUS_PENDING)])
+        
+        # La vista filtrata per stato segue gli aggiornamenti
+        urls.set_view(status_filter=STATUS_PENDING, text_filter="CBK")
+        self.assertEqual(urls.view_size(), 1)
+        urls.set_status(0, STATUS_OK)
+        self.assertEqual(urls.view_size(), 0)
+        
+        urls.set_view(sort=SORT_STATUS, reverse=True)
+        self.assertEqual(urls.view_row(0), 2)
+        
+        urls.remove([0])
+        self.assertEqual(urls.set_status_by_panoid("B" * 22, STATUS_OK), 1)
+        urls.reset_status()
+        self.assertEqual(urls.status_counts()[STATUS_PENDING], 3)
+    
+    def test_status_by_key_after_remove(self):
+        """Test esiti dei worker applicati per PanoID dopo rimozioni, righe rimosse ignorate"""
+        from url_list import BatchURLList, STATUS_OK, STATUS_FAILED
+        
+        urls = BatchURLList()
+        urls.add_many([f"https://maps.google.com/cbk?panoid={letter * 22}" for letter in "ABC"])
+        urls.add("senza panoid")
+        snapshot = urls.urls()
+        
+        # L'utente rimuove una riga mentre la validazione è in corso
+        urls.remove([0])
+        self.assertIsNone(urls.set_status_for(snapshot[0], "A" * 22, STATUS_OK))
+        self.assertEqual(urls.set_status_for(snapshot[2], "C" * 22, STATUS_OK), 1)
+        self.assertEqual(urls.set_status_for(snapshot[3], None, STATUS_FAILED), 2)
+        self.assertEqual([urls.status(row) for row in range(len(urls))], [0, STATUS_OK, STATUS_FAILED])
+        
+        urls.clear()
+        self.assertIsNone(urls.set_status_by_panoid("B" * 22, STATUS_OK))
+    
+    def test_view_large(self):
+        """Test filtro su 100000 righe senza widget"""
+        from url_list import BatchURLList, STATUS_FAILED
+        
+        urls = BatchURLList()
+        urls.add_many(f"https://maps.google.com/cbk?panoid={i:022d}" for i in range(100000))
+        for row in range(0, 100000, 10):
+            urls.set_status(row, STATUS_FAILED)
+        
+        start = time.perf_counter()
+        urls.set_view(status_filter=STATUS_FAILED)
+        self.assertEqual(urls.view_size(), 10000)
+        self.assertEqual(urls.view_rows(9999, 5)[0][0], 99990)
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+
+class TestProgressBus(unittest.TestCase):
+    """Test per il canale degli aggiornamenti dell'interfaccia"""
+    
+    class FakeRoot:
+        """Root Tk simulato: registra le chiamate pianificate con after"""
+        
+        def __init__(self):
+            self.scheduled = []
+        
+        def after(self, delay, callback):
+            self.scheduled.append((delay, callback))
+    
+    class FakeVar:
+        """Variabile Tk simulata che conta le scritture"""
+        
+        def __init__(self):
+            self.value = None
+            self.writes = 0
+        
+        def set(self, value):
+            self.value = value
+            self.writes += 1
+    
+    def test_coalescing_from_threads(self):
+        """Test aggiornamenti da più thread fusi in una scrittura per variabile e fotogramma"""
+        import threading
+        from ui_bus import ProgressBus
+        
+        bus = ProgressBus(self.FakeRoot(), fps=20)
+        progress = self.FakeVar()
+        proxy = bus.variable(progress)
+        
+        def worker():
+            for i in range(5000):
+                proxy.set(i)
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(bus.drain(), 1)
+        self.assertEqual((progress.value, progress.writes), (4999, 1))
+        self.assertEqual((bus.posted, bus.applied), (20000, 1))
+        self.assertEqual(bus.drain(), 0)
+    
+    def test_calls_order(self):
+        """Test chiamate in ordine, chiamate fuse per chiave e valori applicati per primi"""
+        from ui_bus import ProgressBus
+        
+        bus = ProgressBus(self.FakeRoot())
+        status = self.FakeVar()
+        events = []
+        
+        bus.call(events.append, "log 1")
+        bus.call_latest('preview', events.append, "anteprima 1")
+        bus.call(lambda: 1 / 0)
+        bus.call_latest('preview', events.append, "anteprima 2")
+        bus.call(lambda: events.append(f"fine: {status.value}"))
+        bus.set(status, "completato")
+        
+        self.assertEqual(bus.drain(), 5)
+        self.assertEqual(events, ["anteprima 2", "log 1", "fine: completato"])
+    
+    def test_fixed_frame_rate(self):
+        """Test svuotamento pianificato con after a intervallo fisso"""
+        from ui_bus import ProgressBus
+        
+        root = self.FakeRoot()
+        bus = ProgressBus(root, fps=25)
+        bus.start()
+        bus.start()
+        self.assertEqual([delay for delay, _ in root.scheduled], [40])
+        
+        status = self.FakeVar()
+        bus.set(status, "a")
+        root.scheduled.pop()[1]()
+        self.assertEqual((status.value, bus.frames, len(root.scheduled)), ("a", 1, 1))
+        
+        bus.stop()
+        root.scheduled.pop()[1]()
+        self.assertEqual((bus.frames, root.scheduled), (1, []))
+
+    def test_modal_call_keeps_order(self):
+        """Test messagebox aperta da una chiamata: il loop modale non applica aggiornamenti successivi"""
+        from ui_bus import ProgressBus
+
+        root = self.FakeRoot()
+        bus = ProgressBus(root)
+        status = self.FakeVar()
+        events = []
+
+        def modal_message():
+            # Il loop modale di Tk esegue i callback pianificati con after
+            bus.set(status, "progresso vecchio")
+            for _, callback in list(root.scheduled):
+                callback()
+            bus.drain()
+            events.append("messagebox chiusa")
+
+        bus.start()
+        bus.call(modal_message)
+        bus.call(lambda: events.append("stato finale"))
+        root.scheduled.pop()[1]()
+
+        self.assertEqual(events, ["messagebox chiusa", "stato finale"])
+        self.assertIsNone(status.value)
+        self.assertEqual(len(root.scheduled), 1)
+        root.scheduled.pop()[1]()
+        self.assertEqual(status.value, "progresso vecchio")
+
+    def test_core_errors_posted_to_bus(self):
+        """Test errore del download singolo segnalato tramite il bus, senza variabili Tk"""
+        from streetview_core import StreetViewCore
+        from ui_bus import ProgressBus
+        
+        bus = ProgressBus(self.FakeRoot())
+        status, connection = self.FakeVar(), self.FakeVar()
+        with patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+            core = StreetViewCore()
+            core.zoom_probe = None
+            core.tile_fetcher.grid = Mock(side_effect=ConnectionError("down"))
+            image = core.download_streetview_image('A' * 22, 0, status_var=bus.variable(status),
+                                                   connection_var=bus.variable(connection))
+        
+        self.assertIsNone(image)
+        self.assertIsNone(connection.value)
+        bus.drain()
+        self.assertEqual(connection.value, "🔴 Offline")
+        self.assertTrue(status.value.startswith("❌"))
+
+
+class TestTileCache(unittest.TestCase):
+    """Test per la cache su disco delle tiles"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Cleanup test"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_put_get_and_persistence(self):
+        """Test salvataggio, lettura e ricarica dell'indice da disco"""
+        cache = TileCache(self.temp_dir, max_size_mb=1)
+        cache.put('A' * 22, 2, 1, 0, b'jpeg-bytes')
+        
+        self.assertEqual(cache.get('A' * 22, 2, 1, 0), b'jpeg-bytes')
+        self.assertIsNone(cache.get('A' * 22, 2, 0, 0))
+        self.assertEqual(TileCache(self.temp_dir, max_size_mb=1).get('A' * 22, 2, 1, 0), b'jpeg-bytes')
+    
+    def test_lru_eviction(self):
+        """Test eviction della tile usata meno di recente"""
+        cache = TileCache(self.temp_dir, max_size_mb=250 / (1024 * 1024))
+        cache.put('P' * 22, 0, 0, 0, b'a' * 100)
+        cache.put('P' * 22, 0, 1, 0, b'b' * 100)
+        cache.get('P' * 22, 0, 0, 0)
+        cache.put('P' * 22, 0, 2, 0, b'c' * 100)
+        
+        self.assertIsNotNone(cache.get('P' * 22, 0, 0, 0))
+        self.assertIsNone(cache.get('P' * 22, 0, 1, 0))
+        self.assertLessEqual(cache.size_bytes, 250)
+    
+    def test_fetcher_uses_cache(self):
+        """Test tiles in cache non riscaricate"""
+        fetcher = TileFetcher(max_workers=2, cache=TileCache(self.temp_dir))
+        tile_bytes = make_tile_bytes((10, 20, 30))
+        
+        with patch('tile_fetcher.http_get', return_value=make_response(200, tile_bytes)) as mock_get:
+            fetcher.download_image('A' * 22, 1)
+            fetcher.download_image('A' * 22, 1)
+        
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class TestPipeline(unittest.TestCase):
+    """Test per la pipeline a stadi dei download multipli"""
+    
+    def test_errors_are_isolated_per_item(self):
+        """Test errore in uno stadio confinato al singolo elemento"""
+        def convert(key, value):
+            if key == 'bad':
+                raise ValueError("immagine corrotta")
+            return value * 2
+        
+        written = []
+        done = []
+        pipeline = Pipeline([
+            PipelineStage('fetch', lambda key, value: value + 1, workers=2),
+            PipelineStage('convert', convert),
+            PipelineStage('write', lambda key, value: written.append((key, value))),
+        ], on_done=lambda key, error: done.append((key, error)))
+        
+        stats = pipeline.run([('a', 1), ('bad', 2), ('c', 3)])
+        
+        self.assertEqual(stats, {'successful': 2, 'failed': 1, 'skipped': 0})
+        self.assertEqual(sorted(written), [('a', 4), ('c', 8)])
+        self.assertEqual(dict(done)['bad'], "convert: immagine corrotta")
+        self.assertEqual(pipeline.stage_stats()['fetch']['items'], 3)
+    
+    def test_stages_run_concurrently(self):
+        """Test throughput vicino allo stadio più lento invece della somma degli stadi"""
+        import time
+        
+        def slow(key, value):
+            time.sleep(0.05)
+            return value
+        
+        pipeline = Pipeline([PipelineStage(name, slow, workers=1) for name in ('fetch', 'convert', 'write')])
+        start = time.perf_counter()
+        stats = pipeline.run((i, i) for i in range(8))
+        elapsed = time.perf_counter() - start
+        
+        self.assertEqual(stats['successful'], 8)
+        # In serie: 8 × 3 × 0.05 = 1.2 s; in pipeline: (8 + 2) × 0.05 = 0.5 s
+        self.assertLess(elapsed, 0.9)
+    
+    def test_backpressure_limits_items_in_flight(self):
+        """Test stadio lento che blocca quelli precedenti con code limitate"""
+        import threading
+        import time
+        
+        release = threading.Event()
+        pipeline = Pipeline([
+            PipelineStage('fetch', lambda key, value: value, workers=1),
+            PipelineStage('write', lambda key, value: release.wait(), workers=1),
+        ], queue_size=1)
+        
+        runner = threading.Thread(target=pipeline.run, args=([(i, i) for i in range(20)],), daemon=True)
+        runner.start()
+        try:
+            time.sleep(0.2)
+            # write ne tiene 1, la sua coda 1, fetch 1 in attesa di inserirlo
+            self.assertEqual(pipeline.stage_stats()['fetch']['items'], 3)
+        finally:
+            release.set()
+        runner.join(5)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(pipeline.stage_stats()['write']['items'], 20)
+
+
+class TestBatchJournal(unittest.TestCase):
+    """Test per il journal SQLite dei download multipli"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'journal.sqlite')
+        self.journal = BatchJournal(self.path)
+    
+    def tearDown(self):
+        """Cleanup test"""
+        self.journal.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_resume_skips_done_panos(self):
+        """Test ripresa: panorami completati saltati, nomi file stabili, falliti ritentati"""
+        panoids = ['A' * 22, 'B' * 22, 'C' * 22]
+        pending = self.journal.enqueue(panoids, 'zoom2', lambda panoid: f"run1_{panoid[:4]}")
+        self.assertEqual(pending, panoids)
+        
+        self.journal.mark_fetching('A' * 22, 'zoom2')
+        self.journal.mark_done('A' * 22, 'zoom2', ['/out/run1_AAAA.jpg'])
+        self.journal.mark_fetching('B' * 22, 'zoom2')
+        self.journal.mark_failed('B' * 22, 'zoom2', 'timeout')
+        self.journal.close()
+        
+        # Riapertura dopo l'interruzione
+        self.journal = BatchJournal(self.path)
+        pending = self.journal.enqueue(panoids, 'zoom2', lambda panoid: f"run2_{panoid[:4]}")
+        self.assertEqual(pending, ['B' * 22, 'C' * 22])
+        self.assertEqual(self.journal.base_name('B' * 22, 'zoom2'), 'run1_BBBB')
+        
+        info = self.journal.pano_info('A' * 22, 'zoom2')
+        self.assertEqual(info['state'], 'done')
+        self.assertEqual(info['outputs'], ['/out/run1_AAAA.jpg'])
+        self.assertEqual(self.journal.pano_info('B' * 22, 'zoom2')['attempts'], 1)
+        self.assertEqual(self.journal.summary('zoom2'), {'done': 1, 'failed': 1, 'queued': 1})
+        
+        # Impostazioni diverse: il panorama va rielaborato
+        self.assertEqual(self.journal.enqueue(['A' * 22], 'zoom3', lambda panoid: 'x'), ['A' * 22])
+    
+    def test_resume_reads_tiles_from_cache(self):
+        """Test ripresa con le tiles della cache: il journal contiene solo lo stato dei panorami"""
+        from streetview_core import StreetViewCore
+        
+        output_dir = os.path.join(self.temp_dir, 'output')
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        
+        def run_batch():
+            with patch('tile_fetcher.http_get',
+                       return_value=make_response(200, make_tile_bytes((0, 90, 0)))) as mock_get, \
+                    patch('zoom_probe.http_head', return_value=make_response(200)), \
+                    patch.dict('config.CACHE_CONFIG', {'enabled': True, 'cache_dir': cache_dir}):
+                stats = StreetViewCore().batch_download(['A' * 22], output_dir, zoom=1)
+            return stats, mock_get.call_count
+        
+        stats, http_calls = run_batch()
+        self.assertEqual((stats['successful'], http_calls), (1, 2))
+        
+        journal_path = os.path.join(output_dir, 'batch_journal.sqlite')
+        journal = BatchJournal(journal_path)
+        try:
+            tables = [row[0] for row in journal._query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            self.assertEqual(tables, ['panos'])
+            # Panorama da rifare (es. fallito dopo il download): le tiles vengono dalla cache
+            journal.mark_failed('A' * 22, 'zoom1_equirectangular_overlap0', 'errore di scrittura')
+        finally:
+            journal.close()
+        
+        stats, http_calls = run_batch()
+        self.assertEqual((stats['successful'], stats['already_done'], http_calls), (1, 0, 0))
+    
+    def test_transient_tile_failure_keeps_pano_resumable(self):
+        """Test tile con errori temporanei a circuito chiuso: panorama fallito, non scritto con tiles grigie"""
+        from streetview_core import StreetViewCore
+        
+        output_dir = os.path.join(self.temp_dir, 'output')
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        profile = 'zoom1_equirectangular_overlap0'
+        
+        def run_batch(tile_status):
+            def serve(url, timeout=None):
+                if 'x=1&' in url:
+                    return make_response(tile_status, make_tile_bytes((0, 90, 0)))
+                return make_response(200, make_tile_bytes((0, 90, 0)))
+            
+            breaker = CircuitBreaker('test', failure_threshold=10, reset_timeout=60)
+            with patch('tile_fetcher.get_circuit_breaker', return_value=breaker), \
+                    patch('tile_fetcher.http_get', side_effect=serve) as mock_get, \
+                    patch('zoom_probe.http_head', return_value=make_response(200)), \
+                    patch.dict('config.DOWNLOAD_CONFIG', {'retry_delay': 0}), \
+                    patch.dict('config.CACHE_CONFIG', {'enabled': True, 'cache_dir': cache_dir}):
+                stats = StreetViewCore().batch_download(['A' * 22], output_dir, zoom=1)
+            return stats, mock_get.call_count
+        
+        stats, _ = run_batch(503)
+        self.assertEqual((stats['successful'], stats['failed']), (0, 1))
+        self.assertFalse([f for f in os.listdir(output_dir) if f.endswith('.jpg')])
+        journal = BatchJournal(os.path.join(output_dir, 'batch_journal.sqlite'))
+        try:
+            self.assertEqual(journal.pano_info('A' * 22, profile)['state'], 'failed')
+        finally:
+            journal.close()
+        
+        # Ripresa: solo la tile mancante viene riscaricata, l'altra arriva dalla cache
+        stats, http_calls = run_batch(200)
+        self.assertEqual((stats['successful'], http_calls), (1, 1))
+    
+    def test_batch_output_names_unique(self):
+        """Test file distinti per PanoID con lo stesso prefisso (photosphere)"""
+        from streetview_core import StreetViewCore
+        
+        panoids = ['CAoSLEFG' + 'A' * 16, 'CAoSLEFG' + 'B' * 16]
+        output_dir = os.path.join(self.temp_dir, 'output')
+        with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 90, 0)))), \
+                patch('zoom_probe.http_head', return_value=make_response(200)), \
+                patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+            stats = StreetViewCore().batch_download(panoids, output_dir, zoom=0)
+        
+        self.assertEqual(stats['successful'], 2)
+        self.assertEqual(len([f for f in os.listdir(output_dir) if f.endswith('.jpg')]), 2)
+
+    def test_repeated_panoid_processed_once(self):
+        """Test PanoID ripetuto nella lista: elaborato una volta e registrato come completato"""
+        from streetview_core import StreetViewCore
+
+        self.assertEqual(self.journal.enqueue(['A' * 22, 'B' * 22, 'A' * 22], 'zoom0', lambda panoid: panoid),
+                         ['A' * 22, 'B' * 22])
+
+        output_dir = os.path.join(self.temp_dir, 'output')
+        progress = []
+        with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 90, 0)))), \
+                patch('zoom_probe.http_head', return_value=make_response(200)), \
+                patch.dict('config.CACHE_CONFIG', {'enabled': False}):
+            stats = StreetViewCore().batch_download(['A' * 22] * 2, output_dir, zoom=0,
+                                                    progress_callback=lambda *args: progress.append(args))
+
+        self.assertEqual((stats['successful'], stats['failed']), (1, 0))
+        self.assertEqual(progress, [(1, 1, 'A' * 22, None)])
+        journal = BatchJournal(os.path.join(output_dir, 'batch_journal.sqlite'))
+        try:
+            self.assertEqual(journal.pano_info('A' * 22, 'zoom0_equirectangular_overlap0')['state'], 'done')
+        finally:
+            journal.close()
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test per il limitatore di velocità adattivo"""
+    
+    def timed_acquires(self, limiter, count):
+        """Tempo impiegato da count richieste consecutive"""
+        start = time.monotonic()
+        for _ in range(count):
+            limiter.acquire()
+        return time.monotonic() - start
+    
+    def test_requests_per_second(self):
+        """Test rispetto della velocità dopo la raffica iniziale"""
+        limiter = AdaptiveRateLimiter(requests_per_second=50, burst=1)
+        self.assertGreaterEqual(self.timed_acquires(limiter, 6), 0.09)  # 5 attese da 20ms
+        self.assertEqual(limiter.metrics()['requests'], 6)
+    
+    def test_bytes_per_second(self):
+        """Test attesa dopo aver superato il limite di banda"""
+        limiter = AdaptiveRateLimiter(requests_per_second=200, bytes_per_second=1000, burst=10)
+        limiter.acquire()
+        limiter.record_bytes(1100)
+        self.assertGreaterEqual(self.timed_acquires(limiter, 1), 0.09)
+        self.assertEqual(limiter.metrics()['bytes'], 1100)
+    
+    def test_backoff_and_ramp_up(self):
+        """Test rallentamento su 429/503 e riaccelerazione sulle risposte riuscite"""
+        limiter = AdaptiveRateLimiter(requests_per_second=40, min_rate=5, max_rate=41,
+                                      backoff_factor=0.5, ramp_up_step=1)
+        limiter.on_response(429)
+        limiter.on_response(503)  # Stessa finestra: un solo rallentamento
+        self.assertEqual(limiter.rate, 20)
+        self.assertEqual(limiter.metrics()['throttled'], 2)
+        
+        limiter.on_response(404)
+        self.assertEqual(limiter.rate, 20)
+        for _ in range(30):
+            limiter.on_response(200)
+        self.assertEqual(limiter.rate, 41)
+    
+    def test_retry_after_pauses_requests(self):
+        """Test pausa globale indicata dall'header Retry-After"""
+        limiter = AdaptiveRateLimiter(requests_per_second=200, burst=10)
+        limiter.on_response(429, retry_after='0.2')
+        self.assertGreaterEqual(self.timed_acquires(limiter, 1), 0.18)
+    
+    def test_http_session_reports_to_limiter(self):
+        """Test esito delle richieste riportato al limitatore dalla sessione condivisa"""
+        import http_session
+        limiter = AdaptiveRateLimiter(requests_per_second=100)
+        response = make_response(429, b'x' * 10)
+        response.headers = {'Retry-After': '0'}
+        session = Mock()
+        session.get.return_value = response
+        
+        with patch('http_session.get_rate_limiter', return_value=limiter), \
+                patch('http_session.get_session', return_value=session):
+            self.assertIs(http_session.http_get('https://example.com/tile'), response)
+        
+        metrics = limiter.metrics()
+        self.assertEqual(metrics['requests'], 1)
+        self.assertEqual(metrics['bytes'], 10)
+        self.assertEqual(metrics['throttled'], 1)
+        self.assertEqual(metrics['requests_per_second'], 50)
+
+
+class TestBatchCLI(unittest.TestCase):
+    """Test per il runner da riga di comando (senza Tk)"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.temp_dir, 'lista.txt')
+        self.output_dir = os.path.join(self.temp_dir, 'output')
+        with open(self.list_file, 'w', encoding='utf-8') as f:
+            f.write("# panorami di test\n")
+            f.write("A" * 22 + "\n")
+            f.write("https://www.google.com/maps/@45.0,9.0,3a,75y,90t/data=!3m4!1s" + "B" * 22 + "!2e0\n")
+            f.write("riga senza panoid\n")
+    
+    def tearDown(self):
+        """Cleanup test"""
+        shutil.rmtree(self.temp_dir)
+    
+    def run_cli(self, *extra_args):
+        """Esegue il runner e restituisce (exit code, eventi JSON, chiamate HTTP)"""
+        import io
+        import json
+        from contextlib import redirect_stdout
+        import batch_cli
+        
+        stdout = io.StringIO()
+        with patch('tile_fetcher.http_get', return_value=make_response(200, make_tile_bytes((0, 90, 0)))) as mock_get, \
+                patch('zoom_probe.http_head', return_value=make_response(200)), \
+                patch.dict('config.CACHE_CONFIG', {'enabled': False}), redirect_stdout(stdout):
+            code = batch_cli.main([self.list_file, '-o', self.output_dir, '--zoom', '1', *extra_args])
+        events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        return code, events, mock_get.call_count
+    
+    def test_cli_outputs_json_lines_and_resumes(self):
+        """Test progresso JSON Lines, file di output e ripresa dal journal"""
+        code, events, http_calls = self.run_cli('--format', 'cubemap', '--concurrency', '2')
+        
+        self.assertEqual(code, 1)  # La riga senza PanoID conta come errore
+        self.assertEqual([event['event'] for event in events], ['invalid', 'start', 'pano', 'pano', 'summary'])
+        self.assertEqual(sorted(event['panoid'] for event in events if event['event'] == 'pano'),
+                         ['A' * 22, 'B' * 22])
+        self.assertEqual(events[-1]['successful'], 2)
+        self.assertEqual(http_calls, 4)
+        self.assertEqual(len([name for name in os.listdir(self.output_dir) if name.endswith('.jpg')]), 12)
+        
+        # Seconda esecuzione: tutto già completato, nessuna richiesta di rete
+        code, events, http_calls = self.run_cli('--format', 'cubemap')
+        self.assertEqual(events[-1]['already_done'], 2)
+        self.assertEqual(http_calls, 0)
+    
+    def test_cli_repeated_lines(self):
+        """Test righe ripetute nel file lista: ogni panorama scaricato una volta, exit code 0"""
+        with open(self.list_file, 'w', encoding='utf-8') as f:
+            f.write("A" * 22 + "\n")
+            f.write("https://www.google.com/maps/@45.0,9.0,3a,75y,90t/data=!3m4!1s" + "A" * 22 + "!2e0\n")
+            f.write("A" * 22 + "\n")
+        
+        code, events, http_calls = self.run_cli()
+        self.assertEqual(code, 0)
+        self.assertEqual(events[1]['total'], 1)
+        self.assertEqual((events[-1]['successful'], events[-1]['failed']), (1, 0))
+        self.assertEqual(http_calls, 2)
+
+
+class TestCubemapProjection(unittest.TestCase):
+    """Test per la proiezione cubemap di AdvancedStreetViewDownloader (senza GUI)"""
+    
+    def setUp(self):
+        """Setup test"""
+        if not TKINTER_AVAILABLE:
+            self.skipTest("Tkinter non disponibile")
+        
+        # I metodi di proiezione non usano widget: basta un'istanza non inizializzata
+        self.app = AdvancedStreetViewDownloader.__new__(AdvancedStreetViewDownloader)
+    
+    def test_grid_matches_scalar_coords(self):
+        """Test coordinate sferiche vettorizzate identiche a quelle scalari"""
+        import numpy as np
+        
+        u = (np.arange(16, dtype=np.float64) + 0.5) / 16
+        u_grid, v_grid = np.meshgrid(u, u)
+        for face in range(6):
+            thetas, phis = self.app.cube_to_sphere_coords_grid(u_grid, v_grid, face)
+            for row, col in [(0, 0), (3, 11), (15, 15), (8, 8)]:
+                theta, phi = self.app.cube_to_sphere_coords(u_grid[row, col], v_grid[row, col], face)
+                self.assertAlmostEqual(thetas[row, col], theta, places=12)
+                self.assertAlmostEqual(phis[row, col], phi, places=12)
+    
+    def test_equirect_to_cubemap_face_sizes(self):
+        """Test dimensioni delle 6 facce"""
+        equirect = Image.new('RGB', (256, 128), (30, 60, 90))
+        cubemap = self.app.equirect_to_cubemap(equirect, face_size=40)
+        
+        self.assertEqual(len(cubemap), 6)
+        for face_image in cubemap.values():
+            self.assertEqual(face_image.size, (40, 40))
+        self.assertEqual(cubemap['front'].getpixel((20, 20)), (30, 60, 90))
+        
+        parallel = self.app.equirect_to_cubemap(equirect, face_size=40, workers=3)
+        self.assertEqual(list(parallel), list(cubemap))
+    
+    def test_direct_cubemap_matches_equirect_path(self):
+        """Test cubemap diretto dalle tiles identico alla conversione del mosaico (facce laterali)"""
+        import re
+        
+        def serve_tile(url, timeout=None):
+            # Tile PNG (senza perdita) con un gradiente diverso per ogni posizione
+            x, y = (int(v) for v in re.search(r'x=(\d+)&y=(\d+)', url).groups())
+            tile = Image.linear_gradient('L').resize((512, 512)).convert('RGB')
+            tile = Image.merge('RGB', (tile.getchannel(0), tile.getchannel(1).point(lambda v: v // (x + 1)),
+                                       Image.new('L', (512, 512), 60 * y)))
+            buffer = BytesIO()
+            tile.save(buffer, format='PNG')
+            return make_response(200, buffer.getvalue())
+        
+        self.app.tile_fetcher = TileFetcher(max_workers=2)
+        with patch('tile_fetcher.http_get', side_effect=serve_tile) as mock_get:
+            equirect, _ = self.app.tile_fetcher.download_image('A' * 22, 1)
+            mock_get.reset_mock()
+            faces = self.app.build_cubemap_from_tiles('A' * 22, 1)
+        
+        # Ogni tile è scaricata una sola volta anche se condivisa tra più facce
+        self.assertEqual(mock_get.call_count, 2)
+        expected = self.app.equirect_to_cubemap(equirect)
+        self.assertEqual(set(faces), set(expected))
+        for face_name in ('front', 'right', 'left'):
+            self.assertEqual(faces[face_name].tobytes(), expected[face_name].tobytes())
+
+    def test_direct_cubemap_row_bands(self):
+        """Test cubemap diretto a bande di righe identico al calcolo in una sola banda"""
+        import re
+        import numpy as np
+
+        def serve_tile(url, timeout=None):
+            x, y = (int(v) for v in re.search(r'x=(\d+)&y=(\d+)', url).groups())
+            tile = Image.linear_gradient('L').resize((512, 512)).rotate(90 * x).convert('RGB')
+            buffer = BytesIO()
+            tile.point(lambda v: (v + 40 * y) % 256).save(buffer, format='PNG')
+            return make_response(200, buffer.getvalue())
+
+        from projection_cache import get_projection_cache
+        self.app.tile_fetcher = TileFetcher(max_workers=2)
+        decoded = []
+        with patch('tile_fetcher.http_get', side_effect=serve_tile):
+            whole = self.app.build_cubemap_from_tiles('A' * 22, 2, face_size=96)
+            get_projection_cache().clear()
+            with patch.dict('config.CONVERSION_CONFIG', {'memory_budget_mb': 0.2}), \
+                    patch('tile_cubemap.TileCubemapBuilder._decode_tile', autospec=True,
+                          side_effect=lambda builder, data, x, y: decoded.append((x, y)) or
+                          np.asarray(Image.open(BytesIO(data)).convert('RGB'))):
+                banded = self.app.build_cubemap_from_tiles('A' * 22, 2, face_size=96)
+
+        for face_name in whole:
+            self.assertEqual(banded[face_name].tobytes(), whole[face_name].tobytes())
+        # Più bande per faccia: le tiles condivise da bande consecutive non vengono ridecodificate
+        self.assertGreater(len(decoded), 8)
+        self.assertLess(len(decoded), 6 * 8)
+
+
+class TestProjectionCache(unittest.TestCase):
+    """Test per la cache delle mappe di proiezione"""
+    
+    def setUp(self):
+        """Setup test"""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Cleanup test"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_map_computed_once(self):
+        """Test mappa calcolata una sola volta per geometria"""
+        import numpy as np
+        
+        cache = ProjectionCache(max_size_mb=1, cache_dir='')
+        compute = Mock(return_value=np.zeros((2, 4), dtype=np.float32))
+        
+        first = cache.get_or_compute(('test', 64, 32, 16, 0), compute)
+        second = cache.get_or_compute(('test', 64, 32, 16, 0), compute)
+        
+        self.assertIs(first, second)
+        self.assertEqual(compute.call_count, 1)
+        self.assertFalse(first.flags.writeable)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+    
+    def test_lru_eviction_and_disk(self):
+        """Test eviction LRU e ricarica della mappa da file .npy"""
+        import numpy as np
+        
+        cache = ProjectionCache(max_size_mb=1500 / (1024 * 1024), cache_dir=self.temp_dir)
+        for i in range(3):
+            cache.get_or_compute(('test', i), lambda: np.full(256, i, dtype=np.float32))
+        self.assertEqual(len(cache), 1)
+        
+        reloaded = ProjectionCache(cache_dir=self.temp_dir).get_or_compute(
+            ('test', 0), lambda: self.fail("la mappa doveva essere letta da disco"))
+        self.assertTrue((reloaded == 0).all())
+    
+    def test_converter_reuses_maps(self):
+        """Test conversioni successive con la stessa geometria identiche"""
+        converter = PanoramaConverter()
+        image = Image.new('RGB', (128, 64), (10, 200, 30))
+        
+        first = converter.equirectangular_to_cubemap(image, face_size=24, method='quality')
+        second = converter.equirectangular_to_cubemap(image, face_size=24, method='quality')
+        
+        for face_name in first:
+            self.assertEqual(first[face_name].tobytes(), second[face_name].tobytes())
 
 
 class TestAdvancedDownloader(unittest.TestCase):
@@ -281,7 +1770,25 @@ def run_tests():
     # Aggiungi test classes
     test_classes = [
         TestPanoramaConverter,
+        TestOpenCVBackend,
         TestBatchProcessor,
+        TestTileFetcher,
+        TestAsyncDownloadEngine,
+        TestRetryPolicy,
+        TestCircuitBreaker,
+        TestZoomProbe,
+        TestMetadataCache,
+        TestURLValidation,
+        TestPanoIDExtractor,
+        TestBatchURLList,
+        TestProgressBus,
+        TestTileCache,
+        TestPipeline,
+        TestBatchJournal,
+        TestRateLimiter,
+        TestBatchCLI,
+        TestCubemapProjection,
+        TestProjectionCache,
         TestAdvancedDownloader,
         TestIntegration
     ]
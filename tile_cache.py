@@ -0,0 +1,161 @@
+"""
+Cache su disco delle tiles Street View
+Memorizza i bytes JPEG originali indicizzati per (panoid, zoom, x, y) con limite di dimensione ed eviction LRU
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from config import CACHE_CONFIG
+
+
+class TileCache:
+    """Cache LRU su disco delle tiles scaricate"""
+
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        """
+        Args:
+            cache_dir: Cartella della cache (None = CACHE_CONFIG['cache_dir'])
+            max_size_mb: Dimensione massima in MB (None = CACHE_CONFIG['max_size_mb'])
+        """
+        self.cache_dir = cache_dir or CACHE_CONFIG['cache_dir']
+        if max_size_mb is None:
+            max_size_mb = CACHE_CONFIG['max_size_mb']
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> dimensione, dal meno al più recente
+        self._total_bytes = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Ricostruisce l'ordine LRU dai file presenti (mtime = ultimo accesso)"""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if not name.endswith('.jpg'):
+                    # File temporanei rimasti da scritture interrotte
+                    if name.endswith('.tmp'):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def _path_for(self, panoid, zoom, x, y):
+        """Percorso del file per una tile (nome = hash della chiave)"""
+        digest = hashlib.sha1(f"{panoid}/{zoom}/{x}/{y}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def get(self, panoid, zoom, x, y):
+        """
+        Legge una tile dalla cache
+
+        Returns:
+            bytes: contenuto JPEG, oppure None se non presente
+        """
+        path = self._path_for(panoid, zoom, x, y)
+        with self._lock:
+            if path not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Aggiorna l'ultimo accesso per l'LRU tra le sessioni
+        except OSError:
+            # File rimosso dall'esterno: allinea l'indice
+            with self._lock:
+                size = self._entries.pop(path, None)
+                if size is not None:
+                    self._total_bytes -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, panoid, zoom, x, y, data):
+        """Salva una tile nella cache con scrittura atomica"""
+        if not data or len(data) > self.max_bytes:
+            return
+
+        path = self._path_for(panoid, zoom, x, y)
+        folder = os.path.dirname(path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            # Scrive su file temporaneo nella stessa cartella e lo rinomina (atomico)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            print(f"⚠ Impossibile scrivere tile in cache: {e}")
+            return
+
+        with self._lock:
+            old_size = self._entries.pop(path, None)
+            if old_size is not None:
+                self._total_bytes -= old_size
+            self._entries[path] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        """Rimuove le tiles meno usate finché la cache rientra nel limite (lock già acquisito)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Svuota completamente la cache"""
+        with self._lock:
+            for path in self._entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def size_bytes(self):
+        """Dimensione attuale della cache in bytes"""
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,169 @@
+"""
+Conversione diretta tiles → cubemap
+Campiona ogni faccia del cubo direttamente dalle tiles decodificate, senza costruire il mosaico
+equirettangolare completo. La faccia è calcolata a bande di righe entro
+CONVERSION_CONFIG['memory_budget_mb'] e per ogni banda vengono decodificate solo le sue tiles:
+la memoria di picco è limitata a una faccia più i temporanei e le tiles di una banda
+"""
+
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from config import CONVERSION_CONFIG
+from panorama_converter import row_bands
+from tile_fetcher import TILE_SIZE, ERROR_TILE_COLOR
+from retry_policy import pano_retry_budget
+
+FACE_NAMES = ['front', 'right', 'back', 'left', 'up', 'down']
+
+
+class TileCubemapBuilder:
+    """Costruisce le facce del cubemap una alla volta a partire dalle tiles di un panorama"""
+
+    def __init__(self, fetcher, coords_fn, memory_budget_mb=None):
+        """
+        Args:
+            fetcher: TileFetcher usato per scaricare le tiles
+            coords_fn: Funzione (width, height, face_size, face_index) che restituisce un array
+                       float (2, face_size*face_size) con le coordinate equirettangolari xs, ys
+                       campionate da ogni pixel della faccia
+            memory_budget_mb: Memoria massima per i temporanei di una banda di righe
+                              (None = CONVERSION_CONFIG['memory_budget_mb'])
+        """
+        self.fetcher = fetcher
+        self.coords_fn = coords_fn
+        if memory_budget_mb is None:
+            memory_budget_mb = CONVERSION_CONFIG['memory_budget_mb']
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+
+    def iter_faces(self, panoid, zoom, face_size=None, progress_callback=None, tile_bytes=None):
+        """
+        Scarica le tiles necessarie e genera le facce del cubemap una alla volta
+
+        Args:
+            panoid: PanoID del panorama
+            zoom: Livello di zoom
+            face_size: Dimensione facce (None = metà altezza dell'equirettangolare)
+            progress_callback: Funzione callback(done_faces, total_faces, face_name)
+            tile_bytes: dict {(x, y): bytes} di tiles già scaricate (le mancanti vengono scaricate)
+
+        Yields:
+            tuple: (face_name, PIL Image)
+        """
+        tiles_x, tiles_y = self.fetcher.grid(panoid, zoom)
+        width, height = tiles_x * TILE_SIZE, tiles_y * TILE_SIZE
+        if face_size is None:
+            face_size = height // 2
+
+        # Bytes JPEG già scaricati: le tiles condivise tra facce non vengono riscaricate
+        # (compressi occupano una frazione della memoria del mosaico decodificato)
+        tile_bytes = dict(tile_bytes or {})
+        # Un solo budget di retry per tutte le facce del panorama
+        pano_budget = pano_retry_budget()
+
+        for i, face_name in enumerate(FACE_NAMES):
+            coords = self.coords_fn(width, height, face_size, i)
+            face = self._sample_face(panoid, zoom, coords, face_size, width, height, tile_bytes, pano_budget)
+            face_image = Image.fromarray(face.reshape(face_size, face_size, 3))
+
+            if progress_callback:
+                progress_callback(i + 1, len(FACE_NAMES), face_name)
+            yield face_name, face_image
+
+    def build(self, panoid, zoom, face_size=None, progress_callback=None, tile_bytes=None):
+        """Restituisce tutte le facce come dict {face_name: PIL Image}"""
+        return dict(self.iter_faces(panoid, zoom, face_size, progress_callback, tile_bytes))
+
+    def _sample_face(self, panoid, zoom, coords, face_size, width, height, tile_bytes, pano_budget=None):
+        """
+        Campionamento bilineare di una faccia dalle sole tiles che la coprono, a bande di righe
+
+        Le tiles mancanti della faccia vengono scaricate insieme; poi ogni banda decodifica solo
+        le proprie tiles (quelle della banda precedente che servono ancora vengono riusate)
+        """
+        bands = [(start * face_size, stop * face_size)
+                 for start, stop in row_bands(face_size, face_size, self.memory_budget)]
+        band_tiles = [self._band_tiles(coords[:, start:stop], width, height) for start, stop in bands]
+
+        needed = sorted(set().union(*band_tiles))
+        missing = [tile for tile in needed if tile not in tile_bytes]
+        for x, y, data in self.fetcher.iter_tiles(panoid, zoom, missing, pano_budget):
+            tile_bytes[(x, y)] = data
+
+        face = np.empty((face_size * face_size, 3), dtype=np.uint8)
+        atlas, slots = None, {}
+        for (start, stop), tiles in zip(bands, band_tiles):
+            # Atlante compatto della banda: una cella per tile, le tiles precedenti vengono rilasciate
+            band_atlas = np.empty((len(tiles), TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+            for slot, (tx, ty) in enumerate(tiles):
+                if (tx, ty) in slots:
+                    band_atlas[slot] = atlas[slots[(tx, ty)]]
+                else:
+                    band_atlas[slot] = self._decode_tile(tile_bytes.get((tx, ty)), tx, ty)
+            atlas, slots = band_atlas, {tile: slot for slot, tile in enumerate(tiles)}
+
+            face[start:stop] = self._sample_band(coords[:, start:stop], width, height, atlas, slots)
+        return face
+
+    @staticmethod
+    def _neighbors(coords, width, height):
+        """Vicini del campionamento bilineare (x con wrap orizzontale, y limitato) e pesi float32"""
+        xf, yf = coords[0], coords[1]
+        x0_unwrapped = np.floor(xf).astype(np.int32)
+        x0 = x0_unwrapped % width
+        y0 = np.floor(yf).astype(np.int32)
+        x1 = (x0 + 1) % width
+        y1 = np.clip(y0 + 1, 0, height - 1)
+        wx = (xf - x0_unwrapped).astype(np.float32)
+        wy = (yf - y0).astype(np.float32)
+        return x0, y0, x1, y1, wx, wy
+
+    def _band_tiles(self, coords, width, height):
+        """Tiles (x, y) coperte dai quattro vicini dei pixel di una banda"""
+        x0, y0, x1, y1, _, _ = self._neighbors(coords, width, height)
+        tiles_x = width // TILE_SIZE
+        tile_ids = np.unique(np.concatenate([
+            (py // TILE_SIZE) * tiles_x + px // TILE_SIZE
+            for px, py in ((x0, y0), (x1, y0), (x0, y1), (x1, y1))
+        ]))
+        return [(int(tile_id % tiles_x), int(tile_id // tiles_x)) for tile_id in tile_ids]
+
+    def _sample_band(self, coords, width, height, atlas, slots):
+        """Campionamento bilineare di una banda dall'atlante delle sue tiles"""
+        x0, y0, x1, y1, wx, wy = self._neighbors(coords, width, height)
+
+        slot_lut = np.full((height // TILE_SIZE, width // TILE_SIZE), -1, dtype=np.int32)
+        for (tx, ty), slot in slots.items():
+            slot_lut[ty, tx] = slot
+
+        def gather(px, py):
+            tile_slots = slot_lut[py // TILE_SIZE, px // TILE_SIZE]
+            return atlas[tile_slots, py % TILE_SIZE, px % TILE_SIZE].astype(np.float32)
+
+        p00 = gather(x0, y0)
+        p10 = gather(x1, y0)
+        p01 = gather(x0, y1)
+        p11 = gather(x1, y1)
+
+        top = p00 * (1 - wx)[:, None] + p10 * (wx)[:, None]
+        bottom = p01 * (1 - wx)[:, None] + p11 * (wx)[:, None]
+        result = top * (1 - wy)[:, None] + bottom * (wy)[:, None]
+        return np.clip(result, 0, 255).astype(np.uint8)
+
+    def _decode_tile(self, data, x, y):
+        """Decodifica una tile in array RGB (grigio se mancante o non valida)"""
+        if data is not None:
+            try:
+                tile = Image.open(BytesIO(data)).convert('RGB')
+                if tile.size != (TILE_SIZE, TILE_SIZE):
+                    padded = Image.new('RGB', (TILE_SIZE, TILE_SIZE))
+                    padded.paste(tile, (0, 0))
+                    tile = padded
+                return np.asarray(tile)
+            except Exception as e:
+                print(f"  ❌ Tile ({x},{y}) non decodificabile: {e}")
+
+        print(f"  💀 Tile ({x},{y}) fallita definitivamente")
+        return np.full((TILE_SIZE, TILE_SIZE, 3), ERROR_TILE_COLOR, dtype=np.uint8)
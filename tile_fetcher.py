@@ -0,0 +1,308 @@
+"""
+Motore di download concorrente delle tiles Street View
+Scarica tutte le tiles di un panorama in parallelo con un pool di worker limitato
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+from PIL import Image
+
+from config import DOWNLOAD_CONFIG, API_CONFIG
+from http_session import http_get, ensure_pool_size
+from retry_policy import RetryPolicy, pano_retry_budget
+from circuit_breaker import get_circuit_breaker
+
+# Dimensione standard delle tiles (pixel)
+TILE_SIZE = API_CONFIG['tile_size']
+
+# Griglia tiles (tiles_x, tiles_y) per livello di zoom
+ZOOM_GRID = {
+    0: (1, 1),      # 512x512
+    1: (2, 1),      # 1024x512
+    2: (4, 2),      # 2048x1024
+    3: (8, 4),      # 4096x2048
+    4: (16, 8),     # 8192x4096
+    5: (32, 16)     # 16384x8192 (se disponibile)
+}
+
+# Colore delle tiles definitivamente fallite
+ERROR_TILE_COLOR = (64, 64, 64)
+
+# Status con cui l'endpoint dichiara che una tile non esiste; ogni altro errore è temporaneo
+ABSENT_STATUSES = (400, 404)
+
+
+def get_tile_url(panoid, x, y, zoom=2):
+    """Genera l'URL per scaricare una tile specifica"""
+    return f"https://streetviewpixels-pa.googleapis.com/v1/tile?cb_client=maps_sv.tactile&panoid={panoid}&x={x}&y={y}&zoom={zoom}&nbt=1&fover=2"
+
+
+def paste_tile(image, x, y, data):
+    """
+    Incolla una tile scaricata nell'immagine finale
+
+    Args:
+        image: PIL Image di destinazione
+        x, y: Coordinate della tile nella griglia
+        data: bytes JPEG della tile oppure None se il download è fallito
+
+    Returns:
+        bool: True se la tile è valida, False se è stata sostituita da una tile grigia
+    """
+    tile_image = None
+    if data is not None:
+        try:
+            tile_image = Image.open(BytesIO(data))
+        except Exception as e:
+            print(f"  ❌ Tile ({x},{y}) non decodificabile: {e}")
+
+    valid = tile_image is not None
+    if not valid:
+        # Tile definitivamente fallita - usa grigio
+        print(f"  💀 Tile ({x},{y}) fallita definitivamente")
+        tile_image = Image.new('RGB', (TILE_SIZE, TILE_SIZE), ERROR_TILE_COLOR)
+
+    image.paste(tile_image, (x * TILE_SIZE, y * TILE_SIZE))
+    return valid
+
+
+def assemble_tiles(tile_bytes, zoom, grid=None):
+    """
+    Ricostruisce l'immagine equirettangolare da tiles già scaricate
+
+    Args:
+        tile_bytes: dict {(x, y): bytes JPEG oppure None}
+        zoom: Livello di zoom (deve essere in ZOOM_GRID)
+        grid: Griglia reale (tiles_x, tiles_y) del panorama (None = ZOOM_GRID[zoom])
+
+    Returns:
+        tuple: (PIL Image, numero tiles fallite)
+    """
+    tiles_x, tiles_y = grid or ZOOM_GRID[zoom]
+    final_image = Image.new('RGB', (tiles_x * TILE_SIZE, tiles_y * TILE_SIZE))
+
+    failed_tiles = 0
+    for y in range(tiles_y):
+        for x in range(tiles_x):
+            if not paste_tile(final_image, x, y, tile_bytes.get((x, y))):
+                failed_tiles += 1
+
+    return final_image, failed_tiles
+
+
+class TileFetcher:
+    """Scarica le tiles di un panorama in parallelo con un pool di worker limitato"""
+
+    def __init__(self, max_workers=None, max_retries=None, timeout=None, cache=None,
+                 retry_policy=None, retry_budget=None, breaker=None, probe=None):
+        """
+        Args:
+            max_workers: Numero massimo di tiles scaricate in parallelo
+                         (None = DOWNLOAD_CONFIG['max_workers'])
+            max_retries: Tentativi per tile (None = DOWNLOAD_CONFIG['max_retries'])
+            timeout: Timeout per richiesta HTTP (None = DOWNLOAD_CONFIG['request_timeout'])
+            cache: TileCache consultata prima della rete (None = nessuna cache)
+            retry_policy: RetryPolicy per le tiles (None = politica di default con max_retries tentativi)
+            retry_budget: RetryBudget condiviso da tutti i panorami scaricati (es. un batch);
+                          None = solo il budget per panorama
+            breaker: CircuitBreaker dell'endpoint tiles (None = circuito 'tiles' condiviso dal processo)
+            probe: ZoomProbe per la griglia reale dei panorami non standard (None = griglia ZOOM_GRID)
+        """
+        self.max_workers = max(1, int(max_workers or DOWNLOAD_CONFIG['max_workers']))
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries)
+        self.max_retries = self.retry_policy.max_attempts
+        self.retry_budget = retry_budget
+        self.breaker = breaker or get_circuit_breaker('tiles')
+        self.probe = probe
+        self.timeout = timeout
+        self.cache = cache
+
+        # Una connessione keep-alive per ogni worker
+        ensure_pool_size(self.max_workers)
+
+    def grid(self, panoid, zoom):
+        """Griglia (tiles_x, tiles_y) del panorama a uno zoom"""
+        if self.probe is not None:
+            return self.probe.grid(panoid, zoom)
+        return ZOOM_GRID[zoom]
+
+    def fetch_tile(self, panoid, x, y, zoom, pano_budget=None, absent=None):
+        """
+        Scarica una singola tile con retry (404 e altri errori definitivi non vengono ritentati)
+
+        Args:
+            pano_budget: RetryBudget del panorama (None = nessun limite per panorama)
+            absent: set in cui aggiungere (x, y) se l'endpoint dichiara la tile inesistente
+                    (ABSENT_STATUSES), per distinguerla da un errore temporaneo
+
+        Returns:
+            bytes: contenuto JPEG della tile, oppure None se fallita o inesistente
+        """
+        if self.cache is not None:
+            data = self.cache.get(panoid, zoom, x, y)
+            if data is not None:
+                return data
+
+        url = get_tile_url(panoid, x, y, zoom)
+        budgets = [budget for budget in (pano_budget, self.retry_budget) if budget is not None]
+
+        response = self.retry_policy.execute(lambda: http_get(url, timeout=self.timeout),
+                                             budgets, label=f"Tile ({x},{y})", breaker=self.breaker,
+                                             accept_statuses=ABSENT_STATUSES)
+        if response is None:
+            return None
+        if response.status_code in ABSENT_STATUSES:
+            if absent is not None:
+                absent.add((x, y))
+            return None
+
+        if self.cache is not None:
+            self.cache.put(panoid, zoom, x, y, response.content)
+        return response.content
+
+    def iter_tiles(self, panoid, zoom, tiles=None, pano_budget=None, absent=None):
+        """
+        Scarica le tiles in parallelo restituendole man mano che arrivano
+
+        Args:
+            panoid: PanoID del panorama
+            zoom: Livello di zoom
+            tiles: Lista di coordinate (x, y) da scaricare (None = griglia completa del panorama)
+            pano_budget: RetryBudget del panorama (None = nuovo budget da RETRY_CONFIG)
+            absent: set in cui raccogliere le tiles inesistenti (vedi fetch_tile)
+
+        Yields:
+            tuple: (x, y, data) con data = bytes JPEG oppure None se fallita
+        """
+        if tiles is None:
+            tiles_x, tiles_y = self.grid(panoid, zoom)
+            tiles = [(x, y) for y in range(tiles_y) for x in range(tiles_x)]
+
+        if not tiles:
+            return
+
+        if pano_budget is None:
+            pano_budget = pano_retry_budget()
+
+        workers = min(self.max_workers, len(tiles))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile") as executor:
+            futures = {
+                executor.submit(self.fetch_tile, panoid, x, y, zoom, pano_budget, absent): (x, y)
+                for x, y in tiles
+            }
+            try:
+                for future in as_completed(futures):
+                    x, y = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        print(f"  ❌ Tile ({x},{y}) errore: {e}")
+                        data = None
+                    yield x, y, data
+            finally:
+                # Se il consumatore si interrompe, non avvia le tiles ancora in coda
+                for future in futures:
+                    future.cancel()
+
+    def fetch_all(self, panoid, zoom):
+        """
+        Scarica tutte le tiles di un panorama senza decodificarle
+
+        Returns:
+            dict: {(x, y): bytes JPEG oppure None se fallita}
+        """
+        return {(x, y): data for x, y, data in self.iter_tiles(panoid, zoom)}
+
+    def download_image(self, panoid, zoom, progress_callback=None):
+        """
+        Scarica e ricostruisce l'immagine equirettangolare completa
+
+        Args:
+            panoid: PanoID del panorama
+            zoom: Livello di zoom (deve essere in ZOOM_GRID)
+            progress_callback: Funzione callback(done, total) chiamata ad ogni tile
+
+        Returns:
+            tuple: (PIL Image, numero tiles fallite)
+        """
+        tiles_x, tiles_y = self.grid(panoid, zoom)
+        final_image = Image.new('RGB', (tiles_x * TILE_SIZE, tiles_y * TILE_SIZE))
+
+        total_tiles = tiles_x * tiles_y
+        done_tiles = 0
+        failed_tiles = 0
+
+        # Le tiles vengono incollate nel thread chiamante man mano che arrivano
+        for x, y, data in self.iter_tiles(panoid, zoom):
+            if not paste_tile(final_image, x, y, data):
+                failed_tiles += 1
+            done_tiles += 1
+
+            if progress_callback:
+                progress_callback(done_tiles, total_tiles)
+
+        return final_image, failed_tiles
+
+    def download_progressive(self, panoid, zoom, preview_callback, progress_callback=None, preview_zoom=None):
+        """
+        Scarica l'immagine completa mostrando subito un'anteprima a bassa risoluzione
+
+        L'anteprima viene dallo zoom basso (1-2 tiles) e viene poi raffinata con le tiles dello
+        zoom richiesto, ridotte alla sua scala, man mano che arrivano. L'immagine restituita
+        è identica a quella di download_image.
+
+        Args:
+            panoid: PanoID del panorama
+            zoom: Livello di zoom (deve essere in ZOOM_GRID)
+            preview_callback: Funzione callback(PIL Image) chiamata con l'anteprima aggiornata
+                              (al massimo una volta ogni DOWNLOAD_CONFIG['preview_interval'] secondi)
+            progress_callback: Funzione callback(done, total) chiamata ad ogni tile
+            preview_zoom: Zoom dell'anteprima iniziale (None = DOWNLOAD_CONFIG['preview_zoom'])
+
+        Returns:
+            tuple: (PIL Image, numero tiles fallite)
+        """
+        if preview_zoom is None:
+            preview_zoom = DOWNLOAD_CONFIG['preview_zoom']
+        preview_zoom = min(preview_zoom, zoom)
+
+        preview, preview_failed = self.download_image(panoid, preview_zoom)
+        preview_callback(preview.copy())
+        if preview_zoom == zoom:
+            if progress_callback:
+                tiles_x, tiles_y = self.grid(panoid, zoom)
+                progress_callback(tiles_x * tiles_y, tiles_x * tiles_y)
+            return preview, preview_failed
+
+        tiles_x, tiles_y = self.grid(panoid, zoom)
+        final_image = Image.new('RGB', (tiles_x * TILE_SIZE, tiles_y * TILE_SIZE))
+        # Cella occupata da una tile dello zoom richiesto nell'anteprima
+        cell_w = max(1, preview.width // tiles_x)
+        cell_h = max(1, preview.height // tiles_y)
+
+        total_tiles = tiles_x * tiles_y
+        done_tiles = 0
+        failed_tiles = 0
+        last_preview = time.monotonic()
+
+        for x, y, data in self.iter_tiles(panoid, zoom):
+            if not paste_tile(final_image, x, y, data):
+                failed_tiles += 1
+            done_tiles += 1
+
+            box = (x * TILE_SIZE, y * TILE_SIZE, (x + 1) * TILE_SIZE, (y + 1) * TILE_SIZE)
+            preview.paste(final_image.crop(box).resize((cell_w, cell_h), Image.Resampling.BILINEAR),
+                          (x * cell_w, y * cell_h))
+
+            if progress_callback:
+                progress_callback(done_tiles, total_tiles)
+
+            now = time.monotonic()
+            if now - last_preview >= DOWNLOAD_CONFIG['preview_interval'] and done_tiles < total_tiles:
+                last_preview = now
+                preview_callback(preview.copy())
+
+        preview_callback(preview.copy())
+        return final_image, failed_tiles
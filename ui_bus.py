@@ -0,0 +1,137 @@
+"""
+Canale degli aggiornamenti dell'interfaccia dai thread di lavoro
+I worker non toccano mai Tk: pubblicano valori e chiamate, che il main loop applica con after()
+a frequenza fissa. I valori pubblicati per la stessa variabile nello stesso intervallo vengono fusi
+(vale l'ultimo), quindi il costo per l'interfaccia non dipende da quante tiles arrivano al secondo
+"""
+
+import threading
+from collections import deque
+
+from config import UI_CONFIG
+
+
+class BusVariable:
+    """Variabile Tk vista da un worker: set() pubblica sul bus invece di scrivere su Tk"""
+
+    def __init__(self, bus, variable):
+        self._bus = bus
+        self._variable = variable
+
+    def set(self, value):
+        self._bus.set(self._variable, value)
+
+
+class ProgressBus:
+    """Coda degli aggiornamenti dell'interfaccia, svuotata dal main loop (thread-safe)"""
+
+    def __init__(self, root, fps=None):
+        """
+        Args:
+            root: Widget Tk su cui pianificare lo svuotamento (after)
+            fps: Svuotamenti al secondo (None = UI_CONFIG['progress_fps'])
+        """
+        self.root = root
+        self.fps = max(1, int(fps or UI_CONFIG['progress_fps']))
+        self.interval = max(1, int(1000 / self.fps))
+
+        self._lock = threading.Lock()
+        self._values = {}  # id(variabile) -> (variabile, valore): vale l'ultimo pubblicato
+        self._latest = {}  # chiave -> (funzione, argomenti): vale l'ultima pubblicata
+        self._calls = deque()  # (funzione, argomenti) eseguite tutte, in ordine
+        self._running = False
+        self._draining = False  # Svuotamento in corso (solo main loop)
+
+        # Metriche
+        self.posted = 0
+        self.applied = 0
+        self.frames = 0
+
+    def set(self, variable, value):
+        """Pubblica il nuovo valore di una variabile Tk (StringVar, DoubleVar, ...)"""
+        with self._lock:
+            self._values[id(variable)] = (variable, value)
+            self.posted += 1
+
+    def variable(self, variable):
+        """Oggetto con set() da passare ai worker al posto della variabile Tk"""
+        return BusVariable(self, variable)
+
+    def call(self, function, *args):
+        """Pubblica una chiamata da eseguire nel main loop (mai fusa con altre: es. log, messagebox)"""
+        with self._lock:
+            self._calls.append((function, args))
+            self.posted += 1
+
+    def call_latest(self, key, function, *args):
+        """Pubblica una chiamata di cui conta solo l'ultima per chiave (es. anteprima, ridisegno)"""
+        with self._lock:
+            self._latest[key] = (function, args)
+            self.posted += 1
+
+    def start(self):
+        """Avvia lo svuotamento periodico nel main loop"""
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval, self._tick)
+
+    def stop(self):
+        """Ferma lo svuotamento periodico (gli aggiornamenti restano in coda)"""
+        self._running = False
+
+    def _tick(self):
+        """Un fotogramma: applica gli aggiornamenti e pianifica il successivo"""
+        if not self._running:
+            return
+        try:
+            self.drain()
+        finally:
+            self.root.after(self.interval, self._tick)
+
+    def drain(self):
+        """
+        Applica tutti gli aggiornamenti in coda (solo dal main loop)
+
+        Prima i valori delle variabili, poi le chiamate fuse, infine quelle in ordine: un messaggio
+        di fine lavoro compare dopo lo stato finale.
+
+        Una chiamata che apre una finestra modale (messagebox) fa girare il loop di Tk al suo
+        interno: uno svuotamento annidato applicherebbe gli aggiornamenti successivi prima che
+        quelli precedenti siano finiti, quindi viene ignorato (restano in coda per il prossimo).
+
+        Returns:
+            int: Aggiornamenti applicati
+        """
+        if self._draining:
+            return 0
+        self._draining = True
+        try:
+            return self._drain()
+        finally:
+            self._draining = False
+
+    def _drain(self):
+        """Svuota la coda (svuotamento non annidato)"""
+        with self._lock:
+            values, self._values = self._values, {}
+            latest, self._latest = self._latest, {}
+            calls, self._calls = self._calls, deque()
+            self.frames += 1
+
+        for variable, value in values.values():
+            self._apply(variable.set, (value,))
+        for function, args in list(latest.values()) + list(calls):
+            self._apply(function, args)
+
+        applied = len(values) + len(latest) + len(calls)
+        with self._lock:
+            self.applied += applied
+        return applied
+
+    @staticmethod
+    def _apply(function, args):
+        """Esegue un aggiornamento; un errore non ferma gli altri"""
+        try:
+            function(*args)
+        except Exception as e:
+            print(f"Errore aggiornamento interfaccia: {e}")
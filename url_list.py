@@ -0,0 +1,265 @@
+"""
+Lista degli URL dei download multipli
+Modello in memoria della lista mostrata nella GUI: gli URL restano nell'ordine di inserimento e i
+duplicati sono riconosciuti in O(1) per PanoID (due URL diversi dello stesso panorama sono
+lo stesso elemento), senza rileggere il contenuto del widget.
+Lo stato di ogni riga è in un array compatto (un byte per riga); filtri e ordinamenti producono
+una vista (array di indici di riga) di cui il widget disegna solo le righe visibili.
+"""
+
+import threading
+from array import array
+
+from panoid_extractor import extract_panoid, iter_panoids
+
+# Stato di una riga
+STATUS_PENDING = 0
+STATUS_OK = 1
+STATUS_FAILED = 2
+STATUS_UNREACHABLE = 3
+
+STATUS_NAMES = {
+    STATUS_PENDING: 'pending',
+    STATUS_OK: 'ok',
+    STATUS_FAILED: 'failed',
+    STATUS_UNREACHABLE: 'unreachable',
+}
+
+# Ordinamenti della vista
+SORT_INSERTION = 'insertion'
+SORT_URL = 'url'
+SORT_PANOID = 'panoid'
+SORT_STATUS = 'status'
+
+
+class BatchURLList:
+    """Insieme ordinato di URL indicizzato per PanoID, con stato per riga e vista filtrata"""
+
+    def __init__(self):
+        self._urls = []
+        self._panoids = []  # PanoID per riga (None se l'URL non ne contiene uno)
+        self._status = array('B')
+        self._rows = {}  # chiave di deduplicazione -> riga
+        # Gli esiti arrivano dai thread di lavoro mentre la GUI può rimuovere righe (rinumerate)
+        self._lock = threading.Lock()
+
+        # Vista: filtri, ordinamento e indici di riga calcolati al bisogno (None = da ricalcolare)
+        self._status_filter = None
+        self._text_filter = ''
+        self._sort = SORT_INSERTION
+        self._reverse = False
+        self._view = None
+
+    @staticmethod
+    def _key(url, panoid):
+        """Chiave di deduplicazione: il PanoID, oppure l'URL stesso se non ne contiene uno"""
+        return panoid if panoid else url
+
+    def add(self, url):
+        """
+        Aggiunge un URL
+
+        Returns:
+            bool: False se l'URL (o un altro URL dello stesso PanoID) è già nella lista
+        """
+        url = url.strip()
+        return bool(url) and self._append(url, extract_panoid(url))
+
+    def add_many(self, lines):
+        """
+        Aggiunge più URL in una sola passata (righe vuote e commenti '#' ignorati)
+
+        Args:
+            lines: Iterabile di righe, es. un file aperto in lettura
+
+        Returns:
+            tuple: (lista degli URL aggiunti nell'ordine, numero di duplicati scartati)
+        """
+        added = []
+        duplicates = 0
+        for url, panoid in iter_panoids(lines):
+            if self._append(url, panoid):
+                added.append(url)
+            else:
+                duplicates += 1
+        return added, duplicates
+
+    def _append(self, url, panoid):
+        """Aggiunge un URL se la sua chiave è nuova"""
+        key = self._key(url, panoid)
+        with self._lock:
+            if key in self._rows:
+                return False
+            self._rows[key] = len(self._urls)
+            self._urls.append(url)
+            self._panoids.append(panoid)
+            self._status.append(STATUS_PENDING)
+            self._view = None
+        return True
+
+    def remove(self, rows):
+        """Rimuove le righe indicate (indici di riga, non di vista)"""
+        drop = set(rows)
+        if not drop:
+            return
+        with self._lock:
+            kept = [row for row in range(len(self._urls)) if row not in drop]
+            self._urls = [self._urls[row] for row in kept]
+            self._panoids = [self._panoids[row] for row in kept]
+            self._status = array('B', (self._status[row] for row in kept))
+            self._rows = {self._key(url, panoid): row
+                          for row, (url, panoid) in enumerate(zip(self._urls, self._panoids))}
+            self._view = None
+
+    def clear(self):
+        """Svuota la lista"""
+        with self._lock:
+            self._urls = []
+            self._panoids = []
+            self._status = array('B')
+            self._rows = {}
+            self._view = None
+
+    def urls(self):
+        """Copia degli URL nell'ordine della lista"""
+        return list(self._urls)
+
+    def url(self, row):
+        """URL di una riga"""
+        return self._urls[row]
+
+    # ========================================================================================
+    # STATO DELLE RIGHE
+    # ========================================================================================
+
+    def status(self, row):
+        """Stato di una riga (STATUS_*)"""
+        return self._status[row]
+
+    def set_status(self, row, status):
+        """Imposta lo stato di una riga (solo dal main loop: i thread di lavoro usano set_status_for)"""
+        with self._lock:
+            self._set_status(row, status)
+
+    def _set_status(self, row, status):
+        """Imposta lo stato di una riga (lock già acquisito)"""
+        self._status[row] = status
+        if self.view_uses_status():
+            self._view = None
+
+    def set_status_for(self, url, panoid, status):
+        """
+        Imposta lo stato della riga di un URL, cercata per PanoID (o per URL se non ne ha uno)
+
+        Sicuro dai thread di lavoro anche se nel frattempo la lista è stata modificata: gli indici
+        di riga cambiano con le rimozioni, la chiave no.
+
+        Returns:
+            int: Riga aggiornata, oppure None se l'URL non è più nella lista
+        """
+        key = self._key(url.strip(), panoid)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._set_status(row, status)
+        return row
+
+    def set_status_by_panoid(self, panoid, status):
+        """
+        Imposta lo stato della riga di un PanoID
+
+        Returns:
+            int: Riga aggiornata, oppure None se il PanoID non è nella lista
+        """
+        return self.set_status_for(panoid, panoid, status)
+
+    def reset_status(self):
+        """Riporta tutte le righe in attesa"""
+        with self._lock:
+            self._status = array('B', bytes(len(self._urls)))
+            if self.view_uses_status():
+                self._view = None
+
+    def status_counts(self):
+        """Numero di righe per stato: {STATUS_*: conteggio}"""
+        counts = dict.fromkeys(STATUS_NAMES, 0)
+        for status in self._status:
+            counts[status] += 1
+        return counts
+
+    # ========================================================================================
+    # VISTA (FILTRI E ORDINAMENTO)
+    # ========================================================================================
+
+    def set_view(self, status_filter=None, text_filter='', sort=SORT_INSERTION, reverse=False):
+        """
+        Imposta filtri e ordinamento della vista
+
+        Args:
+            status_filter: Stato delle righe mostrate (None = tutte)
+            text_filter: Testo contenuto nell'URL (senza distinzione maiuscole/minuscole)
+            sort: SORT_INSERTION, SORT_URL, SORT_PANOID o SORT_STATUS
+            reverse: Ordine inverso
+        """
+        self._status_filter = status_filter
+        self._text_filter = text_filter.strip().lower()
+        self._sort = sort
+        self._reverse = reverse
+        self._view = None
+
+    def view_uses_status(self):
+        """True se la vista dipende dallo stato delle righe"""
+        return self._status_filter is not None or self._sort == SORT_STATUS
+
+    def _rows_in_view(self):
+        """Indici di riga della vista, ricalcolati solo dopo una modifica"""
+        # Copia locale: un aggiornamento di stato da un altro thread può invalidare self._view
+        view = self._view
+        if view is None:
+            rows = range(len(self._urls))
+            if self._status_filter is not None:
+                status, wanted = self._status, self._status_filter
+                rows = [row for row in rows if status[row] == wanted]
+            if self._text_filter:
+                urls, text = self._urls, self._text_filter
+                rows = [row for row in rows if text in urls[row].lower()]
+
+            if self._sort == SORT_URL:
+                rows = sorted(rows, key=self._urls.__getitem__)
+            elif self._sort == SORT_PANOID:
+                rows = sorted(rows, key=lambda row: self._panoids[row] or '')
+            elif self._sort == SORT_STATUS:
+                rows = sorted(rows, key=self._status.__getitem__)
+            if self._reverse:
+                rows = reversed(rows)
+            view = self._view = array('l', rows)
+        return view
+
+    def view_size(self):
+        """Numero di righe della vista"""
+        return len(self._rows_in_view())
+
+    def view_rows(self, first, count):
+        """
+        Righe della vista da mostrare
+
+        Args:
+            first: Posizione nella vista della prima riga
+            count: Numero massimo di righe
+
+        Returns:
+            list: tuple (riga, URL, stato)
+        """
+        rows = self._rows_in_view()[max(0, first):max(0, first) + count]
+        return [(row, self._urls[row], self._status[row]) for row in rows]
+
+    def view_row(self, position):
+        """Indice di riga alla posizione indicata della vista"""
+        return self._rows_in_view()[position]
+
+    def __contains__(self, url):
+        url = url.strip()
+        return self._key(url, extract_panoid(url)) in self._rows
+
+    def __len__(self):
+        return len(self._urls)
@@ -0,0 +1,167 @@
+"""
+Lista virtualizzata per la GUI
+Il tk.Listbox contiene solo le righe visibili: lo scorrimento riscrive quelle poche righe a
+partire dalla vista del modello (url_list.BatchURLList), quindi centinaia di migliaia di URL non
+costano nulla a Tk finché non sono sullo schermo
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from url_list import STATUS_PENDING, STATUS_OK, STATUS_FAILED, STATUS_UNREACHABLE
+
+# Colore del testo per stato della riga
+STATUS_COLORS = {
+    STATUS_PENDING: 'black',
+    STATUS_OK: 'dark green',
+    STATUS_FAILED: 'red',
+    STATUS_UNREACHABLE: 'dark orange',
+}
+
+
+class VirtualListbox(ttk.Frame):
+    """Listbox con scrollbar che mostra una finestra della vista di un BatchURLList"""
+
+    def __init__(self, parent, model, height=8, refresh_delay=50, scheduler=None):
+        """
+        Args:
+            parent: Widget contenitore
+            model: BatchURLList da mostrare
+            height: Righe visibili iniziali (poi segue la dimensione del widget)
+            refresh_delay: Millisecondi di raggruppamento delle richieste di aggiornamento
+            scheduler: Funzione scheduler(callback) che esegue callback nel main loop; permette di
+                       chiedere ridisegni dai thread di lavoro (None = after, solo dal main loop)
+        """
+        super().__init__(parent)
+        self.model = model
+        self.refresh_delay = refresh_delay
+        self.scheduler = scheduler
+
+        self._first = 0  # Posizione nella vista della prima riga mostrata
+        self._visible = height
+        self._shown_rows = []  # Indici di riga del modello attualmente nel Listbox
+        self._selected = set()  # Righe selezionate (indici di riga, anche fuori schermo)
+        self._refresh_pending = False
+
+        self.listbox = tk.Listbox(self, height=height, selectmode=tk.EXTENDED, activestyle='none')
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.listbox.bind('<Configure>', self._on_resize)
+        self.listbox.bind('<<ListboxSelect>>', self._on_select)
+        self.listbox.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1, 'units', 3))
+        self.listbox.bind('<Button-4>', lambda e: self.scroll(-1, 'units', 3))
+        self.listbox.bind('<Button-5>', lambda e: self.scroll(1, 'units', 3))
+        self.listbox.bind('<Up>', lambda e: self._on_key(-1))
+        self.listbox.bind('<Down>', lambda e: self._on_key(1))
+        self.listbox.bind('<Prior>', lambda e: self.scroll(-1, 'pages'))
+        self.listbox.bind('<Next>', lambda e: self.scroll(1, 'pages'))
+
+    # ========================================================================================
+    # DISEGNO
+    # ========================================================================================
+
+    def refresh(self):
+        """Ridisegna le righe visibili e la scrollbar"""
+        self._refresh_pending = False
+        total = self.model.view_size()
+        self._first = max(0, min(self._first, total - self._visible))
+
+        rows = self.model.view_rows(self._first, self._visible)
+        self._shown_rows = [row for row, _, _ in rows]
+
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *(url for _, url, _ in rows))
+        for position, (row, _, status) in enumerate(rows):
+            if status != STATUS_PENDING:
+                self.listbox.itemconfig(position, foreground=STATUS_COLORS[status])
+            if row in self._selected:
+                self.listbox.selection_set(position)
+
+        if total:
+            self.scrollbar.set(self._first / total, min(1.0, (self._first + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def schedule_refresh(self):
+        """Chiede un ridisegno; le richieste ravvicinate producono un solo ridisegno"""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            if self.scheduler is not None:
+                self.scheduler(self.refresh)
+            else:
+                self.after(self.refresh_delay, self.refresh)
+
+    def is_row_visible(self, row):
+        """True se la riga del modello è attualmente sullo schermo"""
+        return row in self._shown_rows
+
+    def row_changed(self, row):
+        """Segnala il cambio di stato di una riga: ridisegno solo se può cambiare ciò che si vede"""
+        if self.is_row_visible(row) or self.model.view_uses_status():
+            self.schedule_refresh()
+
+    # ========================================================================================
+    # SCORRIMENTO
+    # ========================================================================================
+
+    def scroll(self, amount, what='units', step=1):
+        """Scorre di 'amount' righe (units, moltiplicate per step) o pagine (pages)"""
+        lines = amount * (self._visible if what == 'pages' else step)
+        self._first = max(0, self._first + lines)
+        self.refresh()
+        return 'break'
+
+    def see(self, position):
+        """Porta sullo schermo la posizione indicata della vista"""
+        if position < self._first:
+            self._first = position
+        elif position >= self._first + self._visible:
+            self._first = position - self._visible + 1
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        """Comando della scrollbar: 'moveto' frazione oppure 'scroll' n units/pages"""
+        if action == 'moveto':
+            self._first = int(float(value) * self.model.view_size())
+            self.refresh()
+        elif action == 'scroll':
+            self.scroll(int(value), unit)
+
+    def _on_resize(self, event):
+        """Adatta il numero di righe mostrate all'altezza del widget"""
+        line_height = max(1, self.listbox.winfo_reqheight() // max(1, int(self.listbox.cget('height'))))
+        visible = max(1, event.height // line_height)
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+
+    def _on_key(self, direction):
+        """Frecce: al bordo della finestra la lista scorre invece di fermarsi"""
+        active = self.listbox.index(tk.ACTIVE)
+        if (direction < 0 and active == 0) or (direction > 0 and active >= len(self._shown_rows) - 1):
+            self.scroll(direction)
+            return 'break'
+        return None
+
+    # ========================================================================================
+    # SELEZIONE
+    # ========================================================================================
+
+    def _on_select(self, event=None):
+        """Aggiorna le righe selezionate con la selezione della finestra visibile"""
+        shown = set(self._shown_rows)
+        self._selected -= shown
+        self._selected.update(self._shown_rows[position] for position in self.listbox.curselection()
+                              if position < len(self._shown_rows))
+
+    def selected_rows(self):
+        """Righe del modello selezionate, in ordine crescente"""
+        return sorted(self._selected)
+
+    def clear_selection(self):
+        """Deseleziona tutto"""
+        self._selected.clear()
+        self.listbox.selection_clear(0, tk.END)
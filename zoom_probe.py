@@ -0,0 +1,155 @@
+"""
+Rilevamento dei livelli di zoom e della griglia reale di tiles di un panorama
+Le photosphere degli utenti non seguono la griglia standard 2:1: la griglia viene trovata con
+richieste HEAD in parallelo (ricerca k-aria sulle tiles di bordo) e memorizzata per PanoID,
+così i download richiedono solo le tiles che esistono
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from circuit_breaker import get_circuit_breaker
+from config import DOWNLOAD_CONFIG
+from http_session import http_head
+from retry_policy import RetryPolicy
+from tile_fetcher import ZOOM_GRID, ABSENT_STATUSES, get_tile_url
+
+
+class ZoomProbe:
+    """Livelli di zoom e griglia di tiles per PanoID, con cache in memoria (thread-safe)"""
+
+    def __init__(self, concurrency=None, retry_policy=None, breaker=None):
+        """
+        Args:
+            concurrency: Richieste HEAD in parallelo per ogni passo della ricerca
+                         (None = DOWNLOAD_CONFIG['probe_concurrency'])
+            retry_policy: RetryPolicy delle richieste HEAD (None = politica predefinita)
+            breaker: CircuitBreaker dell'endpoint tiles (None = circuito condiviso 'tiles')
+        """
+        self.concurrency = max(1, int(concurrency or DOWNLOAD_CONFIG['probe_concurrency']))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker
+        self.requests = 0
+
+        self._lock = threading.Lock()
+        self._zooms = {}  # panoid -> lista zoom disponibili
+        self._grids = {}  # (panoid, zoom) -> (tiles_x, tiles_y)
+
+    def tile_exists(self, panoid, x, y, zoom):
+        """
+        True se la tile esiste (HEAD con status 200), False se l'endpoint risponde 400/404
+
+        Raises:
+            RuntimeError: errore temporaneo (rete, 5xx, 429) anche dopo i retry, o circuito aperto:
+                          l'esistenza della tile resta sconosciuta
+        """
+        url = get_tile_url(panoid, x, y, zoom)
+
+        def send():
+            with self._lock:
+                self.requests += 1
+            return http_head(url)
+
+        response = self.retry_policy.execute(
+            send, label=f"Verifica tile {x},{y} di {panoid[:8]}",
+            breaker=self.breaker or get_circuit_breaker('tiles'), accept_statuses=ABSENT_STATUSES)
+        if response is None:
+            raise RuntimeError(f"tile {x},{y} (zoom {zoom}) non verificabile")
+        return response.status_code == 200
+
+    def available_zooms(self, panoid):
+        """
+        Livelli di zoom disponibili (una richiesta per zoom, tutte in parallelo)
+
+        Returns:
+            list: zoom ordinati per cui esiste la tile (0, 0); lista vuota se nessuno
+        """
+        with self._lock:
+            if panoid in self._zooms:
+                return list(self._zooms[panoid])
+
+        zooms = sorted(ZOOM_GRID)
+        with ThreadPoolExecutor(max_workers=len(zooms), thread_name_prefix="probe") as executor:
+            exists = list(executor.map(lambda zoom: self._safe_exists(panoid, 0, 0, zoom), zooms))
+
+        available = [zoom for zoom, ok in zip(zooms, exists) if ok]
+        # Un errore di rete non viene memorizzato: il prossimo tentativo riprova
+        if None not in exists:
+            with self._lock:
+                self._zooms[panoid] = available
+        return available
+
+    def max_zoom(self, panoid):
+        """Zoom massimo disponibile, oppure None se nessuno risponde o se la verifica è incompleta"""
+        available = self.available_zooms(panoid)
+        with self._lock:
+            # Uno zoom non verificabile (errore temporaneo) non va considerato assente
+            complete = panoid in self._zooms
+        return max(available) if available and complete else None
+
+    def grid(self, panoid, zoom):
+        """
+        Griglia reale di tiles a uno zoom
+
+        Per i panorami standard basta una richiesta (l'ultima tile della griglia 2:1);
+        altrimenti righe e colonne vengono cercate in parallelo sulle tiles di bordo.
+
+        Returns:
+            tuple: (tiles_x, tiles_y); la griglia standard ZOOM_GRID[zoom] se la rete non risponde
+                   (non memorizzata: una griglia dedotta durante un errore temporaneo sarebbe falsa)
+        """
+        key = (panoid, zoom)
+        with self._lock:
+            if key in self._grids:
+                return self._grids[key]
+
+        std_x, std_y = ZOOM_GRID[zoom]
+        try:
+            if std_x * std_y == 1 or self.tile_exists(panoid, std_x - 1, std_y - 1, zoom):
+                grid = (std_x, std_y)
+            else:
+                with ThreadPoolExecutor(max_workers=2, thread_name_prefix="probe") as executor:
+                    columns = executor.submit(self._extent, lambda i: self.tile_exists(panoid, i, 0, zoom), std_x)
+                    rows = executor.submit(self._extent, lambda i: self.tile_exists(panoid, 0, i, zoom), std_y)
+                    grid = (columns.result(), rows.result())
+        except Exception as e:
+            print(f"⚠ Griglia tiles di {panoid[:8]} non rilevabile (zoom {zoom}): {e}")
+            return std_x, std_y
+
+        if grid != (std_x, std_y):
+            print(f"📐 Griglia non standard per {panoid[:8]} a zoom {zoom}: {grid[0]}x{grid[1]} tiles")
+        with self._lock:
+            self._grids[key] = grid
+        return grid
+
+    def _safe_exists(self, panoid, x, y, zoom):
+        """Come tile_exists, ma None in caso di errore di rete"""
+        try:
+            return self.tile_exists(panoid, x, y, zoom)
+        except Exception as e:
+            print(f"⚠ Verifica zoom {zoom} fallita: {e}")
+            return None
+
+    def _extent(self, exists, upper):
+        """
+        Numero di tiles lungo un bordo: il primo indice n (1..upper) per cui exists(n) è falso
+
+        Ricerca k-aria: a ogni passo vengono verificati in parallelo fino a 'concurrency' indici
+        equidistanti dell'intervallo ancora incerto (la tile 0 esiste sempre).
+        """
+        low, high = 1, upper  # Il risultato è in [low, high]
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="probe") as executor:
+            while low < high:
+                span = high - low
+                if span <= self.concurrency:
+                    candidates = list(range(low, high))
+                else:
+                    step = span / (self.concurrency + 1)
+                    candidates = sorted({low + int(step * (j + 1)) for j in range(self.concurrency)})
+
+                for index, ok in zip(candidates, executor.map(exists, candidates)):
+                    if ok:
+                        low = max(low, index + 1)
+                    else:
+                        high = min(high, index)
+        return low